@@ -0,0 +1,587 @@
+#!/usr/bin/env python3
+"""
+Benchmark - Mide el pipeline completo sin red ni modelo
+Levanta servidores locales que imitan Brave (/res/v1/web/search) y Ollama
+(/api/generate, /api/tags) con latencias configurables, respuestas sintéticas
+o grabadas e inyección de errores; corre FlightSearchEngine y
+FlightMonitor.run_check_cycle con 1, 10, 100 y 1000 rutas, informa
+throughput, latencia p50/p95/p99 por ruta y pico de RSS, y compara contra una
+línea base guardada para detectar regresiones
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import asyncio
+import itertools
+import resource
+import tempfile
+import threading
+import subprocess
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+BENCH_DIR = Path.home() / ".config" / "flight-monitor" / "benchmarks"
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+
+ENGINE = "engine"
+MONITOR = "monitor"
+SCENARIOS = (ENGINE, MONITOR)
+ROUTE_COUNTS = (1, 10, 100, 1000)
+
+# Empeoramiento tolerado respecto de la línea base (0.2 = 20%)
+BENCH_TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "0.2"))
+
+INTERNATIONAL_AIRPORTS = (
+    "MAD", "BCN", "MIA", "JFK", "GRU", "GIG", "SCL", "LIM", "BOG", "MEX",
+    "CUN", "PUJ", "FCO", "CDG", "LHR", "LIS", "MVD", "ASU", "PTY", "ORD",
+    "SJO", "HAV", "MCO", "LAX", "AMS", "FRA", "MUC", "ZRH", "DXB", "SYD",
+)
+DOMESTIC_AIRPORTS = ("AEP", "EZE", "COR", "MDZ", "SLA", "BRC", "IGR", "USH", "TUC", "NQN")
+AIRLINES = ("Iberia", "LATAM", "Aerolíneas Argentinas", "Air Europa", "American Airlines", "JetSMART")
+DEAL_DOMAINS = ("secretflying.com", "fly4free.com", "theflightdeal.com", "holidaypirates.com")
+
+
+@dataclass
+class LatencyDist:
+    """Distribución de latencia en segundos: fixed, uniform, normal o lognormal"""
+
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDist":
+        """'fixed:0.05', 'uniform:0.01,0.1', 'normal:media,desvío', 'lognormal:mediana,sigma'"""
+        kind, _, args = spec.partition(":")
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Distribución de latencia desconocida: {spec}")
+        values = [float(v) for v in args.split(",") if v] or [0.0]
+        return cls(kind, values[0], values[1] if len(values) > 1 else 0.0)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(self.a, self.b))
+        if self.kind == "lognormal":
+            return rng.lognormvariate(0, self.b) * self.a if self.a else 0.0
+        return self.a
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{self.a:g}" + (f",{self.b:g}" if self.kind != "fixed" else "")
+
+
+@dataclass
+class FakeConfig:
+    """Comportamiento de los servidores falsos"""
+
+    brave_latency: LatencyDist = field(default_factory=lambda: LatencyDist("lognormal", 0.02, 0.5))
+    ollama_latency: LatencyDist = field(default_factory=lambda: LatencyDist("lognormal", 0.05, 0.4))
+    brave_error_rate: float = 0.0
+    ollama_error_rate: float = 0.0
+    priced_ratio: float = 0.7  # Resultados de Brave que mencionan un precio
+    deals_per_prompt: int = 2
+    model: str = "llama3.1:8b"
+    brave_payload: Optional[Dict] = None  # Respuesta grabada para toda consulta
+    ollama_payload: Optional[Dict] = None  # {"extraction"|"evaluation"|"batch": objeto}
+    seed: int = 42
+
+
+def _route_from_text(text: str) -> Tuple[str, str]:
+    codes = re.findall(r"\b[A-Z]{3}\b", text)
+    return (codes[0], codes[1]) if len(codes) >= 2 else ("EZE", "MAD")
+
+
+def synth_brave_results(query: str, offset: int, count: int, priced_ratio: float) -> Dict:
+    """Resultados deterministas por consulta y página, con precios y fechas"""
+    rng = random.Random(zlib.crc32(f"{query}|{offset}".encode()))
+    origin, destination = _route_from_text(query)
+    date = (datetime.now() + timedelta(days=rng.randint(10, 90))).strftime("%Y-%m-%d")
+    results = []
+    for i in range(count):
+        domain = rng.choice(DEAL_DOMAINS)
+        airline = rng.choice(AIRLINES)
+        slug = f"{origin.lower()}-{destination.lower()}-{zlib.crc32(query.encode()) % 9973}-{offset}-{i}"
+        if rng.random() < priced_ratio:
+            price = rng.randint(250, 1200)
+            title = f"Error fare {origin} a {destination} con {airline} por USD {price}"
+            description = (
+                f"Vuelos {origin} - {destination} desde USD {price} ida y vuelta, "
+                f"salidas {date}. Reservar antes de que se corrija la tarifa."
+            )
+        else:
+            title = f"Guía de viaje {origin} {destination}"
+            description = f"Consejos para volar de {origin} a {destination} con {airline}."
+        results.append(
+            {
+                "title": title,
+                "url": f"https://www.{domain}/posts/{slug}",
+                "description": description,
+                "age": f"{rng.randint(1, 6)} days ago",
+            }
+        )
+    return {"web": {"results": results}}
+
+
+def _prompt_kind(body: Dict) -> str:
+    schema = body.get("format")
+    if isinstance(schema, dict):
+        properties = schema.get("properties", {})
+        if "deals" in properties:
+            return "extraction"
+        if "evaluations" in properties:
+            return "batch"
+        return "evaluation"
+    prompt = body.get("prompt", "")
+    if "OFERTAS:\n" in prompt:
+        return "batch"
+    if "RESULTADOS DE BÚSQUEDA" in prompt:
+        return "extraction"
+    return "evaluation"
+
+
+def synth_ollama_response(body: Dict, deals_per_prompt: int) -> Dict:
+    """Objeto JSON que respondería el modelo según el tipo de prompt"""
+    prompt = body.get("prompt", "")
+    rng = random.Random(zlib.crc32(prompt.encode()))
+    kind = _prompt_kind(body)
+    if kind == "extraction":
+        origin, destination = _route_from_text(prompt.split("RESULTADOS DE BÚSQUEDA")[0])
+        dates = re.findall(r"\d{4}-\d{2}-\d{2}", prompt)
+        urls = list(dict.fromkeys(re.findall(r"https?://[^\s\"'<>]+", prompt)))
+        deals = []
+        for url in urls[:deals_per_prompt]:
+            deals.append(
+                {
+                    "airline": rng.choice(AIRLINES),
+                    "origin": origin,
+                    "destination": destination,
+                    "price": rng.randint(250, 1200),
+                    "currency": "USD",
+                    "departure_date": dates[0] if dates else "2026-03-15",
+                    "return_date": None,
+                    "connections": rng.randint(0, 2),
+                    "booking_url": url,
+                    "source": url.split("/")[2],
+                    "reputation_score": rng.randint(60, 90),
+                    "deal_score": rng.randint(40, 95),
+                    "notes": "Tarifa sintética del benchmark",
+                }
+            )
+        return {"deals": deals}
+    if kind == "batch":
+        ids = re.findall(r"^\[(\d+)\] AEROLÍNEA", prompt, re.MULTILINE)
+        return {
+            "evaluations": [
+                {"id": int(i), "confidence": rng.randint(50, 99), "explanation": "Sintética"}
+                for i in ids
+            ]
+        }
+    confidence = rng.randint(50, 99)
+    return {
+        "is_error_fare": confidence >= 85,
+        "confidence": confidence,
+        "explanation": "Sintética",
+        "urgency": "alta" if confidence >= 90 else "media",
+    }
+
+
+class FakeServers:
+    """Brave y Ollama falsos en un único servidor aiohttp, en un hilo propio"""
+
+    def __init__(self, config: Optional[FakeConfig] = None, port: int = 0):
+        self.config = config or FakeConfig()
+        self.port = port
+        self.rng = random.Random(self.config.seed)
+        self.calls = {"brave": 0, "ollama": 0, "brave_errors": 0, "ollama_errors": 0}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _inject_error(self, name: str, rate: float) -> Optional[web.Response]:
+        if rate and self.rng.random() < rate:
+            self.calls[f"{name}_errors"] += 1
+            status = self.rng.choice((429, 500, 503) if name == "brave" else (500, 503))
+            headers = {"Retry-After": "0"} if status == 429 else None
+            return web.json_response({"error": "inyectado"}, status=status, headers=headers)
+        return None
+
+    async def brave(self, request: web.Request) -> web.Response:
+        self.calls["brave"] += 1
+        await asyncio.sleep(self.config.brave_latency.sample(self.rng))
+        error = self._inject_error("brave", self.config.brave_error_rate)
+        if error:
+            return error
+        if self.config.brave_payload is not None:
+            return web.json_response(self.config.brave_payload)
+        query = request.query.get("q", "")
+        offset = int(request.query.get("offset", "0"))
+        count = int(request.query.get("count", "10"))
+        return web.json_response(
+            synth_brave_results(query, offset, count, self.config.priced_ratio)
+        )
+
+    async def generate(self, request: web.Request) -> web.StreamResponse:
+        self.calls["ollama"] += 1
+        body = await request.json()
+        delay = self.config.ollama_latency.sample(self.rng)
+        await asyncio.sleep(delay)
+        error = self._inject_error("ollama", self.config.ollama_error_rate)
+        if error:
+            return error
+
+        if body.get("options", {}).get("num_predict") == 1:
+            text = "{"  # Precalentamiento
+        else:
+            payloads = self.config.ollama_payload or {}
+            data = payloads.get(_prompt_kind(body))
+            if data is None:
+                data = synth_ollama_response(body, self.config.deals_per_prompt)
+            text = json.dumps(data, ensure_ascii=False)
+
+        prompt_tokens = len(body.get("prompt", "")) // 4
+        stats = {
+            "done": True,
+            "load_duration": 0,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(delay * 0.3e9),
+            "eval_count": len(text) // 4,
+            "eval_duration": int(delay * 0.7e9),
+        }
+        if not body.get("stream"):
+            return web.json_response({"response": text, **stats})
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        for i in range(0, len(text), 16):
+            chunk = {"response": text[i:i + 16], "done": False}
+            await response.write((json.dumps(chunk) + "\n").encode())
+        await response.write((json.dumps({"response": "", **stats}) + "\n").encode())
+        await response.write_eof()
+        return response
+
+    async def tags(self, request: web.Request) -> web.Response:
+        return web.json_response({"models": [{"name": self.config.model}]})
+
+    def start(self) -> "FakeServers":
+        app = web.Application()
+        app.router.add_get("/res/v1/web/search", self.brave)
+        app.router.add_post("/api/generate", self.generate)
+        app.router.add_get("/api/tags", self.tags)
+        self._loop = asyncio.new_event_loop()
+        self._runner = web.AppRunner(app, access_log=None)
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+            self._loop.run_until_complete(site.start())
+            self.port = self._runner.addresses[0][1]
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name="fake-servers", daemon=True).start()
+        ready.wait(10)
+        return self
+
+    def stop(self):
+        if self._loop and self._runner:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def make_routes(count: int, seed: int = 42) -> List[Dict]:
+    """Rutas distintas y reproducibles, mezclando domésticas e internacionales"""
+    airports = DOMESTIC_AIRPORTS + INTERNATIONAL_AIRPORTS
+    pairs = list(itertools.permutations(airports, 2))
+    random.Random(seed).shuffle(pairs)
+    return [
+        {
+            "origin": origin,
+            "destination": destination,
+            "name": f"{origin} → {destination}",
+            "days_ahead": 30 + i % 60,
+        }
+        for i, (origin, destination) in enumerate(pairs[:count])
+    ]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentil q (0-100) con interpolación lineal"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def peak_rss_mb() -> float:
+    """Pico de memoria residente del proceso (Linux informa KB, macOS bytes)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_engine(routes: List[Dict]) -> Tuple[List[float], int]:
+    from flight_search import FlightSearchEngine
+
+    latencies, deals = [], 0
+    with FlightSearchEngine() as engine:
+        for route in routes:
+            date = (datetime.now() + timedelta(days=route["days_ahead"])).strftime("%Y-%m-%d")
+            started = time.perf_counter()
+            deals += len(engine.search_error_fares(route["origin"], route["destination"], date))
+            latencies.append(time.perf_counter() - started)
+    return latencies, deals
+
+
+def _run_monitor(routes: List[Dict]) -> Tuple[List[float], int]:
+    import flight_monitor_daemon
+    from flight_monitor_daemon import FlightMonitor
+
+    flight_monitor_daemon.NOTIFY_INTERVAL = 0
+    latencies: List[float] = []
+
+    class BenchMonitor(FlightMonitor):
+        """Monitor que mide cada ruta y no notifica al escritorio"""
+
+        def check_route(self, route):
+            started = time.perf_counter()
+            deals = super().check_route(route)
+            latencies.append(time.perf_counter() - started)
+            return deals
+
+        def send_notification(self, deal):
+            self.sent += 1
+
+    monitor = BenchMonitor(routes)
+    monitor.sent = 0
+    monitor.run_check_cycle()
+    if monitor.engine:
+        monitor.engine.close()
+    return latencies, monitor.sent
+
+
+def run_worker(scenario: str, count: int, result_path: Path):
+    """Corre un escenario en este proceso y escribe el resultado en JSON"""
+    routes = make_routes(count)
+    started = time.perf_counter()
+    latencies, deals = (_run_engine if scenario == ENGINE else _run_monitor)(routes)
+    elapsed = time.perf_counter() - started
+    result = {
+        "scenario": scenario,
+        "routes": count,
+        "seconds": round(elapsed, 3),
+        "throughput": round(count / elapsed, 3) if elapsed else 0.0,
+        "p50": round(percentile(latencies, 50), 4),
+        "p95": round(percentile(latencies, 95), 4),
+        "p99": round(percentile(latencies, 99), 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "deals": deals,
+    }
+    result_path.write_text(json.dumps(result))
+
+
+def run_case(servers: FakeServers, scenario: str, count: int, timeout: float) -> Dict:
+    """Corre un escenario en un proceso aislado (HOME, cachés y RSS propios)"""
+    with tempfile.TemporaryDirectory(prefix="flight-bench-") as home:
+        result_path = Path(home) / "result.json"
+        env = {
+            **os.environ,
+            "HOME": home,
+            "BRAVE_API_KEY": "benchmark",
+            "BRAVE_API_URL": f"{servers.url}/res/v1/web/search",
+            "OLLAMA_URL": servers.url,
+            "OLLAMA_URLS": "",
+            "DEFAULT_MODEL": servers.config.model,
+            "BRAVE_RATE_LIMIT": "0",
+            "TRACE_PROMETHEUS_PORT": "0",
+        }
+        calls_before = dict(servers.calls)
+        process = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--worker", scenario,
+             "--routes", str(count), "--result", str(result_path)],
+            env=env,
+            cwd=str(Path(__file__).parent),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=timeout,
+        )
+        if process.returncode != 0 or not result_path.exists():
+            raise RuntimeError(
+                f"{scenario}/{count} falló (código {process.returncode}): "
+                f"{process.stderr.strip().splitlines()[-1:] or ''}"
+            )
+        result = json.loads(result_path.read_text())
+    for name, value in servers.calls.items():
+        result[f"{name}_calls"] = value - calls_before.get(name, 0)
+    return result
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float = BENCH_TOLERANCE) -> List[str]:
+    """Regresiones frente a la línea base: throughput, p95 o RSS peores que la tolerancia"""
+    regressions = []
+    for result in results:
+        base = baseline.get("results", {}).get(f"{result['scenario']}/{result['routes']}")
+        if not base:
+            continue
+        name = f"{result['scenario']}/{result['routes']}"
+        if base["throughput"] and result["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {result['throughput']:.2f} < {base['throughput']:.2f} rutas/s"
+            )
+        if base["p95"] and result["p95"] > base["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {result['p95']:.3f}s > {base['p95']:.3f}s")
+        if base["peak_rss_mb"] and result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: RSS {result['peak_rss_mb']:.0f} MB > {base['peak_rss_mb']:.0f} MB"
+            )
+    return regressions
+
+
+def save_baseline(results: List[Dict], config: FakeConfig, path: Path = BASELINE_FILE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            key: str(value) if isinstance(value, LatencyDist) else value
+            for key, value in asdict(config).items()
+            if key not in ("brave_payload", "ollama_payload")
+        },
+        "results": {f"{r['scenario']}/{r['routes']}": r for r in results},
+    }
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False))
+
+
+def print_results(results: List[Dict]):
+    table = Table(title="🏁 Benchmark del pipeline (servidores locales)")
+    table.add_column("Escenario")
+    table.add_column("Rutas", justify="right")
+    table.add_column("Rutas/s", justify="right")
+    table.add_column("p50", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("p99", justify="right")
+    table.add_column("RSS MB", justify="right")
+    table.add_column("Brave", justify="right")
+    table.add_column("Ollama", justify="right")
+    table.add_column("Ofertas", justify="right")
+    for r in results:
+        table.add_row(
+            r["scenario"],
+            str(r["routes"]),
+            f"{r['throughput']:.2f}",
+            f"{r['p50']:.3f}s",
+            f"{r['p95']:.3f}s",
+            f"{r['p99']:.3f}s",
+            f"{r['peak_rss_mb']:.0f}",
+            str(r["brave_calls"]),
+            str(r["ollama_calls"]),
+            str(r["deals"]),
+        )
+    console.print(table)
+
+
+def main():
+    """Punto de entrada del benchmark"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark offline del buscador de vuelos")
+    parser.add_argument(
+        "--routes", default=",".join(str(n) for n in ROUTE_COUNTS),
+        help="Cantidades de rutas separadas por coma (default: 1,10,100,1000)",
+    )
+    parser.add_argument(
+        "--scenario", choices=SCENARIOS + ("all",), default="all",
+        help="engine (search_error_fares) o monitor (run_check_cycle)",
+    )
+    parser.add_argument("--brave-latency", default="lognormal:0.02,0.5", help="Latencia de Brave")
+    parser.add_argument("--ollama-latency", default="lognormal:0.05,0.4", help="Latencia de Ollama")
+    parser.add_argument("--brave-errors", type=float, default=0.0, help="Tasa de errores de Brave (0-1)")
+    parser.add_argument("--ollama-errors", type=float, default=0.0, help="Tasa de errores de Ollama (0-1)")
+    parser.add_argument("--brave-payload", type=Path, help="Respuesta JSON de Brave grabada")
+    parser.add_argument(
+        "--ollama-payload", type=Path,
+        help="JSON con respuestas de Ollama por tipo: extraction, evaluation, batch",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de latencias y errores")
+    parser.add_argument("--timeout", type=float, default=3600, help="Segundos máximos por caso")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE, help="Archivo de línea base")
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar como nueva línea base")
+    parser.add_argument("--output", type=Path, help="Guardar los resultados en JSON")
+    parser.add_argument("--worker", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--result", type=Path, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, int(args.routes), args.result)
+        return
+
+    config = FakeConfig(
+        brave_latency=LatencyDist.parse(args.brave_latency),
+        ollama_latency=LatencyDist.parse(args.ollama_latency),
+        brave_error_rate=args.brave_errors,
+        ollama_error_rate=args.ollama_errors,
+        brave_payload=json.loads(args.brave_payload.read_text()) if args.brave_payload else None,
+        ollama_payload=json.loads(args.ollama_payload.read_text()) if args.ollama_payload else None,
+        seed=args.seed,
+    )
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    counts = [int(n) for n in args.routes.split(",") if n]
+
+    servers = FakeServers(config).start()
+    console.print(f"[dim]Servidores falsos en {servers.url} (Brave {config.brave_latency}, Ollama {config.ollama_latency})[/dim]")
+    results = []
+    try:
+        for scenario in scenarios:
+            for count in counts:
+                console.print(f"[cyan]▶ {scenario} con {count} rutas...[/cyan]")
+                try:
+                    results.append(run_case(servers, scenario, count, args.timeout))
+                except (RuntimeError, subprocess.TimeoutExpired) as e:
+                    console.print(f"[red]❌ {e}[/red]")
+    finally:
+        servers.stop()
+
+    print_results(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.baseline.exists():
+        regressions = compare(results, json.loads(args.baseline.read_text()))
+        for regression in regressions:
+            console.print(f"[red]📉 Regresión {regression}[/red]")
+        if not regressions:
+            console.print(f"[green]✅ Sin regresiones frente a {args.baseline}[/green]")
+    else:
+        regressions = []
+        console.print(f"[dim]Sin línea base en {args.baseline} (usar --save-baseline)[/dim]")
+
+    if args.save_baseline:
+        save_baseline(results, config, args.baseline)
+        console.print(f"[green]💾 Línea base guardada en {args.baseline}[/green]")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
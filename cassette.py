@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Cassette - Grabación y reproducción del tráfico HTTP con Brave y Ollama
+En modo record cada pedido sale a la red y el par pedido/respuesta se agrega
+a un archivo JSONL comprimido con gzip; en modo replay las respuestas salen
+del archivo, en el orden grabado y sin red, opcionalmente con sus tiempos
+originales. Sirve para reproducir un ciclo lento sin gastar cuota ni inferencia.
+Al grabar se copia también el estado persistente del motor (cachés, índice de
+casi duplicados, estadísticas de plantillas) junto a la cassette; el replay
+trabaja sobre una copia temporal de ese estado y la descarta al cerrar
+"""
+
+import os
+import gzip
+import json
+import time
+import shutil
+import asyncio
+import sqlite3
+import tempfile
+import threading
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Deque, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+RECORD = "record"
+REPLAY = "replay"
+
+# Grabar o reproducir el tráfico del motor (el flag de la CLI tiene prioridad)
+HTTP_CASSETTE = os.getenv("HTTP_CASSETTE", "")
+HTTP_CASSETTE_MODE = os.getenv("HTTP_CASSETTE_MODE", REPLAY)
+# En replay, esperar lo que tardó cada respuesta original
+HTTP_CASSETTE_TIMING = os.getenv("HTTP_CASSETTE_TIMING", "0") == "1"
+
+# Campos del payload de Ollama que no cambian la respuesta
+IGNORED_BODY_FIELDS = ("keep_alive",)
+
+# Índice del estado copiado al grabar: componente -> archivo (None = desactivado)
+STATE_MANIFEST = "state.json"
+
+
+class CassetteMissError(aiohttp.ClientError):
+    """El pedido no está en la cassette (replay)"""
+
+
+def request_key(method: str, url: str, params: Optional[Dict] = None, body=None) -> str:
+    """Clave estable del pedido: método, ruta, parámetros y cuerpo JSON, sin host"""
+    parts = urlsplit(url)
+    query = sorted((str(k), str(v)) for k, v in (params or {}).items())
+    if isinstance(body, dict):
+        body = {k: v for k, v in body.items() if k not in IGNORED_BODY_FIELDS}
+    return json.dumps(
+        [method.upper(), parts.path, query, body], sort_keys=True, ensure_ascii=False
+    )
+
+
+class _LineReader:
+    """Sustituto de response.content: itera el cuerpo línea por línea"""
+
+    def __init__(self, body: bytes):
+        self._body = body
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[bytes]:
+        for line in self._body.splitlines(keepends=True):
+            yield line
+
+    async def read(self) -> bytes:
+        return self._body
+
+
+class CassetteResponse:
+    """Respuesta grabada con la interfaz de aiohttp que usan los clientes"""
+
+    def __init__(self, method: str, url: str, status: int, headers: Dict, body: bytes):
+        self.method = method
+        self.url = URL(url)
+        self.status = status
+        self.headers = CIMultiDictProxy(CIMultiDict(headers))
+        self.body = body
+        self.content = _LineReader(body)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(
+                aiohttp.RequestInfo(self.url, self.method, self.headers, self.url),
+                (),
+                status=self.status,
+                message=self.body.decode("utf-8", "replace")[:200],
+                headers=self.headers,
+            )
+
+    async def read(self) -> bytes:
+        return self.body
+
+    async def text(self) -> str:
+        return self.body.decode("utf-8", "replace")
+
+    async def json(self, **kwargs):
+        return json.loads(self.body)
+
+
+class Cassette:
+    """Archivo de interacciones HTTP en modo record o replay"""
+
+    def __init__(
+        self,
+        path: Path,
+        mode: str = REPLAY,
+        timing: bool = HTTP_CASSETTE_TIMING,
+        speed: float = 1.0,
+    ):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Modo de cassette desconocido: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.timing = timing
+        self.speed = speed
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        # Instante de la grabación: en replay fija el "ahora" del motor
+        self.recorded_at: float = time.time()
+        self._interactions: Dict[str, Deque[Dict]] = defaultdict(deque)
+        self._last: Dict[str, Dict] = {}
+        self._file = None
+        self._scratch: Optional[tempfile.TemporaryDirectory] = None
+        self._lock = threading.Lock()
+        if mode == REPLAY:
+            self._load()
+
+    @classmethod
+    def from_env(cls) -> Optional["Cassette"]:
+        """Cassette configurada por HTTP_CASSETTE, o None"""
+        if not HTTP_CASSETTE:
+            return None
+        return cls(Path(HTTP_CASSETTE).expanduser(), HTTP_CASSETTE_MODE)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def _load(self):
+        if not self.path.exists():
+            raise FileNotFoundError(f"Cassette no encontrada: {self.path}")
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self._interactions[interaction["key"]].append(interaction)
+                    if "recorded_at" in interaction:
+                        self.recorded_at = interaction["recorded_at"]
+
+    @property
+    def state_dir(self) -> Path:
+        """Directorio con el estado del motor al comenzar la grabación"""
+        return self.path.parent / f"{self.path.name}.state"
+
+    def scratch_path(self, name: str) -> Path:
+        """Archivo en el directorio temporal del replay (se borra al cerrar)"""
+        if self._scratch is None:
+            self._scratch = tempfile.TemporaryDirectory(prefix="cassette-")
+        return Path(self._scratch.name) / name
+
+    def save_state(self, files: Dict[str, Optional[Path]]):
+        """Copia el estado persistente del motor antes del primer pedido
+
+        `files` asocia cada componente con su archivo, o None si está desactivado.
+        """
+        target = self.state_dir
+        shutil.rmtree(target, ignore_errors=True)
+        target.mkdir(parents=True)
+        manifest = {}
+        for name, source in files.items():
+            manifest[name] = None if source is None else f"{name}{Path(source).suffix}"
+            if source is not None and Path(source).exists():
+                _copy_state_file(Path(source), target / manifest[name])
+        (target / STATE_MANIFEST).write_text(json.dumps(manifest, indent=2))
+
+    def restore_state(self) -> Dict[str, Optional[Path]]:
+        """Copia temporal del estado grabado, con el mismo formato que save_state
+
+        Una cassette sin estado devuelve {} (se grabó sin cachés ni índices).
+        """
+        manifest_path = self.state_dir / STATE_MANIFEST
+        if not manifest_path.exists():
+            return {}
+        restored = {}
+        for name, filename in json.loads(manifest_path.read_text()).items():
+            if filename is None:
+                restored[name] = None
+                continue
+            restored[name] = self.scratch_path(filename)
+            if (self.state_dir / filename).exists():
+                shutil.copy2(self.state_dir / filename, restored[name])
+        return restored
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._interactions.values())
+
+    def _write(self, interaction: Dict):
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = gzip.open(self.path, "wt", encoding="utf-8")
+            self._file.write(json.dumps(interaction, ensure_ascii=False) + "\n")
+            # Cada interacción queda completa en disco aunque el proceso muera
+            self._file.flush()
+            self.stats["recorded"] += 1
+
+    def _next(self, key: str) -> Optional[Dict]:
+        """Siguiente respuesta grabada para la clave; repite la última al agotarse"""
+        with self._lock:
+            queue = self._interactions.get(key)
+            if queue:
+                self._last[key] = queue.popleft()
+            interaction = self._last.get(key)
+            self.stats["replayed" if interaction else "misses"] += 1
+            return interaction
+
+    @asynccontextmanager
+    async def request(
+        self,
+        session: Optional[aiohttp.ClientSession],
+        method: str,
+        url: str,
+        **kwargs,
+    ) -> AsyncIterator[CassetteResponse]:
+        """Pedido grabado o reproducido; admite params, json y timeout"""
+        key = request_key(method, url, kwargs.get("params"), kwargs.get("json"))
+        if self.replaying:
+            interaction = self._next(key)
+            if interaction is None:
+                raise CassetteMissError(f"{method} {urlsplit(url).path} no está en {self.path.name}")
+            if self.timing:
+                await asyncio.sleep(interaction["elapsed"] / self.speed)
+            if interaction.get("error") == "timeout":
+                raise asyncio.TimeoutError()
+            if interaction.get("error"):
+                raise aiohttp.ClientConnectionError(interaction["error"])
+            yield CassetteResponse(
+                method,
+                url,
+                interaction["status"],
+                interaction["headers"],
+                interaction["body"].encode("utf-8"),
+            )
+            return
+
+        started = time.perf_counter()
+        interaction = {"key": key, "method": method, "url": url, "recorded_at": self.recorded_at}
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                # El cuerpo se lee completo: un stream cortado se graba entero
+                body = await response.read()
+                status, headers = response.status, dict(response.headers)
+        except asyncio.TimeoutError:
+            self._write({**interaction, "error": "timeout", "elapsed": time.perf_counter() - started})
+            raise
+        except aiohttp.ClientConnectionError as e:
+            self._write({**interaction, "error": str(e) or type(e).__name__, "elapsed": time.perf_counter() - started})
+            raise
+        self._write(
+            {
+                **interaction,
+                "status": status,
+                "headers": headers,
+                "body": body.decode("utf-8", "replace"),
+                "elapsed": round(time.perf_counter() - started, 4),
+            }
+        )
+        yield CassetteResponse(method, url, status, headers, body)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._scratch is not None:
+                self._scratch.cleanup()
+                self._scratch = None
+
+    def summary(self) -> str:
+        if self.replaying:
+            return (
+                f"{self.stats['replayed']} respuestas reproducidas de {self.path}, "
+                f"{self.stats['misses']} pedidos sin grabar"
+            )
+        return f"{self.stats['recorded']} interacciones grabadas en {self.path}"
+
+
+def _copy_state_file(source: Path, destination: Path):
+    """Copia un archivo de estado; las bases SQLite con su API de backup"""
+    if source.suffix != ".sqlite":
+        shutil.copy2(source, destination)
+        return
+    src, dst = sqlite3.connect(source), sqlite3.connect(destination)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+
+class CassetteSession:
+    """Fachada de ClientSession que pasa los pedidos por la cassette"""
+
+    def __init__(self, cassette: Cassette, session: Optional[aiohttp.ClientSession]):
+        self.cassette = cassette
+        self._session = session  # None en replay: no hay red
+
+    def request(self, method: str, url: str, **kwargs):
+        return self.cassette.request(self._session, method, url, **kwargs)
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
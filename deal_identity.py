@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Deal Identity - Identidad normalizada de una oferta para deduplicar
+La misma oferta llega escrita de muchas formas ("LATAM" y "Latam Airlines",
+522.0 y 522, "15/03/2026" y "2026-03-15"). La identidad usa el código IATA
+de la aerolínea, los aeropuertos en mayúsculas, el precio redondeado a un
+escalón por moneda y la fecha en ISO, como tupla hasheable; la búsqueda mira
+también los escalones vecinos (522 y 523 USD quedan de lados distintos de un
+borde). El merge conserva el registro con mejor origen y combina URLs y notas
+"""
+
+import re
+from dataclasses import replace
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from relevance import strip_accents
+
+# Nombres y alias frecuentes (sin tildes, en minúsculas) -> código IATA
+AIRLINE_CODES = {
+    "aerolineas argentinas": "AR",
+    "aerolineas": "AR",
+    "austral": "AR",
+    "latam": "LA",
+    "lan": "LA",
+    "tam": "LA",
+    "jetsmart": "JA",
+    "jet smart": "JA",
+    "flybondi": "FO",
+    "gol": "G3",
+    "azul": "AD",
+    "avianca": "AV",
+    "copa": "CM",
+    "sky": "H2",
+    "iberia": "IB",
+    "air europa": "UX",
+    "level": "IB",
+    "american": "AA",
+    "delta": "DL",
+    "united": "UA",
+    "air france": "AF",
+    "klm": "KL",
+    "lufthansa": "LH",
+    "british": "BA",
+    "ita": "AZ",
+    "alitalia": "AZ",
+    "tap": "TP",
+    "turkish": "TK",
+    "emirates": "EK",
+    "qatar": "QR",
+    "ethiopian": "ET",
+    "singapore": "SQ",
+    "japan": "JL",
+    "aeromexico": "AM",
+    "arajet": "DM",
+    "paranair": "ZP",
+}
+
+# Sufijos que no distinguen aerolíneas ("Latam Airlines" == "LATAM")
+AIRLINE_SUFFIXES = re.compile(
+    r"\b(airlines?|airways|air lines|lineas aereas|linhas aereas|group|s\.?a\.?)\b"
+)
+
+# Escalón de precio por moneda: dentro del escalón es la misma oferta
+PRICE_BUCKETS = {
+    "USD": 5,
+    "EUR": 5,
+    "GBP": 5,
+    "BRL": 25,
+    "MXN": 100,
+    "ARS": 5000,
+    "CLP": 5000,
+}
+DEFAULT_PRICE_BUCKET = 5
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d/%m/%y", "%d %b %Y", "%b %d %Y")
+MONTHS_ES = {
+    "enero": "jan", "febrero": "feb", "marzo": "mar", "abril": "apr", "mayo": "may",
+    "junio": "jun", "julio": "jul", "agosto": "aug", "septiembre": "sep",
+    "setiembre": "sep", "octubre": "oct", "noviembre": "nov", "diciembre": "dec",
+}
+
+DealIdentity = Tuple[str, str, str, int, str, str]
+
+
+def airline_code(airline: Optional[str]) -> str:
+    """Código IATA de la aerolínea, o su nombre normalizado si no se conoce"""
+    name = strip_accents(airline or "").strip()
+    if re.fullmatch(r"[a-z0-9]{2}", name):
+        return name.upper()  # Ya es un código
+    name = " ".join(AIRLINE_SUFFIXES.sub(" ", name.replace(",", " ")).split())
+    if name in AIRLINE_CODES:
+        return AIRLINE_CODES[name]
+    # "Iberia Express", "American" dentro de un nombre más largo
+    for alias, code in AIRLINE_CODES.items():
+        if re.search(rf"\b{re.escape(alias)}\b", name):
+            return code
+    return name
+
+
+def price_step(currency: Optional[str]) -> float:
+    """Tamaño del escalón de precio de la moneda"""
+    return PRICE_BUCKETS.get((currency or "").upper(), DEFAULT_PRICE_BUCKET)
+
+
+def price_bucket(price: float, currency: Optional[str]) -> int:
+    """Escalón del precio según la moneda (522 y 522.0 caen en el mismo)"""
+    return int(round(float(price or 0) / price_step(currency)))
+
+
+def iso_date(value: Optional[str]) -> str:
+    """Fecha en formato ISO; si no se reconoce, el texto normalizado"""
+    text = strip_accents(value or "").strip().replace(",", "")
+    if not text:
+        return ""
+    text = re.sub(r"\bde\b", " ", text)
+    for spanish, english in MONTHS_ES.items():
+        text = re.sub(rf"\b{spanish}\b", english, text)
+    text = " ".join(text.split())
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return text
+
+
+def deal_identity(deal) -> DealIdentity:
+    """Identidad hasheable de una oferta (FlightDeal)"""
+    currency = (deal.currency or "").upper()
+    return (
+        airline_code(deal.airline),
+        (deal.origin or "").upper(),
+        (deal.destination or "").upper(),
+        price_bucket(deal.price, currency),
+        currency,
+        iso_date(deal.departure_date),
+    )
+
+
+def find_duplicate(index: Dict[DealIdentity, object], key: DealIdentity, deal):
+    """Oferta del índice con la misma identidad, tolerando escalones vecinos
+
+    En un escalón vecino solo cuenta si el precio difiere menos de un escalón.
+    """
+    if key in index:
+        return index[key]
+    step = price_step(key[4])
+    for bucket in (key[3] - 1, key[3] + 1):
+        other = index.get(key[:3] + (bucket,) + key[4:])
+        if other is not None and abs(float(other.price or 0) - float(deal.price or 0)) < step:
+            return other
+    return None
+
+
+def source_rank(deal) -> Tuple:
+    """Calidad del origen: URL real, más fuentes y reputación"""
+    return (
+        bool(deal.booking_url and deal.booking_url.startswith("http")),
+        len(deal.source_urls),
+        deal.reputation_score or 0,
+    )
+
+
+def absorb_sources(kept, other, prefer_other: bool = False):
+    """Suma a `kept` las URLs y notas de `other` sin tocar su puntaje ni su origen"""
+    urls = [kept.booking_url, *kept.source_urls, other.booking_url, *other.source_urls]
+    notes = [note for note in (kept.notes, other.notes) if note]
+    if prefer_other:
+        urls.insert(0, other.booking_url)
+        notes.reverse()
+    kept.source_urls = [url for url in dict.fromkeys(urls) if url]
+    kept.notes = " | ".join(dict.fromkeys(notes))
+
+
+def merge_deals(kept, other):
+    """Combina `other` en `kept` (misma identidad), en el lugar
+
+    Si `other` tiene mejor origen, `kept` toma su URL, fuente, reputación y
+    puntaje (el puntaje acompaña al registro que se conserva); las URLs de
+    ambos y las notas distintas se conservan.
+    """
+    better = source_rank(other) > source_rank(kept)
+    absorb_sources(kept, other, prefer_other=better)
+    if better:
+        kept.booking_url = other.booking_url
+        kept.source = other.source
+        kept.reputation_score = other.reputation_score
+        kept.deal_score = other.deal_score
+
+
+def copy_deal(deal):
+    """Copia de la oferta para poder combinarla sin tocar la original"""
+    return replace(deal, source_urls=list(deal.source_urls))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Deal Schema - Esquemas JSON para la salida estructurada de Ollama
+Los modelos pydantic definen lo que el LLM puede devolver: su JSON schema se
+envía en el parámetro `format` y los validadores compilados revisan cada
+oferta por separado, descartando solo las inválidas
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    TypeAdapter,
+    ValidationError,
+    field_validator,
+)
+
+
+class DealModel(BaseModel):
+    """Oferta tal como la devuelve el modelo (mismos campos que FlightDeal)
+
+    Los campos sin valor por defecto quedan en `required` del JSON schema: con
+    salida estructurada el modelo está obligado a escribirlos.
+    """
+
+    model_config = ConfigDict(extra="ignore")
+
+    # Los modelos suelen devolver null cuando el texto no nombra la aerolínea
+    airline: Optional[str]
+    origin: str
+    destination: str
+    price: float = Field(ge=0)
+    currency: str
+    departure_date: Optional[str] = ""
+    return_date: Optional[str] = None
+    connections: Optional[int] = Field(0, ge=0)
+    booking_url: str
+    source: str = ""
+    reputation_score: float = 70.0
+    deal_score: float = 50.0
+    notes: str = ""
+
+    @field_validator("airline")
+    @classmethod
+    def _unknown_airline(cls, value: Optional[str]) -> str:
+        return value or "Desconocida"
+
+
+class EvaluationModel(BaseModel):
+    """Evaluación de una sola oferta"""
+
+    model_config = ConfigDict(extra="ignore")
+
+    is_error_fare: bool
+    confidence: float = Field(ge=0, le=100)
+    explanation: str
+    urgency: str = "media"
+
+
+class BatchItemModel(BaseModel):
+    """Evaluación de una oferta dentro de un lote numerado"""
+
+    model_config = ConfigDict(extra="ignore")
+
+    id: int
+    confidence: float = Field(ge=0, le=100)
+    explanation: str = "No disponible"
+
+
+def _array_schema(key: str, item: type) -> Dict:
+    """Objeto {key: [item, ...]} con el esquema del item en línea (sin $ref)"""
+    return {
+        "type": "object",
+        "properties": {key: {"type": "array", "items": item.model_json_schema()}},
+        "required": [key],
+    }
+
+
+# Esquemas para el parámetro `format` de /api/generate
+EXTRACTION_SCHEMA = _array_schema("deals", DealModel)
+EVALUATION_SCHEMA = EvaluationModel.model_json_schema()
+BATCH_EVALUATION_SCHEMA = _array_schema("evaluations", BatchItemModel)
+
+# Validadores compilados una sola vez
+_deal_validator = TypeAdapter(DealModel)
+_evaluation_validator = TypeAdapter(EvaluationModel)
+_batch_item_validator = TypeAdapter(BatchItemModel)
+
+
+def load_json_object(content: str) -> Optional[Dict]:
+    """Objeto JSON de la respuesta; con salida libre busca el primer {...}"""
+    try:
+        data = json.loads(content)
+    except ValueError:
+        # Modelos o versiones de Ollama sin `format`: texto alrededor del JSON
+        match = re.search(r"\{.*\}", content or "", re.DOTALL)
+        if not match:
+            return None
+        try:
+            data = json.loads(match.group())
+        except ValueError:
+            return None
+    return data if isinstance(data, dict) else None
+
+
+def validate_items(items: Any, validator: TypeAdapter) -> Tuple[List[BaseModel], List[str]]:
+    """Valida cada elemento por separado: (válidos, errores de los rechazados)"""
+    valid, errors = [], []
+    for item in items if isinstance(items, list) else []:
+        try:
+            valid.append(validator.validate_python(item))
+        except ValidationError as e:
+            errors.append(f"{e.error_count()} errores: {e.errors()[0]['loc']} {e.errors()[0]['msg']}")
+    return valid, errors
+
+
+def validate_deal(item: Any) -> DealModel:
+    """Valida una oferta; lanza ValidationError si no cumple el esquema"""
+    return _deal_validator.validate_python(item)
+
+
+def validate_evaluation(data: Any) -> EvaluationModel:
+    """Valida la evaluación de una oferta"""
+    return _evaluation_validator.validate_python(data)
+
+
+def validate_batch_items(items: Any) -> Tuple[List[BatchItemModel], List[str]]:
+    """Valida las evaluaciones de un lote, una por una"""
+    return validate_items(items, _batch_item_validator)
@@ -17,14 +17,18 @@ from dataclasses import asdict
 
 # Añadir path del proyecto
 sys.path.insert(0, str(Path(__file__).parent))
-from flight_search import FlightSearchEngine, FlightDeal
+from flight_search import OLLAMA_WARMUP, FlightSearchEngine, FlightDeal
 from price_history import PriceHistoryTracker
+from resilience import breaker_states
+from stopping import StopPolicy
+from tracing import SAVE, TRACE_PROMETHEUS_PORT, start_metrics_server, tracer
 
 # Configuración
 STATE_FILE = Path.home() / ".config" / "flight-monitor" / "state.json"
 LOG_FILE = Path.home() / ".config" / "flight-monitor" / "monitor.log"
 CHECK_INTERVAL = 300  # 5 minutos
 ALERT_THRESHOLD = 90  # Score mínimo para banda negativa
+NOTIFY_INTERVAL = 2  # Segundos entre notificaciones
 
 
 class FlightMonitor:
@@ -34,6 +38,7 @@ class FlightMonitor:
         self.routes = routes
         self.engine = None
         self.known_deals: Set[str] = set()
+        self.price_tracker = PriceHistoryTracker()
         
         # Crear directorios
         STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
@@ -71,7 +76,7 @@ class FlightMonitor:
                 'known_deals': list(self.known_deals),
                 'last_update': datetime.now().isoformat()
             }
-            with open(STATE_FILE, 'w') as f:
+            with tracer.span(SAVE, kind="state"), open(STATE_FILE, 'w') as f:
                 json.dump(data, f, indent=2)
         except Exception as e:
             self.logger.error(f"Error guardando estado: {e}")
@@ -222,8 +227,28 @@ class FlightMonitor:
         try:
             if not self.engine:
                 self.engine = FlightSearchEngine()
+                # Mantener el modelo cargado entre ciclos
+                self.engine.ollama.keep_alive = f"{CHECK_INTERVAL * 2}s"
+                # Precalentar acá y no al construir el motor: los dashboards lo
+                # crean dentro de la búsqueda y no deben quedar bloqueados
+                if OLLAMA_WARMUP:
+                    self.engine.ollama.warm_up()
+                # El historial también decide qué ofertas confirma el modelo grande
+                self.engine.price_history = self.price_tracker
+                # Con una banda negativa nueva confirmada, el resto de consultas sobra
+                policy = StopPolicy.from_env()
+                policy.max_deals = policy.max_deals or 1
+                policy.min_score = ALERT_THRESHOLD
+                policy.ignore = lambda deal: self.deal_fingerprint(deal) in self.known_deals
+                self.engine.stop_policy = policy
+            # k del pre-ranking propio de la ruta ("top_k" en la configuración)
+            if route.get('top_k') is not None:
+                self.engine.route_top_k[f"{origin}-{destination}".upper()] = route['top_k']
             
             deals = self.engine.search_error_fares(origin, destination, date)
+            report = self.engine.last_report
+            if report and report.stopped_reason:
+                self.logger.info(f"⏹️ Corte anticipado {report.summary()}")
             
             # Filtrar solo bandas negativas
             black_friday_deals = [
@@ -300,6 +325,7 @@ class FlightMonitor:
         """Ejecuta un ciclo de verificación completo"""
         self.logger.info("=" * 60)
         self.logger.info(f"🚀 Iniciando ciclo de verificación")
+        cycle = tracer.start_cycle()
         
         total_new_deals = 0
         
@@ -311,10 +337,54 @@ class FlightMonitor:
             for deal in new_deals:
                 self.send_notification(deal)
                 total_new_deals += 1
-                time.sleep(2)  # Evitar spam de notificaciones
+                time.sleep(NOTIFY_INTERVAL)  # Evitar spam de notificaciones
         
         self.save_state()
         
+        # Backends con el circuito abierto (Brave u Ollama caídos)
+        for name, state in breaker_states().items():
+            if state['state'] != 'closed':
+                self.logger.warning(
+                    f"⚡ Circuito {name}: {state['state']} "
+                    f"({state['total_failures']} fallos, {state['rejected']} llamadas evitadas)"
+                )
+        
+        if self.engine:
+            metrics = self.engine.ollama.metrics_summary()
+            if metrics['calls']:
+                self.logger.info(
+                    f"🧠 Ollama: {metrics['calls']} llamadas, "
+                    f"carga media {metrics['avg_load_duration_ms']:.0f} ms, "
+                    f"prompt medio {metrics['avg_prompt_eval_duration_ms']:.0f} ms "
+                    f"(~{metrics.get('avg_prompt_tokens_est', 0):.0f} tokens)"
+                )
+            cascade = self.engine.cascade_stats
+            if self.engine.ollama.fast_model and cascade['evaluated']:
+                self.logger.info(
+                    f"🪜 Cascada: {cascade['finalists']}/{cascade['evaluated']} ofertas al modelo grande "
+                    f"(extracción {cascade['extraction_seconds']:.1f}s, "
+                    f"chico {cascade['fast_seconds']:.1f}s, grande {cascade['large_seconds']:.1f}s)"
+                )
+            for node in self.engine.ollama.pool.snapshot():
+                if not node['healthy']:
+                    self.logger.warning(
+                        f"🖥️ Nodo Ollama {node['url']} fuera del pool: {node['last_error']}"
+                    )
+        
+        # Tiempo por etapa del ciclo, sumando todas las rutas
+        stages: Dict[str, float] = {}
+        for route_stages in tracer.by_route(cycle).values():
+            for stage, stats in route_stages.items():
+                stages[stage] = stages.get(stage, 0.0) + stats['seconds']
+        if stages:
+            self.logger.info(
+                "⏱️ Etapas: " + ", ".join(
+                    f"{stage} {seconds:.1f}s"
+                    for stage, seconds in sorted(stages.items(), key=lambda item: -item[1])
+                )
+            )
+        tracer.flush()
+        
         self.logger.info(f"✅ Ciclo completado: {total_new_deals} nuevas bandas negativas")
         self.logger.info("=" * 60)
 
@@ -323,6 +393,8 @@ class FlightMonitor:
         self.logger.info("🛫 Flight Monitor Daemon iniciado")
         self.logger.info(f"📍 Monitoreando {len(self.routes)} rutas")
         self.logger.info(f"⏱️ Intervalo: {CHECK_INTERVAL}s ({CHECK_INTERVAL/60:.1f} min)")
+        if start_metrics_server():
+            self.logger.info(f"📈 Métricas Prometheus en http://127.0.0.1:{TRACE_PROMETHEUS_PORT}/metrics")
         
         while True:
             try:
@@ -337,6 +409,10 @@ class FlightMonitor:
             except Exception as e:
                 self.logger.error(f"❌ Error en ciclo: {e}")
                 time.sleep(60)  # Esperar 1 min antes de reintentar
+        
+        # Liberar conexiones persistentes con Brave y Ollama
+        if self.engine:
+            self.engine.close()
 
 
 def main():
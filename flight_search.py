@@ -1,21 +1,143 @@
 import os
 import json
-import re
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass, asdict
-from datetime import datetime, timedelta
+import time
+import asyncio
+from collections import deque
+from typing import AsyncIterator, List, Dict, Optional, Sequence, Tuple, Union
+from dataclasses import dataclass, asdict, field
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-import requests
+import aiohttp
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn
 
+from cassette import RECORD, REPLAY, Cassette
+from http_pool import PoolConfig, PooledSession, run_sync
+from ollama_pool import OllamaNode, OllamaPool, parse_endpoints
+from rate_limit import QuotaLedger, TokenBucket, shared_bucket
+from resilience import RetryPolicy, call_with_retry, get_breaker
+from response_cache import CACHE_DIR, ResponseCache, make_key, normalize_query
+from price_extractor import filter_priced_results, split_direct_deals
+from json_stream import IncrementalJSONParser
+from pydantic import ValidationError
+from deal_schema import (
+    BATCH_EVALUATION_SCHEMA,
+    EVALUATION_SCHEMA,
+    EXTRACTION_SCHEMA,
+    load_json_object,
+    validate_batch_items,
+    validate_deal,
+    validate_evaluation,
+)
+from result_pool import ResultPool, canonicalize_url
+from deal_identity import (
+    DealIdentity,
+    absorb_sources,
+    copy_deal,
+    deal_identity,
+    find_duplicate,
+    merge_deals,
+)
+from near_duplicates import NEAR_DUP, Cluster, NearDuplicateIndex, search_key
+from relevance import RELEVANCE_RANKING, RELEVANCE_TOP_K, parse_route_top_k, rank_results
+from prompt_budget import (
+    PROMPT_DESCRIPTION_TOKENS,
+    PROMPT_TOKEN_BUDGET,
+    chunk_by_budget,
+    estimate_tokens,
+    pack_results,
+)
+from template_stats import TEMPLATE_HIT_SCORE, TEMPLATE_STATS, TemplateStats, route_type
+from tracing import (
+    BRAVE,
+    DEDUP,
+    EVALUATION,
+    JSON_PARSE,
+    OLLAMA_GENERATE,
+    PROMPT_BUILD,
+    SAVE,
+    VALIDATION,
+    tracer,
+)
+from stopping import STOP_TIME_BUDGET, SearchReport, StopPolicy, StopState
+from query_planner import (
+    ALL_MODES,
+    CHEAP_MODE,
+    CONNECTIONS_MODE,
+    ERROR_MODE,
+    PlannedQuery,
+    QueryPlanner,
+)
+
 load_dotenv()
 
 console = Console()
 
+# Consultas Brave/Ollama simultáneas por ruta en la búsqueda asíncrona
+MAX_CONCURRENT_QUERIES = int(os.getenv("MAX_CONCURRENT_QUERIES", "4"))
+
+# Caché en disco de respuestas Brave (TTL en segundos, 0 = desactivada)
+BRAVE_CACHE_TTL = float(os.getenv("BRAVE_CACHE_TTL", "3600"))
+BRAVE_CACHE_MAX_ENTRIES = int(os.getenv("BRAVE_CACHE_MAX_ENTRIES", "2000"))
+BRAVE_CACHE_BYPASS = os.getenv("BRAVE_CACHE_BYPASS", "0") == "1"
+
+# Límites del plan de Brave: peticiones/segundo, ráfaga y cuotas (0 = sin límite)
+BRAVE_RATE_LIMIT = float(os.getenv("BRAVE_RATE_LIMIT", "1"))
+BRAVE_BURST = int(os.getenv("BRAVE_BURST", "1"))
+BRAVE_DAILY_QUOTA = int(os.getenv("BRAVE_DAILY_QUOTA", "0"))
+BRAVE_MONTHLY_QUOTA = int(os.getenv("BRAVE_MONTHLY_QUOTA", "0"))
+# Páginas de resultados por consulta: las siguientes solo si la anterior dio ofertas
+BRAVE_MAX_PAGES = int(os.getenv("BRAVE_MAX_PAGES", "2"))
+BRAVE_MAX_RETRY_WAIT = float(os.getenv("BRAVE_MAX_RETRY_WAIT", "10"))
+# Endpoint de Brave (para apuntar a un servidor local en benchmarks)
+BRAVE_API_URL = os.getenv("BRAVE_API_URL", "https://api.search.brave.com/res/v1/web/search")
+
+# Caché de extracciones Ollama por contenido (TTL en segundos, 0 = desactivada)
+OLLAMA_CACHE_TTL = float(os.getenv("OLLAMA_CACHE_TTL", "86400"))
+OLLAMA_CACHE_MAX_ENTRIES = int(os.getenv("OLLAMA_CACHE_MAX_ENTRIES", "5000"))
+
+# Evaluación por lotes: ofertas por prompt y tope de caracteres por lote
+EVAL_BATCH_SIZE = int(os.getenv("EVAL_BATCH_SIZE", "8"))
+EVAL_BATCH_MAX_CHARS = int(os.getenv("EVAL_BATCH_MAX_CHARS", "4000"))
+
+# Pre-etapa por regex: descartar resultados sin precio / ofertas directas sin LLM
+PRICE_PREFILTER = os.getenv("PRICE_PREFILTER", "1") == "1"
+PRICE_FAST_PATH = os.getenv("PRICE_FAST_PATH", "0") == "1"
+
+# Extracción en streaming con corte anticipado (0 = sin tope de ofertas)
+OLLAMA_STREAM = os.getenv("OLLAMA_STREAM", "0") == "1"
+OLLAMA_MAX_DEALS = int(os.getenv("OLLAMA_MAX_DEALS", "0"))
+
+# Salida JSON restringida por esquema (parámetro `format`, Ollama >= 0.5)
+OLLAMA_STRUCTURED = os.getenv("OLLAMA_STRUCTURED", "1") == "1"
+
+# Cascada: modelo chico para extracción y primera evaluación ("" = desactivada)
+FAST_MODEL = os.getenv("FAST_MODEL", "")
+# Puntaje provisional (o histórico) desde el que una oferta pasa al modelo grande
+CASCADE_MIN_SCORE = float(os.getenv("CASCADE_MIN_SCORE", "70"))
+
+# Ciclo de vida del modelo: tiempo en memoria entre llamadas y precarga al iniciar
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "10m")
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1") == "1"
+
+# Ventana de contexto del modelo (0 = la del modelo); acota el presupuesto del prompt
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "0"))
+# Tokens de la ventana reservados para la respuesta
+OLLAMA_OUTPUT_RESERVE = 1024
+
+# Métricas de tiempo que Ollama devuelve en cada respuesta (nanosegundos/tokens)
+OLLAMA_METRIC_FIELDS = (
+    "total_duration",
+    "load_duration",
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "eval_count",
+    "eval_duration",
+)
+
 
 @dataclass
 class FlightDeal:
@@ -34,6 +156,8 @@ class FlightDeal:
     reputation_score: float  # 0-100
     deal_score: float  # Indica si es "banda negativa" (error de precio)
     notes: str = ""
+    # Todas las URLs donde apareció la oferta (copias en otros agregadores)
+    source_urls: List[str] = field(default_factory=list)
 
     def to_dict(self) -> Dict:
         return asdict(self)
@@ -42,13 +166,47 @@ class FlightDeal:
 class BraveSearchClient:
     """Cliente para la API de Brave Search"""
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        pool_config: Optional[PoolConfig] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
         self.api_key = api_key
-        self.base_url = "https://api.search.brave.com/res/v1/web/search"
+        self.base_url = BRAVE_API_URL
         self.headers = {"X-Subscription-Token": api_key, "Accept": "application/json"}
+        self.http = PooledSession(pool_config, headers=self.headers)
 
-    def search(self, query: str, count: int = 20) -> List[Dict]:
-        """Realiza búsqueda web con Brave"""
+        if cache is None and BRAVE_CACHE_TTL > 0:
+            cache = ResponseCache(
+                CACHE_DIR / "brave_cache.sqlite",
+                ttl=BRAVE_CACHE_TTL,
+                max_entries=BRAVE_CACHE_MAX_ENTRIES,
+            )
+        self.cache = cache
+        self.cache_bypass = BRAVE_CACHE_BYPASS
+
+        self.breaker = get_breaker("brave")
+        self.retry_policy = RetryPolicy.from_env(retry_on_timeout=True)
+
+        # Cuota en disco y limitador guardado en el mismo archivo: compartidos
+        # por todos los clientes y procesos (daemon y dashboards)
+        self.quota = QuotaLedger(
+            daily_limit=BRAVE_DAILY_QUOTA, monthly_limit=BRAVE_MONTHLY_QUOTA
+        )
+        self.rate_limiter = shared_bucket(
+            "brave", BRAVE_RATE_LIMIT, BRAVE_BURST, ledger=self.quota
+        )
+
+    def remaining_budget(self) -> Dict:
+        """Cuota restante para que los llamadores puedan autorregularse"""
+        return self.quota.remaining()
+
+    # Brave acepta offset de 0 a 9 (en páginas de `count` resultados)
+    MAX_OFFSET = 9
+
+    def _build_params(self, query: str, count: int, offset: int = 0) -> Dict:
+        """Parámetros comunes de la búsqueda web"""
         params = {
             "q": query,
             "count": count,
@@ -56,44 +214,113 @@ class BraveSearchClient:
             "country": "AR",
             "freshness": "week",
         }
+        if offset:
+            params["offset"] = min(offset, self.MAX_OFFSET)
+        return params
+
+    def _cache_key(self, params: Dict) -> str:
+        """Clave de caché: consulta normalizada más el resto de parámetros"""
+        extra = {k: v for k, v in params.items() if k != "q"}
+        return make_key("brave", normalize_query(params["q"]), extra)
+
+    def search(
+        self, query: str, count: int = 20, use_cache: bool = True, offset: int = 0
+    ) -> Optional[List[Dict]]:
+        """Realiza búsqueda web con Brave (`offset` = página de resultados)
+
+        Devuelve None si la búsqueda falló (error, 429, circuito abierto o
+        cuota agotada); una lista vacía significa que no hubo resultados.
+        """
+        return run_sync(self.search_async(query, count, use_cache, offset))
+
+    async def search_async(
+        self, query: str, count: int = 20, use_cache: bool = True, offset: int = 0
+    ) -> Optional[List[Dict]]:
+        """Versión asíncrona de search sobre el pool de conexiones del cliente"""
+        results, _ = await self.search_page_async(query, count, use_cache, offset)
+        return results
+
+    async def search_page_async(
+        self, query: str, count: int = 20, use_cache: bool = True, offset: int = 0
+    ) -> Tuple[Optional[List[Dict]], bool]:
+        """Como search_async, indicando además si se consumió cuota de Brave
+
+        Los resultados son None si la página no se pudo obtener (error,
+        circuito abierto o cuota agotada), para no confundirla con una vacía.
+        """
+        params = self._build_params(query, count, offset)
+        cache_key = self._cache_key(params) if self.cache is not None else None
+
+        # Con bypass se ignora la lectura pero se refresca la entrada
+        if cache_key and use_cache and not self.cache_bypass:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached, False
+
+        if await asyncio.to_thread(self.quota.exhausted):
+            console.print("[yellow]⚠️ Cuota de Brave agotada: búsqueda omitida[/yellow]")
+            return None, False
 
         try:
-            response = requests.get(
-                self.base_url, headers=self.headers, params=params, timeout=30
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data.get("web", {}).get("results", [])
+            with tracer.span(BRAVE, query=query, offset=offset) as span:
+                results = await call_with_retry(
+                    lambda: self._fetch_async(params), self.breaker, self.retry_policy
+                )
+                span["results"] = len(results)
         except Exception as e:
             console.print(f"[red]Error en búsqueda Brave: {e}[/red]")
-            return []
+            return None, False
+
+        if cache_key:
+            self.cache.set(cache_key, results)
+        return results, True
+
+    async def _fetch_async(self, params: Dict) -> List[Dict]:
+        """Petición a Brave respetando el rate limit y los Retry-After
+
+        Un 429 se reintenta una sola vez si el Retry-After es corto; si no, o
+        si se repite, se propaga como error para que el llamador lo registre.
+        El registro de cuota es un archivo bloqueado: se lee y escribe en un
+        hilo, una vez antes y otra después de cada petición.
+        """
+        retried = False
+        while True:
+            # Bloqueos por 429 registrados por cualquier proceso
+            blocked = await asyncio.to_thread(self.quota.blocked_for)
+            if blocked > 0:
+                self.rate_limiter.pause(blocked)
+            await self.rate_limiter.acquire()
+
+            async with self.http.session().get(
+                self.base_url,
+                params=params,
+                timeout=aiohttp.ClientTimeout(total=30),
+            ) as response:
+                await asyncio.to_thread(
+                    self.quota.record_response, response.headers, response.status
+                )
 
+                if response.status == 429:
+                    wait = await asyncio.to_thread(self.quota.blocked_for)
+                    self.rate_limiter.pause(wait)
+                    if not retried and wait <= BRAVE_MAX_RETRY_WAIT:
+                        console.print(f"[yellow]⚠️ Brave limitó la tasa (429): reintento en {wait:.0f}s[/yellow]")
+                        retried = True
+                        continue
 
-class OllamaAnalyzer:
-    """Analiza resultados usando modelos locales de Ollama"""
+                response.raise_for_status()
+                data = await response.json()
+                return data.get("web", {}).get("results", [])
 
-    def __init__(
-        self, base_url: str = "http://localhost:11434", model: str = "llama3.1:8b"
-    ):
-        self.base_url = base_url
-        self.model = model
+    def close(self):
+        """Cierra las conexiones abiertas con Brave"""
+        self.http.close()
 
-    def analyze_flight_data(
-        self, search_results: List[Dict], context: str
-    ) -> List[FlightDeal]:
-        """Analiza resultados de búsqueda y extrae ofertas de vuelo"""
-
-        # Preparar contexto para el modelo
-        results_text = "\n\n".join(
-            [
-                f"Título: {r.get('title', '')}\n"
-                f"URL: {r.get('url', '')}\n"
-                f"Descripción: {r.get('description', '')}"
-                for r in search_results[:10]
-            ]
-        )
 
-        prompt = f"""
+# Bloques de instrucciones estáticos: van al inicio de cada prompt para que
+# todas las llamadas compartan el mismo prefijo y Ollama reutilice su caché KV.
+# Los datos variables (contexto, resultados, ofertas) se agregan siempre al final.
+EXTRACTION_INSTRUCTIONS = """
 Eres un experto en búsqueda de vuelos baratos y errores de precio ("banda negativa").
 
 REGLAS ESTRICTAS:
@@ -108,12 +335,6 @@ VALIDACIÓN DE PRECIOS:
 - Si ves un precio < USD 200 para vuelos internacionales, DESCÁRTALO (es error)
 - El precio debe estar mencionado en el título o descripción del resultado
 
-CONTEXTO DE BÚSQUEDA:
-{context}
-
-RESULTADOS DE BÚSQUEDA (extraídos de Brave Search):
-{results_text}
-
 INSTRUCCIONES:
 1. Lee cada resultado cuidadosamente
 2. Busca precios explícitos en título o descripción
@@ -122,15 +343,15 @@ INSTRUCCIONES:
 5. Si tienes dudas, NO incluyas el resultado
 
 Responde en formato JSON con esta estructura EXACTA:
-{{
+{
     "deals": [
-        {{
+        {
             "airline": "Nombre de aerolínea (si está en el título/descripción)",
-            "origin": "{context.split()[4] if len(context.split()) > 4 else 'origen'}",
-            "destination": "{context.split()[6] if len(context.split()) > 6 else 'destino'}", 
+            "origin": "Código IATA de origen del CONTEXTO DE BÚSQUEDA",
+            "destination": "Código IATA de destino del CONTEXTO DE BÚSQUEDA",
             "price": 0.0,
             "currency": "USD",
-            "departure_date": "{context.split()[-1] if 'fecha' in context else 'null'}",
+            "departure_date": "Fecha de salida YYYY-MM-DD o null",
             "return_date": null,
             "connections": 0,
             "booking_url": "COPIA EXACTA de la URL del resultado",
@@ -138,84 +359,15 @@ Responde en formato JSON con esta estructura EXACTA:
             "reputation_score": 70.0,
             "deal_score": 50.0,
             "notes": "Copia exacta de dónde viste el precio"
-        }}
+        }
     ]
-}}
+}
 
-IMPORTANTE: Si no hay precios claros y reales, devuelve lista vacía: {{"deals": []}}
+IMPORTANTE: Si no hay precios claros y reales, devuelve lista vacía: {"deals": []}
 """
 
-        try:
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={"model": self.model, "prompt": prompt, "stream": False},
-                timeout=120,
-            )
-            response.raise_for_status()
-            result = response.json()
-
-            # Extraer JSON de la respuesta
-            content = result.get("response", "")
-            json_match = re.search(r"\{.*\}", content, re.DOTALL)
-
-            if json_match:
-                data = json.loads(json_match.group())
-                deals = []
-                for deal_data in data.get("deals", []):
-                    try:
-                        deal_data.setdefault("airline", "Desconocida")
-                        deal_data.setdefault("origin", "")
-                        deal_data.setdefault("destination", "")
-                        deal_data.setdefault("price", 0.0)
-                        deal_data.setdefault("currency", "USD")
-                        deal_data.setdefault("departure_date", "")
-                        deal_data.setdefault("connections", 0)
-                        deal_data.setdefault("booking_url", "")
-                        deal_data.setdefault("source", "")
-                        deal_data.setdefault("reputation_score", 70.0)
-                        deal_data.setdefault("deal_score", 50.0)
-                        deal_data.setdefault("notes", "")
-                        
-                        # VALIDACIÓN: Filtrar precios absurdamente bajos
-                        price = float(deal_data.get("price", 0))
-                        booking_url = deal_data.get("booking_url", "")
-                        
-                        # Validar precio realista
-                        if price < 200 and deal_data.get("currency") == "USD":
-                            console.print(f"[yellow]⚠️ Precio sospechoso descartado: {price} USD (demasiado bajo para ruta internacional)[/yellow]")
-                            continue
-                        
-                        # Validar que tenga URL real (no generada)
-                        if not booking_url or booking_url.startswith("http") == False:
-                            console.print(f"[yellow]⚠️ Deal descartado: sin URL válida[/yellow]")
-                            continue
-                        
-                        # Log para debugging
-                        console.print(f"[green]✓ Deal validado: {deal_data.get('airline')} ${price} - {booking_url[:50]}...[/green]")
-                        
-                        deal = FlightDeal(**deal_data)
-                        deals.append(deal)
-                    except Exception as e:
-                        console.print(f"[yellow]Error parseando oferta: {e}[/yellow]")
-                return deals
-
-            return []
-
-        except Exception as e:
-            console.print(f"[red]Error en análisis Ollama: {e}[/red]")
-            return []
-
-    def evaluate_deal_quality(self, deal: FlightDeal) -> Tuple[float, str]:
-        """Evalúa la calidad de una oferta y determina si es error de precio"""
-
-        prompt = f"""
-Evalúa esta oferta de vuelo y determina si es un error de precio ("banda negativa"):
-
-AEROLÍNEA: {deal.airline}
-ORIGEN: {deal.origin} → DESTINO: {deal.destination}
-PRECIO: {deal.currency} {deal.price}
-CONEXIONES: {deal.connections}
-REPUTACIÓN: {deal.reputation_score}/100
+EVALUATION_INSTRUCTIONS = """
+Evalúa esta oferta de vuelo y determina si es un error de precio ("banda negativa").
 
 Analiza:
 1. Si el precio es anormalmente bajo para esta ruta
@@ -223,36 +375,683 @@ Analiza:
 3. Puntaje de oportunidad (0-100)
 
 Responde en formato JSON:
-{{
+{
     "is_error_fare": true/false,
     "confidence": 0-100,
     "explanation": "explicación detallada",
     "urgency": "alta/media/baja"
-}}
+}
 """
 
+BATCH_EVALUATION_INSTRUCTIONS = """
+Evalúa cada una de las ofertas de vuelo numeradas al final y determina si es un error de precio ("banda negativa").
+
+Para cada oferta analiza:
+1. Si el precio es anormalmente bajo para esa ruta
+2. Si hay señales de error de precio (disponibilidad limitada, restricciones inusuales)
+3. Puntaje de oportunidad (0-100)
+
+Responde en formato JSON con UNA evaluación por oferta, usando su número como "id":
+{
+    "evaluations": [
+        {
+            "id": 1,
+            "is_error_fare": true/false,
+            "confidence": 0-100,
+            "explanation": "explicación breve",
+            "urgency": "alta/media/baja"
+        }
+    ]
+}
+"""
+
+
+class OllamaAnalyzer:
+    """Analiza resultados usando modelos locales de Ollama"""
+
+    # Incrementar al modificar el prompt de extracción: invalida la caché
+    EXTRACTION_PROMPT_VERSION = 4
+
+    # Resultados de búsqueda incluidos en cada prompt de extracción
+    MAX_RESULTS_PER_PROMPT = 10
+
+    def __init__(
+        self,
+        base_url: Union[str, Sequence[str]] = "http://localhost:11434",
+        model: str = "llama3.1:8b",
+        pool_config: Optional[PoolConfig] = None,
+        cache: Optional[ResponseCache] = None,
+        fast_model: Optional[str] = None,
+    ):
+        # Uno o varios nodos: "url[|modelo], url[|modelo], ..."
+        self.model = model
+        self.fast_model = fast_model or None
+        self.http = PooledSession(pool_config)
+        self.pool = OllamaPool(
+            parse_endpoints(base_url),
+            self.http,
+            default_model=model,
+            extra_models=[self.fast_model] if self.fast_model else [],
+        )
+        self.base_url = self.pool.nodes[0].url
+
+        if cache is None and OLLAMA_CACHE_TTL > 0:
+            cache = ResponseCache(
+                CACHE_DIR / "ollama_cache.sqlite",
+                ttl=OLLAMA_CACHE_TTL,
+                max_entries=OLLAMA_CACHE_MAX_ENTRIES,
+            )
+        self.cache = cache
+        self.retry_policy = RetryPolicy.from_env()
+        self.price_prefilter = PRICE_PREFILTER
+        self.price_fast_path = PRICE_FAST_PATH
+        self.streaming = OLLAMA_STREAM
+        self.max_stream_deals = OLLAMA_MAX_DEALS or None
+        self.keep_alive = OLLAMA_KEEP_ALIVE
+        self.structured_output = OLLAMA_STRUCTURED
+        self.num_ctx = OLLAMA_NUM_CTX
+        self.prompt_budget = PROMPT_TOKEN_BUDGET
+        if self.num_ctx:
+            self.prompt_budget = min(self.prompt_budget, self.num_ctx - OLLAMA_OUTPUT_RESERVE)
+        self.description_tokens = PROMPT_DESCRIPTION_TOKENS
+        self.relevance_ranking = RELEVANCE_RANKING
+        self.relevance_top_k = RELEVANCE_TOP_K
+        # "Ahora" fijo para la antigüedad de los resultados (replay); None = reloj
+        self.clock: Optional[datetime] = None
+        self.last_metrics: Dict = {}
+        self.last_prompt_stats: Dict = {}
+        self.metrics: Dict = {
+            "calls": 0,
+            "prompts": 0,
+            "prompt_tokens_est": 0,
+            **{field: 0 for field in OLLAMA_METRIC_FIELDS},
+        }
+
+    @property
+    def extraction_model(self) -> Optional[str]:
+        """Modelo de extracción: el chico de la cascada si está configurado
+
+        Sin cascada es None, para que cada nodo use su modelo fijo o el por
+        defecto (ver _payload).
+        """
+        return self.fast_model
+
+    def models(self) -> List[str]:
+        """Modelos que puede usar una generación sin modelo explícito"""
+        return sorted({node.model or self.model for node in self.pool.nodes})
+
+    def _results_budget(self, context: str) -> int:
+        """Tokens disponibles para los resultados tras instrucciones y contexto"""
+        fixed = estimate_tokens(EXTRACTION_INSTRUCTIONS) + estimate_tokens(context) + 20
+        return max(1, self.prompt_budget - fixed)
+
+    def _compact_results(self, search_results: List[Dict], context: str) -> List[str]:
+        """Bloques compactos de los resultados que entran en el presupuesto"""
+        blocks, _ = pack_results(
+            search_results,
+            self._results_budget(context),
+            self.MAX_RESULTS_PER_PROMPT,
+            self.description_tokens,
+        )
+        return blocks
+
+    def select_results(
+        self,
+        search_results: List[Dict],
+        origin: Optional[str],
+        destination: Optional[str],
+        top_k: Optional[int] = None,
+    ) -> List[Dict]:
+        """Los k resultados más relevantes para la ruta, del mejor al peor"""
+        if not self.relevance_ranking or not origin or not destination:
+            return search_results
+        k = self.relevance_top_k if top_k is None else top_k
+        selected = rank_results(search_results, origin, destination, k, now=self.clock)
+        if len(selected) < len(search_results):
+            console.print(
+                f"[dim]Pre-ranking: {len(selected)} de {len(search_results)} resultados "
+                f"para {origin}→{destination}[/dim]"
+            )
+        return selected
+
+    def chunk_results(self, search_results: List[Dict], context: str) -> List[List[Dict]]:
+        """Reparte los resultados en grupos que entran en un prompt cada uno"""
+        return list(
+            chunk_by_budget(
+                search_results,
+                self._results_budget(context),
+                self.MAX_RESULTS_PER_PROMPT,
+                self.description_tokens,
+            )
+        )
+
+    def _extraction_cache_key(self, search_results: List[Dict], context: str) -> str:
+        """Clave por contenido: modelo, versión del prompt, contexto y snippets"""
+        return make_key(
+            "ollama-extract",
+            self.extraction_model or self.models(),
+            self.EXTRACTION_PROMPT_VERSION,
+            normalize_query(context),
+            self._compact_results(search_results, context),
+        )
+
+    def invalidate_cache(self):
+        """Descarta todas las extracciones cacheadas (cambio de prompt o modelo)"""
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _build_extraction_prompt(self, search_results: List[Dict], context: str) -> str:
+        """Construye el prompt de extracción de ofertas dentro del presupuesto"""
+
+        with tracer.span(PROMPT_BUILD) as span:
+            # Preparar contexto para el modelo
+            blocks = self._compact_results(search_results, context)
+            results_text = "\n\n".join(blocks)
+
+            prompt = (
+                f"{EXTRACTION_INSTRUCTIONS}\n"
+                f"CONTEXTO DE BÚSQUEDA:\n{context}\n\n"
+                f"RESULTADOS DE BÚSQUEDA (extraídos de Brave Search):\n{results_text}\n"
+            )
+
+            tokens = estimate_tokens(prompt)
+            span.update(results=len(blocks), tokens_est=tokens)
+
+        self.last_prompt_stats = {
+            "results": len(blocks),
+            "dropped": min(len(search_results), self.MAX_RESULTS_PER_PROMPT) - len(blocks),
+            "chars": len(prompt),
+            "tokens_est": tokens,
+        }
+        self.metrics["prompts"] += 1
+        self.metrics["prompt_tokens_est"] += tokens
+        console.print(
+            f"[dim]Prompt de extracción: {len(blocks)} resultados, "
+            f"~{tokens} tokens ({len(prompt)} caracteres)[/dim]"
+        )
+        return prompt
+
+    def _validate_deal(self, deal_data: Dict) -> Optional[FlightDeal]:
+        """Valida una oferta extraída por el modelo contra el esquema y las reglas"""
         try:
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={"model": self.model, "prompt": prompt, "stream": False},
-                timeout=60,
+            with tracer.span(VALIDATION):
+                deal = validate_deal(deal_data)
+        except ValidationError as e:
+            error = e.errors()[0]
+            console.print(
+                f"[yellow]⚠️ Oferta rechazada por el esquema: "
+                f"{'.'.join(str(loc) for loc in error['loc'])} {error['msg']}[/yellow]"
             )
-            response.raise_for_status()
-            result = response.json()
-            content = result.get("response", "")
+            return None
+
+        # VALIDACIÓN: Filtrar precios absurdamente bajos
+        price = deal.price
+        booking_url = deal.booking_url
+
+        # Validar precio realista
+        if price < 200 and deal.currency == "USD":
+            console.print(f"[yellow]⚠️ Precio sospechoso descartado: {price} USD (demasiado bajo para ruta internacional)[/yellow]")
+            return None
+
+        # Validar que tenga URL real (no generada)
+        if not booking_url.startswith("http"):
+            console.print(f"[yellow]⚠️ Deal descartado: sin URL válida[/yellow]")
+            return None
+
+        # Log para debugging
+        console.print(f"[green]✓ Deal validado: {deal.airline} ${price} - {booking_url[:50]}...[/green]")
 
-            json_match = re.search(r"\{.*\}", content, re.DOTALL)
-            if json_match:
-                data = json.loads(json_match.group())
-                confidence = data.get("confidence", 50)
-                explanation = data.get("explanation", "No disponible")
-                return confidence, explanation
+        return FlightDeal(**deal.model_dump())
 
-            return 50, "No se pudo evaluar"
+    def _parse_deals(self, content: str) -> List[FlightDeal]:
+        """Extrae y valida las ofertas del JSON devuelto por el modelo
+
+        Cada oferta se valida por separado: una inválida no descarta el resto.
+        """
+        with tracer.span(JSON_PARSE, kind="extraction"):
+            data = load_json_object(content)
+        if not data or not isinstance(data.get("deals"), list):
+            return []
+
+        deals = []
+        for deal_data in data["deals"]:
+            deal = self._validate_deal(deal_data)
+            if deal:
+                deals.append(deal)
+        return deals
+
+    def _payload(
+        self,
+        prompt: str,
+        stream: bool,
+        node: Optional[OllamaNode] = None,
+        schema: Optional[Dict] = None,
+        model: Optional[str] = None,
+        **options,
+    ) -> Dict:
+        """Cuerpo de /api/generate con keep_alive, esquema y opciones del modelo
+
+        Sin `model` explícito se usa el modelo fijo del nodo o el por defecto.
+        """
+        payload = {
+            "model": model or (node.model if node else None) or self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+        }
+        if schema and self.structured_output:
+            payload["format"] = schema
+        if self.num_ctx:
+            options.setdefault("num_ctx", self.num_ctx)
+        if options:
+            payload["options"] = options
+        return payload
+
+    def _record_metrics(self, result: Dict) -> Dict:
+        """Acumula load_duration, prompt_eval_duration, etc. de una respuesta"""
+        metrics = {
+            field: result[field] for field in OLLAMA_METRIC_FIELDS if field in result
+        }
+        self.last_metrics = metrics
+        self.metrics["calls"] += 1
+        for field, value in metrics.items():
+            self.metrics[field] += value
+        return metrics
+
+    def metrics_summary(self) -> Dict:
+        """Promedios por llamada en milisegundos (y tokens) para monitoreo"""
+        calls = self.metrics["calls"]
+        if not calls:
+            return {"calls": 0}
+        summary = {"calls": calls}
+        if self.metrics["prompts"]:
+            summary["avg_prompt_tokens_est"] = (
+                self.metrics["prompt_tokens_est"] / self.metrics["prompts"]
+            )
+        for field in OLLAMA_METRIC_FIELDS:
+            if field.endswith("_count"):
+                summary[f"avg_{field}"] = self.metrics[field] / calls
+            else:
+                summary[f"avg_{field}_ms"] = self.metrics[field] / calls / 1e6
+        return summary
+
+    async def _generate_async(
+        self,
+        prompt: str,
+        timeout: float,
+        node: Optional[OllamaNode] = None,
+        schema: Optional[Dict] = None,
+        model: Optional[str] = None,
+        **options,
+    ) -> str:
+        """Lanza una generación en Ollama y devuelve el texto de la respuesta
+
+        Sin `node`, cada intento va al nodo del pool con menos carga, de modo
+        que un reintento tras un fallo cae en otra instancia.
+        """
+
+        # El pool registra cada resultado en el breaker del nodo usado
+        with tracer.span(OLLAMA_GENERATE, model=model or self.model) as span:
+
+            async def post() -> Dict:
+                async with self.pool.lease(node) as target:
+                    payload = self._payload(prompt, False, target, schema, model, **options)
+                    span["model"] = payload["model"]
+                    async with self.http.session().post(
+                        f"{target.url}/api/generate",
+                        json=payload,
+                        timeout=aiohttp.ClientTimeout(total=timeout),
+                    ) as response:
+                        response.raise_for_status()
+                        return await response.json()
+
+            result = await call_with_retry(post, None, self.retry_policy)
+            span.update(self._record_metrics(result))
+        return result.get("response", "")
+
+    def warm_up(self) -> bool:
+        """Carga los modelos y precalienta el prefijo común de los prompts"""
+        return run_sync(self.warm_up_async())
+
+    async def warm_up_async(self) -> bool:
+        """Versión asíncrona de warm_up: precalienta todos los nodos del pool
+
+        Cada nodo carga todos los modelos que puede recibir (el suyo o el
+        grande y, con cascada, también FAST_MODEL), uno después del otro.
+        """
+
+        async def warm(node: OllamaNode, model: str) -> bool:
+            try:
+                # Un solo token: basta para cargar el modelo y procesar el prefijo
+                await self._generate_async(
+                    EXTRACTION_INSTRUCTIONS,
+                    timeout=300,
+                    node=node,
+                    model=model,
+                    num_predict=1,
+                )
+            except Exception as e:
+                console.print(
+                    f"[yellow]⚠️ No se pudo precalentar {model} en {node.url}: {e}[/yellow]"
+                )
+                return False
+            load_ms = self.last_metrics.get("load_duration", 0) / 1e6
+            console.print(f"[dim]Modelo {model} listo en {node.url} (carga: {load_ms:.0f} ms)[/dim]")
+            return True
+
+        async def warm_node(node: OllamaNode) -> List[bool]:
+            return [await warm(node, model) for model in self.pool.node_models(node)]
+
+        await self.pool.health_check()
+        nodes = [node for node in self.pool.nodes if node.healthy]
+        warmed = await asyncio.gather(*(warm_node(node) for node in nodes))
+        return any(any(results) for results in warmed)
+
+    async def _generate_stream_async(
+        self,
+        prompt: str,
+        timeout: float,
+        schema: Optional[Dict] = None,
+        model: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """Generación en streaming: produce los tokens a medida que llegan
+
+        Ollama responde NDJSON, una línea por fragmento. Cerrar el generador
+        corta la conexión y con ello la generación en curso. No se reintenta:
+        solo se informa el resultado al breaker del nodo elegido.
+        """
+        with tracer.span(OLLAMA_GENERATE, model=model or self.model, stream=True) as span:
+            async with self.pool.lease() as node:
+                payload = self._payload(prompt, True, node, schema, model)
+                span["model"] = payload["model"]
+                async with self.http.session().post(
+                    f"{node.url}/api/generate",
+                    json=payload,
+                    timeout=aiohttp.ClientTimeout(total=timeout),
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.content:
+                        if not line.strip():
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("response"):
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            # El último fragmento trae las métricas de tiempo
+                            span.update(self._record_metrics(chunk))
+                            break
+
+    async def stream_flight_deals_async(
+        self,
+        search_results: List[Dict],
+        context: str,
+        max_deals: Optional[int] = None,
+    ) -> AsyncIterator[FlightDeal]:
+        """Produce cada oferta en cuanto el modelo termina de escribirla
+
+        La generación se cancela al cerrarse el objeto JSON principal o al
+        alcanzar `max_deals`, evitando pagar tokens de texto sobrante.
+        """
+        prompt = self._build_extraction_prompt(search_results, context)
+        parser = IncrementalJSONParser("deals")
+        content: List[str] = []
+        emitted = 0
+
+        stream = self._generate_stream_async(
+            prompt, timeout=120, schema=EXTRACTION_SCHEMA, model=self.extraction_model
+        )
+        try:
+            async for token in stream:
+                content.append(token)
+                for deal_data in parser.feed(token):
+                    deal = self._validate_deal(deal_data)
+                    if deal:
+                        emitted += 1
+                        yield deal
+                    if max_deals and emitted >= max_deals:
+                        return
+                if parser.done:
+                    return
+        finally:
+            await stream.aclose()
+
+        # El modelo no produjo un objeto reconocible: intento clásico sobre el texto
+        if not parser.started:
+            for deal in self._parse_deals("".join(content)):
+                yield deal
+
+    def analyze_flight_data(
+        self,
+        search_results: List[Dict],
+        context: str,
+        origin: Optional[str] = None,
+        destination: Optional[str] = None,
+        top_k: Optional[int] = None,
+    ) -> List[FlightDeal]:
+        """Analiza resultados de búsqueda y extrae ofertas de vuelo"""
+        return run_sync(
+            self.analyze_flight_data_async(search_results, context, origin, destination, top_k)
+        )
+
+    async def analyze_flight_data_async(
+        self,
+        search_results: List[Dict],
+        context: str,
+        origin: Optional[str] = None,
+        destination: Optional[str] = None,
+        top_k: Optional[int] = None,
+        strict: bool = False,
+    ) -> List[FlightDeal]:
+        """Versión asíncrona de analyze_flight_data
+
+        Antes del LLM descarta los resultados sin precio, con la ruta conocida
+        se queda con los `top_k` más relevantes y, con el fast-path activo,
+        resuelve sin modelo los inequívocos. Con `strict` un fallo de Ollama se
+        propaga en lugar de devolver una lista vacía.
+        """
+        if self.price_prefilter:
+            search_results = filter_priced_results(search_results)
+            if not search_results:
+                return []
+        search_results = self.select_results(search_results, origin, destination, top_k)
+
+        direct_deals: List[FlightDeal] = []
+        if self.price_fast_path and origin and destination:
+            direct, search_results = split_direct_deals(
+                search_results, origin, destination
+            )
+            direct_deals = [FlightDeal(**deal_data) for deal_data in direct]
+            if not search_results:
+                return direct_deals
+
+        # Todos los resultados, en prompts que entran en el presupuesto y en paralelo
+        batches = await asyncio.gather(
+            *(
+                self._extract_with_llm_async(chunk, context, strict)
+                for chunk in self.chunk_results(search_results, context)
+            )
+        )
+        return direct_deals + [deal for deals in batches for deal in deals]
+
+    async def _extract_with_llm_async(
+        self, search_results: List[Dict], context: str, strict: bool = False
+    ) -> List[FlightDeal]:
+        """Extrae ofertas con Ollama, consultando antes la caché por contenido"""
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._extraction_cache_key(search_results, context)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return [FlightDeal(**deal_data) for deal_data in cached]
+
+        try:
+            if self.streaming:
+                deals = [
+                    deal
+                    async for deal in self.stream_flight_deals_async(
+                        search_results, context, self.max_stream_deals
+                    )
+                ]
+            else:
+                prompt = self._build_extraction_prompt(search_results, context)
+                content = await self._generate_async(
+                    prompt,
+                    timeout=120,
+                    schema=EXTRACTION_SCHEMA,
+                    model=self.extraction_model,
+                )
+
+                # Extraer JSON de la respuesta
+                deals = self._parse_deals(content)
+
+        except Exception as e:
+            console.print(f"[red]Error en análisis Ollama: {e}[/red]")
+            if strict:
+                raise
+            return []
+
+        if cache_key:
+            self.cache.set(cache_key, [deal.to_dict() for deal in deals])
+        return deals
+
+    def _build_evaluation_prompt(self, deal: FlightDeal) -> str:
+        """Construye el prompt de evaluación de una oferta"""
+        return (
+            f"{EVALUATION_INSTRUCTIONS}\n"
+            f"AEROLÍNEA: {deal.airline}\n"
+            f"ORIGEN: {deal.origin} → DESTINO: {deal.destination}\n"
+            f"PRECIO: {deal.currency} {deal.price}\n"
+            f"CONEXIONES: {deal.connections}\n"
+            f"REPUTACIÓN: {deal.reputation_score}/100\n"
+        )
+
+    def _parse_evaluation(self, content: str) -> Tuple[float, str]:
+        """Extrae confianza y explicación de la evaluación del modelo"""
+        with tracer.span(JSON_PARSE, kind="evaluation"):
+            data = load_json_object(content)
+        if data is not None:
+            try:
+                evaluation = validate_evaluation(data)
+            except ValidationError:
+                return 50, "No se pudo evaluar"
+            return evaluation.confidence, evaluation.explanation
+
+        return 50, "No se pudo evaluar"
+
+    def evaluate_deal_quality(
+        self, deal: FlightDeal, model: Optional[str] = None
+    ) -> Tuple[float, str]:
+        """Evalúa la calidad de una oferta y determina si es error de precio"""
+        return run_sync(self.evaluate_deal_quality_async(deal, model))
+
+    async def evaluate_deal_quality_async(
+        self, deal: FlightDeal, model: Optional[str] = None
+    ) -> Tuple[float, str]:
+        """Versión asíncrona de evaluate_deal_quality"""
+        prompt = self._build_evaluation_prompt(deal)
+
+        try:
+            content = await self._generate_async(
+                prompt, timeout=60, schema=EVALUATION_SCHEMA, model=model
+            )
+            return self._parse_evaluation(content)
 
         except Exception as e:
             return 50, f"Error: {e}"
 
+    def _build_batch_evaluation_prompt(self, deals: List[FlightDeal]) -> str:
+        """Construye un prompt que evalúa varias ofertas numeradas a la vez"""
+        deals_text = "\n".join(
+            f"[{i}] AEROLÍNEA: {deal.airline} | RUTA: {deal.origin} → {deal.destination} | "
+            f"PRECIO: {deal.currency} {deal.price} | CONEXIONES: {deal.connections} | "
+            f"REPUTACIÓN: {deal.reputation_score}/100"
+            for i, deal in enumerate(deals, 1)
+        )
+
+        return f"{BATCH_EVALUATION_INSTRUCTIONS}\nOFERTAS:\n{deals_text}\n"
+
+    def _parse_batch_evaluation(
+        self, content: str, size: int
+    ) -> Dict[int, Tuple[float, str]]:
+        """Extrae las evaluaciones por id; omite las ausentes o inválidas"""
+        with tracer.span(JSON_PARSE, kind="batch_evaluation"):
+            data = load_json_object(content)
+        if not data:
+            return {}
+
+        items, _ = validate_batch_items(data.get("evaluations"))
+        scores = {}
+        for item in items:
+            if 1 <= item.id <= size:
+                scores[item.id - 1] = (item.confidence, item.explanation)
+        return scores
+
+    def _chunk_for_evaluation(self, deals: List[FlightDeal]) -> List[List[FlightDeal]]:
+        """Parte la lista en lotes que caben en la ventana de contexto"""
+        chunks: List[List[FlightDeal]] = []
+        current: List[FlightDeal] = []
+        current_chars = 0
+
+        for deal in deals:
+            deal_chars = len(deal.airline or "") + len(deal.origin or "") + len(
+                deal.destination or ""
+            ) + 120
+            if current and (
+                len(current) >= EVAL_BATCH_SIZE
+                or current_chars + deal_chars > EVAL_BATCH_MAX_CHARS
+            ):
+                chunks.append(current)
+                current, current_chars = [], 0
+            current.append(deal)
+            current_chars += deal_chars
+
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def evaluate_deals_batch(
+        self, deals: List[FlightDeal], model: Optional[str] = None
+    ) -> List[Tuple[float, str]]:
+        """Evalúa varias ofertas con una sola generación por lote"""
+        return run_sync(self.evaluate_deals_batch_async(deals, model))
+
+    async def evaluate_deals_batch_async(
+        self, deals: List[FlightDeal], model: Optional[str] = None
+    ) -> List[Tuple[float, str]]:
+        """Versión asíncrona de evaluate_deals_batch
+
+        Devuelve (confianza, explicación) en el mismo orden que `deals`. Las
+        ofertas que el modelo no evalúa correctamente se reintentan una a una.
+        """
+        if len(deals) == 1:
+            return [await self.evaluate_deal_quality_async(deals[0], model)]
+
+        results: List[Tuple[float, str]] = []
+        for chunk in self._chunk_for_evaluation(deals):
+            prompt = self._build_batch_evaluation_prompt(chunk)
+            try:
+                content = await self._generate_async(
+                    prompt,
+                    timeout=60 + 15 * len(chunk),
+                    schema=BATCH_EVALUATION_SCHEMA,
+                    model=model,
+                )
+                scores = self._parse_batch_evaluation(content, len(chunk))
+            except Exception as e:
+                console.print(f"[yellow]Evaluación por lote fallida, reintentando por oferta: {e}[/yellow]")
+                scores = {}
+
+            for i, deal in enumerate(chunk):
+                if i not in scores:
+                    scores[i] = await self.evaluate_deal_quality_async(deal, model)
+                results.append(scores[i])
+
+        return results
+
+    def close(self):
+        """Cierra las conexiones abiertas con Ollama"""
+        self.http.close()
+
 
 class FlightSearchEngine:
     """Motor principal de búsqueda de vuelos"""
@@ -293,65 +1092,626 @@ class FlightSearchEngine:
         "Flybondi": 70,
     }
 
-    def __init__(self):
+    def __init__(self, cassette: Optional[Cassette] = None, model: Optional[str] = None):
+        if cassette is None:
+            cassette = Cassette.from_env()
         brave_key = os.getenv("BRAVE_API_KEY")
+        if not brave_key and cassette is not None and cassette.replaying:
+            brave_key = "replay"  # En replay no se contacta a Brave
         if not brave_key:
             raise ValueError("BRAVE_API_KEY no configurada en variables de entorno")
 
         self.brave = BraveSearchClient(brave_key)
         self.ollama = OllamaAnalyzer(
-            os.getenv("OLLAMA_URL", "http://localhost:11434"),
-            os.getenv("DEFAULT_MODEL", "llama3.1:8b"),
+            os.getenv("OLLAMA_URLS") or os.getenv("OLLAMA_URL", "http://localhost:11434"),
+            # El modelo se fija aquí: el precalentamiento (warm_up) usa este
+            model or os.getenv("DEFAULT_MODEL", "llama3.1:8b"),
+            fast_model=FAST_MODEL,
         )
+        self.cassette = cassette
+
+        # Al menos una tarea por nodo de Ollama para aprovechar todo el pool
+        self.max_concurrency = max(MAX_CONCURRENT_QUERIES, len(self.ollama.pool.nodes))
+        self.template_stats = TemplateStats() if TEMPLATE_STATS else None
+        # Grupos de resultados casi iguales entre consultas y ciclos
+        self.near_duplicates = NearDuplicateIndex() if NEAR_DUP else None
+        # k del pre-ranking por ruta ("EZE-MAD"); el resto usa RELEVANCE_TOP_K
+        self.route_top_k: Dict[str, int] = parse_route_top_k()
+        self.planner = QueryPlanner(stats=self.template_stats)
+        if cassette is not None:
+            self._use_cassette(cassette)
+
+        # Cascada de modelos: historial opcional (PriceHistoryTracker) para
+        # promover ofertas y registro de decisiones/latencias por etapa
+        self.cascade_min_score = CASCADE_MIN_SCORE
+        self.price_history = None
+        self.routing_log: deque = deque(maxlen=500)
+
+        # Corte anticipado por ruta (desactivado salvo configuración)
+        self.stop_policy = StopPolicy.from_env()
+        self.last_report: Optional[SearchReport] = None
+        self.cascade_stats = {
+            "evaluated": 0,
+            "finalists": 0,
+            "extraction_seconds": 0.0,
+            "fast_seconds": 0.0,
+            "large_seconds": 0.0,
+        }
 
-    def search_error_fares(
-        self, origin: str, destination: str, date: str
+    def _use_cassette(self, cassette: Cassette):
+        """Pasa todo el tráfico HTTP por la cassette
+
+        Al grabar, el motor es el de producción (cachés, casi duplicados y
+        estadísticas de plantillas activos) y su estado se copia junto a la
+        cassette. El replay parte de una copia temporal de ese estado, con el
+        reloj de las cachés y del pre-ranking fijo en el momento de la
+        grabación, sin rate limit y con una cuota temporal: hace exactamente
+        los pedidos grabados sin tocar el estado real.
+        """
+        self.brave.http.cassette = cassette
+        self.ollama.http.cassette = cassette
+        self.ollama.clock = datetime.fromtimestamp(cassette.recorded_at, timezone.utc)
+        if not cassette.replaying:
+            cassette.save_state(
+                {
+                    "brave_cache": self.brave.cache and self.brave.cache.path,
+                    "ollama_cache": self.ollama.cache and self.ollama.cache.path,
+                    "near_duplicates": self.near_duplicates and self.near_duplicates.path,
+                    "template_stats": self.template_stats and self.template_stats.path,
+                }
+            )
+        else:
+            self._replay_state(cassette)
+
+        console.print(
+            f"[dim]Cassette HTTP en modo {cassette.mode}: {cassette.path}"
+            + (f" ({len(cassette)} interacciones)" if cassette.replaying else "")
+            + "[/dim]"
+        )
+
+    def _replay_state(self, cassette: Cassette):
+        """Reemplaza cachés, índice, estadísticas y cuota por copias temporales"""
+        state = cassette.restore_state()
+
+        def clock() -> float:
+            return cassette.recorded_at
+
+        def cache(old: Optional[ResponseCache], path: Optional[Path]):
+            if old is None or path is None:
+                return None
+            return ResponseCache(path, ttl=old.ttl, max_entries=old.max_entries, clock=clock)
+
+        self.brave.cache = cache(self.brave.cache, state.get("brave_cache"))
+        self.ollama.cache = cache(self.ollama.cache, state.get("ollama_cache"))
+
+        path = state.get("near_duplicates")
+        old = self.near_duplicates
+        self.near_duplicates = (
+            NearDuplicateIndex(
+                path,
+                threshold=old.threshold,
+                max_entries=old.max_entries,
+                ttl_days=old.ttl / 86400,
+                clock=clock,
+            )
+            if old is not None and path is not None
+            else None
+        )
+
+        path = state.get("template_stats")
+        old = self.template_stats
+        self.template_stats = (
+            TemplateStats(path, min_runs=old.min_runs, explore_rate=old.explore_rate)
+            if old is not None and path is not None
+            else None
+        )
+        self.planner.stats = self.template_stats
+
+        self.brave.rate_limiter = TokenBucket(0)
+        self.brave.quota = QuotaLedger(cassette.scratch_path("brave_quota.json"))
+
+    def close(self):
+        """Libera los pools de conexiones de Brave y Ollama y exporta las trazas"""
+        self.brave.close()
+        self.ollama.close()
+        if self.cassette is not None:
+            self.cassette.close()
+            console.print(f"[dim]Cassette: {self.cassette.summary()}[/dim]")
+        tracer.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _plan(
+        self, origin: str, destination: str, date: str, modes: Sequence[str]
+    ) -> List[PlannedQuery]:
+        """Plan de consultas de la ruta, informando las plantillas podadas"""
+        plan = self.planner.plan(origin, destination, date, modes)
+        if self.planner.pruned:
+            console.print(
+                f"[dim]Omitidas {len(self.planner.pruned)} plantillas sin ofertas "
+                f"en rutas {route_type(origin, destination)}[/dim]"
+            )
+        return plan
+
+    async def _fetch_pages_async(
+        self, pages: List[Tuple[PlannedQuery, int]], semaphore: asyncio.Semaphore
+    ) -> List[Tuple[Optional[List[Dict]], bool, float]]:
+        """Lanza las consultas (consulta, página) a Brave en paralelo
+
+        Devuelve por página (resultados o None si falló, si consumió cuota, segundos).
+        """
+
+        async def fetch(
+            planned: PlannedQuery, offset: int
+        ) -> Tuple[Optional[List[Dict]], bool, float]:
+            async with semaphore:
+                started = time.perf_counter()
+                results, fetched = await self.brave.search_page_async(
+                    planned.query, count=planned.count, offset=offset
+                )
+                return results, fetched, time.perf_counter() - started
+
+        # gather conserva el orden de las consultas al combinar resultados
+        return await asyncio.gather(*(fetch(planned, offset) for planned, offset in pages))
+
+    async def _analyze_results_async(
+        self,
+        results: List[Dict],
+        context: str,
+        origin: str,
+        destination: str,
+        semaphore: asyncio.Semaphore,
     ) -> List[FlightDeal]:
-        """Busca errores de precio (bandas negativas)"""
-
-        queries = [
-            f"error fare {origin} {destination} {date}",
-            f"banda negativa vuelo {origin} {destination}",
-            f"mistake fare flight {origin} to {destination}",
-            f"vuelo barato error precio {origin} {destination}",
-            f"oferta vuelo error {origin} {destination} site:secretflying.com",
-            f"vuelo {origin} {destination} {date} site:fly4free.com",
+        """Analiza los resultados más relevantes en prompts independientes y en paralelo
+
+        Con el índice de casi duplicados, solo el representante de cada grupo
+        llega al LLM y los grupos ya analizados en otro ciclo reutilizan sus
+        ofertas; cada oferta conserva las URLs de todas las copias.
+        """
+        if self.ollama.price_prefilter:
+            results = filter_priced_results(results)
+        route = f"{origin}-{destination}".upper()
+        # Las ofertas extraídas dependen de la fecha y el contexto, no solo de la ruta
+        index_key = search_key(route, context)
+
+        clusters: List[Cluster] = []
+        reused: List[FlightDeal] = []
+        if self.near_duplicates is not None and results:
+            clusters = self.near_duplicates.cluster(results, index_key)
+            for cluster in clusters:
+                for deal_data in cluster.deals or []:
+                    reused.append(FlightDeal(**{**deal_data, "source_urls": list(cluster.urls)}))
+            pending = [c.representative for c in clusters if c.deals is None]
+            if len(pending) < len(results):
+                console.print(
+                    f"[dim]Casi duplicados: {len(results)} resultados en {len(clusters)} grupos, "
+                    f"{len(clusters) - len(pending)} ya analizados[/dim]"
+                )
+            results = pending
+
+        top_k = self.route_top_k.get(route)
+        results = self.ollama.select_results(results, origin, destination, top_k)
+
+        async def analyze(chunk: List[Dict]) -> Optional[List[FlightDeal]]:
+            async with semaphore:
+                # Cada grupo ya viene ordenado y recortado: sin nuevo top-k
+                try:
+                    return await self.ollama.analyze_flight_data_async(
+                        chunk, context, origin, destination, top_k=0, strict=True
+                    )
+                except Exception:
+                    return None  # Ya informado; el grupo queda sin analizar
+
+        chunks = self.ollama.chunk_results(results, context)
+        batches = await asyncio.gather(*(analyze(chunk) for chunk in chunks))
+        extracted = [deal for deals in batches if deals for deal in deals]
+        if clusters:
+            # Solo se recuerdan los grupos cuyo lote terminó: tras un fallo de
+            # Ollama sus copias tienen que volver a analizarse
+            completed = [
+                result
+                for chunk, deals in zip(chunks, batches)
+                if deals is not None
+                for result in chunk
+            ]
+            self._attach_sources(index_key, clusters, completed, extracted)
+        return extracted + reused
+
+    def _attach_sources(
+        self,
+        index_key: str,
+        clusters: List[Cluster],
+        analyzed: List[Dict],
+        deals: List[FlightDeal],
+    ):
+        """Suma a cada oferta las URLs de su grupo y guarda los grupos analizados"""
+        by_url = {
+            canonicalize_url(c.representative.get("url", "")): c
+            for c in clusters
+            if c.deals is None
+        }
+        found: Dict[int, List[Dict]] = {}
+        unmatched = False
+        for deal in deals:
+            cluster = by_url.get(canonicalize_url(deal.booking_url))
+            if cluster is None:
+                deal.source_urls = deal.source_urls or [deal.booking_url]
+                unmatched = True
+                continue
+            deal.source_urls = list(dict.fromkeys([deal.booking_url, *cluster.urls]))
+            found.setdefault(id(cluster), []).append(deal.to_dict())
+
+        # Solo los representantes que llegaron al LLM (el top-k). Sin ofertas
+        # también se recuerdan, para no volver a analizar sus copias, salvo que
+        # alguna oferta no se pueda atribuir: podría venir de cualquiera de ellos
+        done = [
+            by_url[key]
+            for key in (canonicalize_url(r.get("url", "")) for r in analyzed)
+            if key in by_url and (not unmatched or id(by_url[key]) in found)
         ]
+        self.near_duplicates.record(index_key, done, [found.get(id(c), []) for c in done])
 
-        all_deals = []
+    def _next_pages(
+        self,
+        pages: List[Tuple[PlannedQuery, int]],
+        batches: List[List[Dict]],
+        pool: ResultPool,
+        deals: List[FlightDeal],
+    ) -> List[Tuple[PlannedQuery, int]]:
+        """Páginas siguientes de las consultas que todavía producen ofertas"""
+        productive = set()
+        for deal in deals:
+            productive.update(pool.queries_by_url.get(canonicalize_url(deal.booking_url), []))
+
+        next_pages = []
+        for (planned, offset), results in zip(pages, batches):
+            following = offset + 1
+            if (
+                planned.query in productive
+                and len(results) >= planned.count  # Página llena: puede haber más
+                and following < BRAVE_MAX_PAGES
+                and following <= self.brave.MAX_OFFSET
+            ):
+                next_pages.append((planned, following))
+        return next_pages
+
+    async def _search_plan_async(
+        self,
+        plan: List[PlannedQuery],
+        context: str,
+        origin: str,
+        destination: str,
+        semaphore: asyncio.Semaphore,
+        evaluate: bool = False,
+        policy: Optional[StopPolicy] = None,
+    ) -> List[FlightDeal]:
+        """Ejecuta el plan: Brave, análisis de cada página única y paginación
+
+        Tras cada tanda se encolan las páginas siguientes solo de las consultas
+        cuyos resultados dieron ofertas, hasta BRAVE_MAX_PAGES por consulta.
+        Con `evaluate` cada oferta nueva se puntúa en su tanda; con una política
+        de corte activa las tandas son de `max_concurrency` páginas y la
+        búsqueda termina en cuanto la política lo indica. El trabajo hecho y
+        omitido queda en `self.last_report`.
+        """
+        tracer.set_route(f"{origin}-{destination}")
+        report = SearchReport(f"{origin}-{destination}", queries_planned=len(plan))
+        state = StopState(policy if policy and policy.enabled else None)
+        wave_size = self.max_concurrency if state.policy else None
+
+        pool = ResultPool()
+        queue = [(planned, 0) for planned in plan]
+        deals: List[FlightDeal] = []
+        seen: Dict[DealIdentity, FlightDeal] = {}
+        analyzed = 0
+        # Rendimiento por consulta ejecutada, para las estadísticas de plantillas
+        outcomes: Dict[str, Dict] = {}
+
+        while queue:
+            if state.out_of_time():
+                report.skip(STOP_TIME_BUDGET, queue)
+                break
+
+            size = wave_size or len(queue)
+            wave, queue = queue[:size], queue[size:]
+            fetched_pages = await self._fetch_pages_async(wave, semaphore)
+            batches = [results or [] for results, _, _ in fetched_pages]
+            report.pages_run += len(wave)
+            report.waves += 1
+            for (planned, _), (results, fetched, seconds) in zip(wave, fetched_pages):
+                if results is None:
+                    # Falla de red, circuito o cuota: no dice nada de la plantilla
+                    report.pages_failed += 1
+                    continue
+                pool.add(results, planned.query)
+                outcome = outcomes.setdefault(
+                    planned.query,
+                    {
+                        "templates": planned.templates,
+                        "pages": 0,
+                        "results": 0,
+                        "deals": 0,
+                        "hits": 0,
+                        "quota": 0,
+                        "latency": 0.0,
+                    },
+                )
+                outcome["pages"] += 1
+                outcome["results"] += len(results)
+                outcome["quota"] += 1 if fetched else 0
+                outcome["latency"] += seconds
+
+            # El pool conserva el orden: lo nuevo está al final
+            new_results = pool.results()[analyzed:]
+            analyzed = len(pool)
+            started = time.perf_counter()
+            extracted = await self._analyze_results_async(
+                new_results, context, origin, destination, semaphore
+            )
+            self.cascade_stats["extraction_seconds"] += time.perf_counter() - started
+
+            fresh = []
+            with tracer.span(DEDUP, deals=len(extracted)):
+                for deal in extracted:
+                    key = self._deal_key(deal)
+                    kept = find_duplicate(seen, key, deal)
+                    if kept is not None:
+                        # Ya evaluada: solo suma su fuente y sus notas; el
+                        # puntaje, la reputación y la URL evaluados se conservan
+                        absorb_sources(kept, deal)
+                    else:
+                        seen[key] = deal
+                        fresh.append(deal)
+            if evaluate and fresh:
+                self._assign_reputation(fresh)
+                with tracer.span(EVALUATION, deals=len(fresh)):
+                    await self._evaluate_deals_async(fresh)
+            deals.extend(fresh)
+
+            # Cada oferta suma a todas las consultas que trajeron su página
+            for deal in fresh:
+                for query in pool.queries_by_url.get(canonicalize_url(deal.booking_url), []):
+                    outcomes[query]["deals"] += 1
+                    if evaluate and deal.deal_score >= TEMPLATE_HIT_SCORE:
+                        outcomes[query]["hits"] += 1
+
+            next_pages = self._next_pages(wave, batches, pool, extracted)
+            if next_pages:
+                console.print(
+                    f"[dim]Paginando {len(next_pages)} consultas productivas "
+                    f"(página {next_pages[0][1] + 1})[/dim]"
+                )
+                queue.extend(next_pages)
+
+            reason = state.after_wave(fresh)
+            if reason and queue:
+                report.skip(reason, queue)
+                break
+
+        if self.template_stats is not None:
+            self.template_stats.record(route_type(origin, destination), list(outcomes.values()))
+
+        report.deals = len(deals)
+        self.last_report = report.finish()
+        if report.stopped_reason:
+            console.print(f"[dim]Corte anticipado: {report.summary()}[/dim]")
+        return deals
+
+    def _apply_evaluations(
+        self, deals: List[FlightDeal], evaluations: List[Tuple[float, str]]
+    ):
+        """Copia confianza y explicación del modelo a cada oferta"""
+        for deal, (confidence, explanation) in zip(deals, evaluations):
+            deal.deal_score = confidence
+            if explanation:
+                deal.notes = explanation
+
+    def _historical_score(self, deal: FlightDeal) -> Optional[float]:
+        """Puntaje según el historial de precios de la ruta, si hay tracker"""
+        if self.price_history is None:
+            return None
+        score, _ = self.price_history.calculate_deal_quality(
+            deal.origin, deal.destination, deal.price
+        )
+        return score
+
+    async def _evaluate_deals_async(self, deals: List[FlightDeal]):
+        """Asigna deal_score y explicación con una generación por lote
+
+        Con FAST_MODEL configurado, el modelo chico puntúa todas las ofertas y
+        solo las que superan CASCADE_MIN_SCORE (por puntaje provisional o por
+        historial) se confirman con el modelo grande.
+        """
+        if not deals:
+            return
+
+        fast_model = self.ollama.fast_model
+        if not fast_model:
+            started = time.perf_counter()
+            self._apply_evaluations(deals, await self.ollama.evaluate_deals_batch_async(deals))
+            self.cascade_stats["large_seconds"] += time.perf_counter() - started
+            self.cascade_stats["evaluated"] += len(deals)
+            self.cascade_stats["finalists"] += len(deals)
+            return
+
+        started = time.perf_counter()
+        self._apply_evaluations(
+            deals, await self.ollama.evaluate_deals_batch_async(deals, fast_model)
+        )
+        fast_seconds = time.perf_counter() - started
+
+        finalists = []
+        for deal in deals:
+            provisional = deal.deal_score
+            historical = self._historical_score(deal)
+            promoted = provisional >= self.cascade_min_score or (
+                historical is not None and historical >= self.cascade_min_score
+            )
+            if promoted:
+                finalists.append(deal)
+            self.routing_log.append(
+                {
+                    "route": f"{deal.origin}-{deal.destination}",
+                    "booking_url": deal.booking_url,
+                    "provisional_score": provisional,
+                    "historical_score": historical,
+                    "stage": self.ollama.model if promoted else fast_model,
+                }
+            )
+
+        large_seconds = 0.0
+        if finalists:
+            started = time.perf_counter()
+            self._apply_evaluations(
+                finalists,
+                # Sin modelo explícito: cada nodo confirma con su modelo fijo
+                await self.ollama.evaluate_deals_batch_async(finalists),
+            )
+            large_seconds = time.perf_counter() - started
+
+        self.cascade_stats["evaluated"] += len(deals)
+        self.cascade_stats["finalists"] += len(finalists)
+        self.cascade_stats["fast_seconds"] += fast_seconds
+        self.cascade_stats["large_seconds"] += large_seconds
+        console.print(
+            f"[dim]Cascada: {len(finalists)}/{len(deals)} ofertas al modelo grande "
+            f"({fast_model}: {fast_seconds:.1f}s, {self.ollama.model}: {large_seconds:.1f}s)[/dim]"
+        )
+
+    def _assign_reputation(self, deals: List[FlightDeal]):
+        """Completa la reputación de la aerolínea de cada oferta"""
+        for deal in deals:
+            deal.reputation_score = self.REPUTATION_DB.get(deal.airline, 70)
+
+    def _filter_connections(
+        self, deals: List[FlightDeal], max_connections: int
+    ) -> List[FlightDeal]:
+        """Filtra por número de conexiones (manejar None)"""
+        return [
+            d
+            for d in deals
+            if d.connections is not None and d.connections <= max_connections
+        ]
+
+    def search_route(
+        self,
+        origin: str,
+        destination: str,
+        date: str,
+        modes: Sequence[str] = ALL_MODES,
+        max_connections: int = 2,
+    ) -> Dict[str, List[FlightDeal]]:
+        """Busca una ruta para varios modos con un único plan de consultas"""
+        return run_sync(
+            self.search_route_async(origin, destination, date, modes, max_connections)
+        )
+
+    async def search_route_async(
+        self,
+        origin: str,
+        destination: str,
+        date: str,
+        modes: Sequence[str] = ALL_MODES,
+        max_connections: int = 2,
+    ) -> Dict[str, List[FlightDeal]]:
+        """Versión asíncrona de search_route
+
+        Ejecuta una sola vez el plan combinado, extrae cada resultado una vez y
+        clasifica las ofertas en las vistas de cada modo (claves de `modes`).
+        """
+        plan = self._plan(origin, destination, date, modes)
+        context = f"Buscar vuelos baratos y errores de precio de {origin} a {destination} para fecha {date}"
+        semaphore = asyncio.Semaphore(self.max_concurrency)
 
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             console=console,
         ) as progress:
-            for query in queries:
-                task = progress.add_task(f"Buscando: {query[:50]}...", total=None)
+            task = progress.add_task(
+                f"Buscando: {len(plan)} consultas combinadas...", total=None
+            )
 
-                results = self.brave.search(query, count=15)
+            deals = await self._search_plan_async(
+                plan,
+                context,
+                origin,
+                destination,
+                semaphore,
+                evaluate=ERROR_MODE in modes,
+                policy=self.stop_policy,
+            )
+            self._assign_reputation(deals)
 
-                if results:
-                    context = f"Buscar errores de precio de {origin} a {destination} para fecha {date}"
-                    deals = self.ollama.analyze_flight_data(results, context)
+            progress.remove_task(task)
 
-                    for deal in deals:
-                        # Verificar reputación
-                        deal.reputation_score = self.REPUTATION_DB.get(deal.airline, 70)
+        views: Dict[str, List[FlightDeal]] = {}
+        if ERROR_MODE in modes:
+            views[ERROR_MODE] = sorted(deals, key=lambda x: x.deal_score, reverse=True)
+        if CONNECTIONS_MODE in modes:
+            views[CONNECTIONS_MODE] = self._filter_connections(deals, max_connections)
+        if CHEAP_MODE in modes:
+            views[CHEAP_MODE] = sorted(deals, key=lambda x: x.price)
+        return views
 
-                        # Evaluar calidad con Ollama
-                        confidence, explanation = self.ollama.evaluate_deal_quality(
-                            deal
-                        )
-                        deal.deal_score = confidence
-                        if explanation:
-                            deal.notes = explanation
+    def search_error_fares(
+        self,
+        origin: str,
+        destination: str,
+        date: str,
+        policy: Optional[StopPolicy] = None,
+    ) -> List[FlightDeal]:
+        """Busca errores de precio (bandas negativas)
+
+        `policy` reemplaza a `self.stop_policy`; el informe de la búsqueda
+        (páginas ejecutadas, motivo de corte, consultas omitidas) queda en
+        `self.last_report`.
+        """
+        return run_sync(
+            self.search_error_fares_async(origin, destination, date, policy=policy)
+        )
+
+    async def search_error_fares_async(
+        self,
+        origin: str,
+        destination: str,
+        date: str,
+        max_concurrency: Optional[int] = None,
+        policy: Optional[StopPolicy] = None,
+    ) -> List[FlightDeal]:
+        """Busca errores de precio lanzando las consultas en paralelo"""
 
-                    all_deals.extend(deals)
+        plan = self._plan(origin, destination, date, [ERROR_MODE])
+        context = f"Buscar errores de precio de {origin} a {destination} para fecha {date}"
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
 
-                progress.remove_task(task)
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            console=console,
+        ) as progress:
+            task = progress.add_task(
+                f"Buscando: {len(plan)} consultas en paralelo...", total=None
+            )
+
+            # Sin duplicados, con reputación y evaluadas (una generación por lote)
+            unique_deals = await self._search_plan_async(
+                plan,
+                context,
+                origin,
+                destination,
+                semaphore,
+                evaluate=True,
+                policy=policy or self.stop_policy,
+            )
 
-        # Eliminar duplicados y ordenar por deal_score
-        unique_deals = self._deduplicate_deals(all_deals)
+            progress.remove_task(task)
+
+        # Ordenar por deal_score
         unique_deals.sort(key=lambda x: x.deal_score, reverse=True)
 
         return unique_deals
@@ -360,85 +1720,76 @@ class FlightSearchEngine:
         self, origin: str, destination: str, date: str, max_connections: int = 2
     ) -> List[FlightDeal]:
         """Busca vuelos con conexiones específicas"""
+        return run_sync(
+            self.search_with_connections_async(
+                origin, destination, date, max_connections
+            )
+        )
 
-        queries = [
-            f"vuelo {origin} {destination} {date} con escala",
-            f"vuelo {origin} {destination} {date} conexión",
-            f"flight {origin} to {destination} {date} with connection",
-            f"vuelo barato {origin} {destination} varias escalas",
-            f"multicity {origin} {destination} {date}",
-            f"vuelo indirecto {origin} {destination} oferta",
-        ]
-
-        all_deals = []
-
-        for query in queries:
-            results = self.brave.search(query, count=10)
-
-            if results:
-                context = f"Buscar vuelos con conexiones de {origin} a {destination}"
-                deals = self.ollama.analyze_flight_data(results, context)
+    async def search_with_connections_async(
+        self, origin: str, destination: str, date: str, max_connections: int = 2
+    ) -> List[FlightDeal]:
+        """Versión asíncrona de search_with_connections"""
 
-                # Filtrar por número de conexiones (manejar None)
-                deals = [
-                    d
-                    for d in deals
-                    if d.connections is not None and d.connections <= max_connections
-                ]
+        plan = self._plan(origin, destination, date, [CONNECTIONS_MODE])
+        context = f"Buscar vuelos con conexiones de {origin} a {destination}"
+        semaphore = asyncio.Semaphore(self.max_concurrency)
 
-                for deal in deals:
-                    deal.reputation_score = self.REPUTATION_DB.get(deal.airline, 70)
+        deals = await self._search_plan_async(
+            plan, context, origin, destination, semaphore, policy=self.stop_policy
+        )
 
-                all_deals.extend(deals)
+        deals = self._filter_connections(deals, max_connections)
+        self._assign_reputation(deals)
 
-        return self._deduplicate_deals(all_deals)
+        return self._deduplicate_deals(deals)
 
     def search_cheap_fares(
         self, origin: str, destination: str, date: str
     ) -> List[FlightDeal]:
         """Busca los pasajes más económicos"""
+        return run_sync(self.search_cheap_fares_async(origin, destination, date))
 
-        queries = [
-            f"vuelo barato {origin} {destination} {date}",
-            f"vuelo más económico {origin} {destination}",
-            f"cheap flight {origin} to {destination} {date}",
-            f"lowest price flight {origin} {destination}",
-            f"vuelo {origin} {destination} site:skyscanner.net",
-            f"vuelo {origin} {destination} site:google.com/travel/flights",
-        ]
-
-        all_deals = []
-
-        for query in queries:
-            results = self.brave.search(query, count=10)
+    async def search_cheap_fares_async(
+        self, origin: str, destination: str, date: str
+    ) -> List[FlightDeal]:
+        """Versión asíncrona de search_cheap_fares"""
 
-            if results:
-                context = f"Buscar vuelos baratos de {origin} a {destination}"
-                deals = self.ollama.analyze_flight_data(results, context)
+        plan = self._plan(origin, destination, date, [CHEAP_MODE])
+        context = f"Buscar vuelos baratos de {origin} a {destination}"
+        semaphore = asyncio.Semaphore(self.max_concurrency)
 
-                for deal in deals:
-                    deal.reputation_score = self.REPUTATION_DB.get(deal.airline, 70)
+        deals = await self._search_plan_async(
+            plan, context, origin, destination, semaphore, policy=self.stop_policy
+        )
 
-                all_deals.extend(deals)
+        self._assign_reputation(deals)
 
         # Ordenar por precio
-        deals = self._deduplicate_deals(all_deals)
+        deals = self._deduplicate_deals(deals)
         deals.sort(key=lambda x: x.price)
 
         return deals
 
+    def _deal_key(self, deal: FlightDeal) -> DealIdentity:
+        """Identidad normalizada de una oferta para detectar duplicados"""
+        return deal_identity(deal)
+
     def _deduplicate_deals(self, deals: List[FlightDeal]) -> List[FlightDeal]:
-        """Elimina ofertas duplicadas"""
-        seen = set()
-        unique = []
+        """Combina ofertas duplicadas en el registro con mejor origen"""
+        unique: Dict[DealIdentity, FlightDeal] = {}
 
-        for deal in deals:
-            key = f"{deal.airline}_{deal.origin}_{deal.destination}_{deal.price}_{deal.departure_date}"
-            if key not in seen:
-                seen.add(key)
-                unique.append(deal)
+        with tracer.span(DEDUP, deals=len(deals)):
+            for deal in deals:
+                key = self._deal_key(deal)
+                kept = find_duplicate(unique, key, deal)
+                if kept is not None:
+                    merge_deals(kept, deal)
+                else:
+                    # Copia: el merge no modifica las ofertas recibidas
+                    unique[key] = copy_deal(deal)
 
-        return unique
+        return list(unique.values())
 
     def generate_booking_url(self, deal: FlightDeal) -> str:
         """Genera URL directa de reserva según la fuente"""
@@ -544,7 +1895,7 @@ class FlightSearchEngine:
 
         filepath = Path(filename)
 
-        with open(filepath, "w", encoding="utf-8") as f:
+        with tracer.span(SAVE, deals=len(deals)), open(filepath, "w", encoding="utf-8") as f:
             f.write(f"# ✈️ Resultados de Búsqueda: {origin} → {destination}\n\n")
             f.write(
                 f"**Fecha de búsqueda:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
@@ -590,6 +1941,8 @@ class FlightSearchEngine:
                 f.write(f"- **Conexiones:** {deal.connections or 0}\n")
                 f.write(f"- **Fuente:** {deal.source or 'N/A'}\n")
                 f.write(f"- **🔗 Link Directo:** [{url}]({url})\n")
+                if len(deal.source_urls) > 1:
+                    f.write(f"- **También publicada en:** {', '.join(deal.source_urls[1:])}\n")
                 if deal.notes:
                     f.write(f"- **Notas:** {deal.notes}\n")
                 f.write("\n---\n\n")
@@ -638,7 +1991,7 @@ def main():
         "--error-fares-only", action="store_true", help="Buscar solo errores de precio"
     )
     parser.add_argument(
-        "--model", default="llama3.1:8b", help="Modelo de Ollama a usar"
+        "--model", help="Modelo de Ollama a usar (por defecto DEFAULT_MODEL o llama3.1:8b)"
     )
     parser.add_argument(
         "--save", type=str, help="Guardar resultados en archivo markdown específico"
@@ -646,6 +1999,16 @@ def main():
     parser.add_argument(
         "--no-save", action="store_true", help="No guardar resultados en archivo"
     )
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument(
+        "--record", type=Path, help="Grabar el tráfico con Brave y Ollama en una cassette (.jsonl.gz)"
+    )
+    cassette_group.add_argument(
+        "--replay", type=Path, help="Reproducir una cassette grabada, sin red"
+    )
+    parser.add_argument(
+        "--replay-timing", action="store_true", help="En replay, respetar los tiempos grabados"
+    )
 
     args = parser.parse_args()
 
@@ -657,51 +2020,55 @@ def main():
         )
     )
 
+    engine = None
     try:
-        engine = FlightSearchEngine()
-        engine.ollama.model = args.model
+        cassette = None
+        if args.record:
+            cassette = Cassette(args.record, RECORD)
+        elif args.replay:
+            cassette = Cassette(args.replay, REPLAY, timing=args.replay_timing)
+        engine = FlightSearchEngine(cassette, model=args.model)
+        # Cargar los modelos antes de la primera búsqueda
+        if OLLAMA_WARMUP:
+            engine.ollama.warm_up()
 
         console.print(f"\n[bold]Búsqueda:[/bold] {args.origin} → {args.destination}")
         console.print(f"[bold]Fecha:[/bold] {args.date}")
         if args.return_date:
             console.print(f"[bold]Regreso:[/bold] {args.return_date}")
-        console.print(f"[bold]Modelo IA:[/bold] {args.model}\n")
+        console.print(f"[bold]Modelo IA:[/bold] {engine.ollama.model}\n")
 
         all_deals = []
 
-        # Buscar errores de precio (bandas negativas)
+        # Un único plan de consultas para los tres modos de búsqueda
+        modes = [ERROR_MODE, CONNECTIONS_MODE]
+        if not args.error_fares_only:
+            modes.append(CHEAP_MODE)
+
         console.print(
-            "[bold yellow]🔍 Buscando errores de precio (bandas negativas)...[/bold yellow]"
+            "[bold yellow]🔍 Buscando errores de precio, conexiones y pasajes económicos...[/bold yellow]"
         )
-        error_deals = engine.search_error_fares(
-            args.origin, args.destination, args.date
+        views = engine.search_route(
+            args.origin, args.destination, args.date, modes, args.max_connections
         )
+
+        # Errores de precio (bandas negativas)
+        error_deals = views.get(ERROR_MODE, [])
         if error_deals:
             engine.display_results(error_deals, "🚨 Posibles Errores de Precio")
             all_deals.extend(error_deals)
 
-        # Buscar vuelos con conexiones
-        console.print(
-            "\n[bold yellow]🔍 Buscando vuelos con conexiones...[/bold yellow]"
-        )
-        connection_deals = engine.search_with_connections(
-            args.origin, args.destination, args.date, args.max_connections
-        )
+        # Vuelos con conexiones
+        connection_deals = views.get(CONNECTIONS_MODE, [])
         if connection_deals:
             engine.display_results(connection_deals, "✈️ Vuelos con Conexiones")
             all_deals.extend(connection_deals)
 
-        # Buscar pasajes económicos
-        if not args.error_fares_only:
-            console.print(
-                "\n[bold yellow]🔍 Buscando los pasajes más económicos...[/bold yellow]"
-            )
-            cheap_deals = engine.search_cheap_fares(
-                args.origin, args.destination, args.date
-            )
-            if cheap_deals:
-                engine.display_results(cheap_deals, "💰 Vuelos más Económicos")
-                all_deals.extend(cheap_deals)
+        # Pasajes económicos
+        cheap_deals = views.get(CHEAP_MODE, [])
+        if cheap_deals:
+            engine.display_results(cheap_deals, "💰 Vuelos más Económicos")
+            all_deals.extend(cheap_deals)
 
         # Resumen final
         if all_deals:
@@ -743,6 +2110,9 @@ def main():
         console.print("[dim]BRAVE_API_KEY=tu_api_key_de_brave[/dim]")
     except Exception as e:
         console.print(f"[bold red]Error: {e}[/bold red]")
+    finally:
+        if engine:
+            engine.close()
 
 
 if __name__ == "__main__":
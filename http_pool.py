@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+HTTP Pool - Sesiones aiohttp persistentes con keep-alive
+Cada cliente (Brave, Ollama) mantiene su propio pool de conexiones, reutilizado
+entre rutas y ciclos del daemon en lugar de abrir una conexión TCP/TLS por request
+"""
+
+import os
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Awaitable, TypeVar, Union
+
+import aiohttp
+
+from cassette import Cassette, CassetteSession
+
+T = TypeVar("T")
+
+
+@dataclass
+class PoolConfig:
+    """Configuración del pool de conexiones de un cliente"""
+
+    pool_size: int = 20  # Conexiones abiertas en total
+    per_host: int = 8  # Conexiones simultáneas por host
+    keepalive: float = 60.0  # Segundos que se conserva una conexión ociosa
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        """Lee la configuración desde variables de entorno"""
+        return cls(
+            pool_size=int(os.getenv("HTTP_POOL_SIZE", cls.pool_size)),
+            per_host=int(os.getenv("HTTP_POOL_PER_HOST", cls.per_host)),
+            keepalive=float(os.getenv("HTTP_KEEPALIVE", cls.keepalive)),
+        )
+
+
+class EventLoopThread:
+    """Event loop persistente en un hilo propio para las llamadas síncronas"""
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self.loop is None or self.loop.is_closed():
+                self.loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self.loop.run_forever, name="http-pool-loop", daemon=True
+                )
+                self._thread.start()
+            return self.loop
+
+    def run(self, coro: Awaitable[T]) -> T:
+        """Ejecuta una corrutina en el loop persistente y espera su resultado"""
+        loop = self._ensure_started()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("run() no puede llamarse desde el propio loop del pool")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+_loop_thread = EventLoopThread()
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """Ejecuta una corrutina desde código síncrono sobre el loop compartido"""
+    return _loop_thread.run(coro)
+
+
+class PooledSession:
+    """Sesión aiohttp con pool propio; se crea una por event loop en uso"""
+
+    def __init__(
+        self, config: Optional[PoolConfig] = None, headers: Optional[Dict] = None
+    ):
+        self.config = config or PoolConfig.from_env()
+        self.headers = headers or {}
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        # Con cassette, los pedidos se graban o se reproducen sin red
+        self.cassette: Optional[Cassette] = None
+
+    def session(self) -> Union[aiohttp.ClientSession, CassetteSession]:
+        """Devuelve la sesión del loop actual, creándola si hace falta"""
+        if self.cassette is not None and self.cassette.replaying:
+            return CassetteSession(self.cassette, None)
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.pool_size,
+                limit_per_host=self.config.per_host,
+                keepalive_timeout=self.config.keepalive,
+            )
+            session = aiohttp.ClientSession(connector=connector, headers=self.headers)
+            self._sessions[loop] = session
+        if self.cassette is not None:
+            return CassetteSession(self.cassette, session)
+        return session
+
+    async def aclose(self):
+        """Cierra la sesión asociada al loop actual"""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+    def close(self):
+        """Cierra todas las sesiones abiertas y libera sus conexiones"""
+        for loop, session in list(self._sessions.items()):
+            if loop.is_closed() or session.closed:
+                continue
+            if loop is _loop_thread.loop:
+                _loop_thread.run(session.close())
+            elif not loop.is_running():
+                loop.run_until_complete(session.close())
+        self._sessions.clear()
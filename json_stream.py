@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+JSON Stream - Parser incremental para respuestas en streaming de Ollama
+Entrega cada elemento del array de ofertas en cuanto se cierra su objeto,
+sin esperar al final de la generación
+"""
+
+import json
+from typing import Dict, List, Optional
+
+
+class IncrementalJSONParser:
+    """Extrae los objetos de un array del objeto JSON de nivel superior
+
+    Se alimenta con fragmentos de texto (tokens del modelo). Ignora todo lo
+    que haya antes de la primera '{' y marca `done` cuando ese objeto se cierra,
+    momento en que la generación puede cancelarse.
+    """
+
+    def __init__(self, array_key: str = "deals"):
+        self.array_key = array_key
+        self.text: List[str] = []  # Texto del objeto de nivel superior
+        self.pos = 0  # Longitud acumulada de self.text
+        self.stack: List[str] = []
+        self.in_string = False
+        self.escape = False
+        self.started = False
+        self.done = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._array_is_target = False
+        self._item_start: Optional[int] = None
+
+    def _joined(self) -> str:
+        if len(self.text) > 1:
+            self.text = ["".join(self.text)]
+        return self.text[0] if self.text else ""
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Procesa un fragmento y devuelve los objetos completados en él"""
+        items: List[Dict] = []
+        for char in chunk:
+            if self.done:
+                break
+            if not self.started:
+                if char != "{":
+                    continue
+                self.started = True
+
+            self.text.append(char)
+            index = self.pos
+            self.pos += 1
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.stack == ["{"]:
+                        # Cadena en el nivel superior: candidata a clave
+                        raw = self._joined()[self._string_start:index + 1]
+                        try:
+                            self._last_key = json.loads(raw)
+                        except ValueError:
+                            self._last_key = None
+                continue
+
+            if char == '"':
+                self.in_string = True
+                self._string_start = index
+            elif char in "{[":
+                if char == "[" and self.stack == ["{"]:
+                    self._array_is_target = self._last_key == self.array_key
+                if char == "{" and self.stack == ["{", "["] and self._array_is_target:
+                    self._item_start = index
+                self.stack.append(char)
+            elif char in "}]":
+                if self.stack:
+                    self.stack.pop()
+                if char == "}" and self._item_start is not None and self.stack == ["{", "["]:
+                    raw = self._joined()[self._item_start:index + 1]
+                    self._item_start = None
+                    try:
+                        item = json.loads(raw)
+                    except ValueError:
+                        item = None
+                    if isinstance(item, dict):
+                        items.append(item)
+                if not self.stack:
+                    self.done = True
+        return items
+
+    def result(self) -> Optional[Dict]:
+        """Objeto completo de nivel superior, si ya se cerró y es válido"""
+        if not self.done:
+            return None
+        try:
+            return json.loads(self._joined())
+        except ValueError:
+            return None
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Near Duplicates - Detección de resultados casi duplicados con MinHash/LSH
+Los errores de precio se republican en varios agregadores con textos apenas
+distintos. Cada resultado se resume en una firma MinHash de su título y
+descripción normalizados; las bandas LSH encuentran candidatos parecidos y solo
+un representante por grupo pasa por el LLM. El índice vive en SQLite, con
+tamaño y antigüedad acotados, para reconocer copias entre ciclos del daemon
+"""
+
+import os
+import re
+import json
+import time
+import zlib
+import random
+import sqlite3
+import hashlib
+import logging
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from price_extractor import find_prices, result_text
+from relevance import strip_accents
+from response_cache import CACHE_DIR, normalize_query
+
+# Agrupar resultados casi duplicados antes del LLM
+NEAR_DUP = os.getenv("NEAR_DUP", "1") == "1"
+# Similitud (Jaccard estimada) desde la que dos resultados son la misma oferta
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.7"))
+# Firmas conservadas en disco y días que se recuerda cada una
+NEAR_DUP_MAX_ENTRIES = int(os.getenv("NEAR_DUP_MAX_ENTRIES", "5000"))
+NEAR_DUP_TTL_DAYS = float(os.getenv("NEAR_DUP_TTL_DAYS", "7"))
+
+NUM_PERM = 64
+BANDS = 16  # 16 bandas de 4 filas: candidatos desde ~0.5 de similitud
+SHINGLE_SIZE = 3
+MAX_URLS = 20  # URLs de origen guardadas por grupo
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+URL_RE = re.compile(r"https?://\S+")
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> List[str]:
+    """Palabras en minúsculas, sin tildes, URLs ni puntuación"""
+    return WORD_RE.findall(strip_accents(URL_RE.sub(" ", text or "")))
+
+
+def shingles(words: Sequence[str], size: int = SHINGLE_SIZE) -> set:
+    """Conjunto de n-gramas de palabras (una palabra si el texto es corto)"""
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text: str) -> List[int]:
+    """Firma MinHash de NUM_PERM valores del texto normalizado"""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") % _PRIME
+        for s in shingles(normalize_text(text))
+    ]
+    if not hashes:
+        return [_PRIME] * NUM_PERM
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(first: Sequence[int], second: Sequence[int]) -> float:
+    """Jaccard estimada: proporción de valores iguales en las firmas"""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+def band_hashes(signature: Sequence[int]) -> List[int]:
+    """Un hash por banda LSH de la firma"""
+    rows = len(signature) // BANDS
+    return [
+        zlib.crc32(array("Q", signature[i * rows:(i + 1) * rows]).tobytes())
+        for i in range(BANDS)
+    ]
+
+
+def result_prices(result: Dict) -> List[float]:
+    """Montos mencionados: dos copias de la misma oferta comparten el precio"""
+    return sorted({amount for _, amount, _ in find_prices(result_text(result))})
+
+
+def search_key(route: str, context: str) -> str:
+    """Clave del índice: la ruta y el contexto de búsqueda (que trae la fecha)"""
+    digest = hashlib.sha256(normalize_query(context).encode()).hexdigest()[:16]
+    return f"{route}|{digest}"
+
+
+@dataclass
+class Cluster:
+    """Grupo de resultados casi iguales y su representante para el LLM"""
+
+    representative: Dict
+    urls: List[str] = field(default_factory=list)
+    entry_id: Optional[int] = None
+    # Ofertas ya extraídas del grupo en un ciclo anterior (None = sin analizar)
+    deals: Optional[List[Dict]] = None
+    signature: List[int] = field(default_factory=list, repr=False)
+    prices: List[float] = field(default_factory=list, repr=False)
+
+    def add_url(self, url: str):
+        if url and url not in self.urls and len(self.urls) < MAX_URLS:
+            self.urls.append(url)
+
+
+class NearDuplicateIndex:
+    """Índice MinHash/LSH persistente, separado por búsqueda (ver search_key)"""
+
+    def __init__(
+        self,
+        path: Path = CACHE_DIR / "near_duplicates.sqlite",
+        threshold: float = NEAR_DUP_THRESHOLD,
+        max_entries: int = NEAR_DUP_MAX_ENTRIES,
+        ttl_days: float = NEAR_DUP_TTL_DAYS,
+        clock: Optional[Callable[[], float]] = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.clock = clock or time.time
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl_days * 86400
+        self.stats = {"results": 0, "clusters": 0, "reused": 0}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " id INTEGER PRIMARY KEY,"
+                " route TEXT NOT NULL,"
+                " signature BLOB NOT NULL,"
+                " prices TEXT NOT NULL,"
+                " urls TEXT NOT NULL,"
+                " deals TEXT,"
+                " updated REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bands ("
+                " route TEXT NOT NULL, band INTEGER NOT NULL,"
+                " hash INTEGER NOT NULL, entry_id INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS bands_lookup ON bands (route, band, hash)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Una conexión por operación: seguro entre hilos y procesos
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _matches(self, cluster: Cluster, signature: List[int], prices: List[float]) -> bool:
+        # Con precio en ambos textos, tiene que coincidir alguno
+        if prices and cluster.prices and not set(prices) & set(cluster.prices):
+            return False
+        return similarity(signature, cluster.signature) >= self.threshold
+
+    def _stored_candidates(
+        self, conn: sqlite3.Connection, route: str, bands: List[int]
+    ) -> List[Cluster]:
+        placeholders = " OR ".join("(band = ? AND hash = ?)" for _ in bands)
+        params = [value for pair in enumerate(bands) for value in pair]
+        rows = conn.execute(
+            "SELECT DISTINCT e.id, e.signature, e.prices, e.urls, e.deals FROM bands b"
+            " JOIN entries e ON e.id = b.entry_id"
+            f" WHERE b.route = ? AND ({placeholders})",
+            [route, *params],
+        ).fetchall()
+        candidates = []
+        for entry_id, blob, prices, urls, deals in rows:
+            candidates.append(
+                Cluster(
+                    representative={},
+                    urls=json.loads(urls),
+                    entry_id=entry_id,
+                    deals=json.loads(deals) if deals is not None else None,
+                    signature=list(array("Q", blob)),
+                    prices=json.loads(prices),
+                )
+            )
+        return candidates
+
+    def cluster(self, results: List[Dict], route: str) -> List[Cluster]:
+        """Agrupa los resultados entre sí y con los ya vistos en la ruta
+
+        Devuelve un grupo por representante, en el orden de los resultados. Un
+        grupo con `deals` ya fue analizado en otro ciclo y no necesita el LLM.
+        """
+        clusters: List[Cluster] = []
+        local: Dict[tuple, List[Cluster]] = {}  # (banda, hash) de este lote
+        try:
+            with self._connect() as conn:
+                for result in results:
+                    url = result.get("url", "")
+                    signature = minhash(result_text(result))
+                    prices = result_prices(result)
+                    bands = band_hashes(signature)
+
+                    match = None
+                    for band, value in enumerate(bands):
+                        for candidate in local.get((band, value), []):
+                            if self._matches(candidate, signature, prices):
+                                match = candidate
+                                break
+                        if match:
+                            break
+                    if match:
+                        match.add_url(url)
+                        continue
+
+                    cluster = Cluster(result, [url], signature=signature, prices=prices)
+                    for stored in self._stored_candidates(conn, route, bands):
+                        if self._matches(stored, signature, prices):
+                            cluster.entry_id = stored.entry_id
+                            cluster.deals = stored.deals
+                            for previous in stored.urls:
+                                cluster.add_url(previous)
+                            break
+                    clusters.append(cluster)
+                    for band, value in enumerate(bands):
+                        local.setdefault((band, value), []).append(cluster)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error consultando casi duplicados: {e}")
+            return [Cluster(r, [r.get("url", "")]) for r in results]
+
+        self.stats["results"] += len(results)
+        self.stats["clusters"] += len(clusters)
+        self.stats["reused"] += sum(1 for c in clusters if c.deals is not None)
+        return clusters
+
+    def record(self, route: str, analyzed: List[Cluster], deals_by_cluster: List[List[Dict]]):
+        """Guarda los grupos analizados con sus ofertas para los próximos ciclos"""
+        now = self.clock()
+        try:
+            with self._connect() as conn:
+                for cluster, deals in zip(analyzed, deals_by_cluster):
+                    urls = json.dumps(cluster.urls, ensure_ascii=False)
+                    payload = json.dumps(deals, ensure_ascii=False)
+                    if cluster.entry_id is not None:
+                        conn.execute(
+                            "UPDATE entries SET urls = ?, deals = ?, updated = ? WHERE id = ?",
+                            (urls, payload, now, cluster.entry_id),
+                        )
+                        continue
+                    cursor = conn.execute(
+                        "INSERT INTO entries (route, signature, prices, urls, deals, updated)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (
+                            route,
+                            array("Q", cluster.signature).tobytes(),
+                            json.dumps(cluster.prices),
+                            urls,
+                            payload,
+                            now,
+                        ),
+                    )
+                    cluster.entry_id = cursor.lastrowid
+                    conn.executemany(
+                        "INSERT INTO bands (route, band, hash, entry_id) VALUES (?, ?, ?, ?)",
+                        [
+                            (route, band, value, cluster.entry_id)
+                            for band, value in enumerate(band_hashes(cluster.signature))
+                        ],
+                    )
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error guardando casi duplicados: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Elimina firmas viejas y, si sobran, las menos recientes"""
+        conn.execute("DELETE FROM entries WHERE updated < ?", (now - self.ttl,))
+        conn.execute(
+            "DELETE FROM entries WHERE id IN ("
+            " SELECT id FROM entries ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        conn.execute("DELETE FROM bands WHERE entry_id NOT IN (SELECT id FROM entries)")
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Ollama Pool - Balanceo de generaciones entre varias instancias de Ollama
+Cada generación va al nodo con menos peticiones en curso; los nodos que fallan
+salen del pool y vuelven cuando responden al health check (/api/tags)
+"""
+
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Set, Union
+
+import aiohttp
+from rich.console import Console
+
+from http_pool import PooledSession
+from resilience import CLOSED, CircuitBreaker, CircuitOpenError, get_breaker
+
+console = Console()
+
+# Segundos entre health checks de los nodos (los caídos se reintentan igual)
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "30"))
+OLLAMA_HEALTH_TIMEOUT = float(os.getenv("OLLAMA_HEALTH_TIMEOUT", "5"))
+
+
+@dataclass
+class OllamaNode:
+    """Instancia de Ollama del pool, con modelo fijo opcional"""
+
+    url: str
+    model: Optional[str] = None  # None = modelo por defecto del analizador
+    healthy: bool = True
+    outstanding: int = 0  # Generaciones en curso
+    served: int = 0
+    failures: int = 0
+    last_error: str = ""
+    breaker: CircuitBreaker = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.url = self.url.rstrip("/")
+        self.breaker = get_breaker(f"ollama:{self.url}")
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and self.breaker.state == CLOSED
+
+
+def parse_endpoints(spec: Union[str, Sequence[str]]) -> List[OllamaNode]:
+    """Nodos desde 'url[|modelo], url[|modelo], ...' o una lista de esas entradas"""
+    entries = spec.split(",") if isinstance(spec, str) else list(spec)
+    nodes = []
+    for entry in entries:
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, _, model = entry.partition("|")
+        nodes.append(OllamaNode(url.strip(), model.strip() or None))
+    return nodes
+
+
+def model_installed(model: str, names: Set[str]) -> bool:
+    """'llama3.1' equivale a 'llama3.1:latest' en /api/tags"""
+    return model in names or (":" not in model and f"{model}:latest" in names)
+
+
+def is_backend_failure(error: BaseException) -> bool:
+    """Los 4xx son errores del pedido, no del nodo"""
+    return not (isinstance(error, aiohttp.ClientResponseError) and error.status < 500)
+
+
+class OllamaPool:
+    """Pool de nodos con balanceo por menor cantidad de peticiones en curso"""
+
+    def __init__(
+        self,
+        nodes: List[OllamaNode],
+        http: PooledSession,
+        health_interval: float = OLLAMA_HEALTH_INTERVAL,
+        default_model: Optional[str] = None,
+        extra_models: Sequence[str] = (),
+    ):
+        if not nodes:
+            raise ValueError("El pool de Ollama necesita al menos un nodo")
+        self.nodes = nodes
+        self.http = http
+        self.health_interval = health_interval
+        # Modelo de los nodos sin modelo fijo y los que se piden a todos (cascada)
+        self.default_model = default_model
+        self.extra_models = list(extra_models)
+        self._next_check = time.monotonic() + health_interval
+
+    def node_models(self, node: OllamaNode) -> List[str]:
+        """Modelos que se le pueden pedir al nodo"""
+        models = [node.model or self.default_model, *self.extra_models]
+        return [model for model in dict.fromkeys(models) if model]
+
+    async def check_node(self, node: OllamaNode) -> bool:
+        """Consulta /api/tags y exige que estén instalados los modelos del nodo"""
+        try:
+            async with self.http.session().get(
+                f"{node.url}/api/tags",
+                timeout=aiohttp.ClientTimeout(total=OLLAMA_HEALTH_TIMEOUT),
+            ) as response:
+                response.raise_for_status()
+                data = await response.json()
+            names = {m.get("name") for m in data.get("models", [])}
+            missing = [m for m in self.node_models(node) if not model_installed(m, names)]
+            if missing:
+                raise ValueError(f"modelo {', '.join(missing)} no instalado")
+            healthy = True
+        except Exception as e:
+            node.last_error = str(e) or type(e).__name__
+            healthy = False
+
+        if healthy != node.healthy:
+            if healthy:
+                console.print(f"[green]✓ Nodo Ollama {node.url} reincorporado[/green]")
+            else:
+                console.print(
+                    f"[yellow]⚠️ Nodo Ollama {node.url} fuera del pool: {node.last_error}[/yellow]"
+                )
+        node.healthy = healthy
+        return healthy
+
+    async def health_check(self):
+        """Verifica todos los nodos en paralelo"""
+        self._next_check = time.monotonic() + self.health_interval
+        await asyncio.gather(*(self.check_node(node) for node in self.nodes))
+
+    def mark_failed(self, node: OllamaNode, error: BaseException):
+        """Saca al nodo del pool hasta que vuelva a pasar el health check"""
+        node.failures += 1
+        node.last_error = str(error) or type(error).__name__
+        if node.healthy:
+            console.print(
+                f"[yellow]⚠️ Nodo Ollama {node.url} fuera del pool: {node.last_error}[/yellow]"
+            )
+        node.healthy = False
+
+    async def acquire(self) -> OllamaNode:
+        """Elige el nodo disponible con menos peticiones en curso"""
+        if time.monotonic() >= self._next_check:
+            await self.health_check()
+
+        if not any(node.available for node in self.nodes):
+            # Sin nodos sanos: reintentar los caídos antes de rendirse
+            await self.health_check()
+
+        candidates = sorted(
+            (node for node in self.nodes if node.healthy),
+            key=lambda node: (node.outstanding, node.served),
+        )
+        for node in candidates:
+            if node.breaker.allow():
+                return node
+        raise CircuitOpenError("Ningún nodo de Ollama disponible")
+
+    @asynccontextmanager
+    async def lease(self, node: Optional[OllamaNode] = None) -> AsyncIterator[OllamaNode]:
+        """Reserva un nodo (o el indicado) durante una generación"""
+        if node is None:
+            node = await self.acquire()
+        elif not node.breaker.allow():
+            raise CircuitOpenError(f"{node.breaker.name} no disponible (circuito abierto)")
+
+        node.outstanding += 1
+        error: Optional[BaseException] = None
+        try:
+            yield node
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            node.outstanding -= 1
+            if error is not None and is_backend_failure(error):
+                node.breaker.record_failure()
+                self.mark_failed(node, error)
+            else:
+                # Cortar un stream a propósito no es un fallo del nodo
+                node.breaker.record_success()
+                node.served += 1
+
+    def snapshot(self) -> List[Dict]:
+        """Estado de cada nodo para monitoreo"""
+        return [
+            {
+                "url": node.url,
+                "model": node.model,
+                "healthy": node.healthy,
+                "circuit": node.breaker.state,
+                "outstanding": node.outstanding,
+                "served": node.served,
+                "failures": node.failures,
+                "last_error": node.last_error,
+            }
+            for node in self.nodes
+        ]
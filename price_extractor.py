@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Price Extractor - Extracción determinista de precios, códigos IATA y fechas
+Etapa previa a Ollama: descarta resultados sin precio y, opcionalmente,
+genera ofertas de alta confianza sin pasar por el modelo
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# Códigos y símbolos de moneda reconocidos (los más largos primero)
+CURRENCY_ALIASES = {
+    "US$": "USD",
+    "U$S": "USD",
+    "U$D": "USD",
+    "USD": "USD",
+    "DÓLARES": "USD",
+    "DOLARES": "USD",
+    "DOLLARS": "USD",
+    "EUR": "EUR",
+    "EUROS": "EUR",
+    "€": "EUR",
+    "AR$": "ARS",
+    "ARS": "ARS",
+    "PESOS": "ARS",
+    "R$": "BRL",
+    "BRL": "BRL",
+    "CLP": "CLP",
+    "MXN": "MXN",
+    "GBP": "GBP",
+    "£": "GBP",
+    "$": "$",  # Ambiguo: pesos o dólares según el sitio
+}
+
+_CURRENCY = "|".join(
+    re.escape(code) for code in sorted(CURRENCY_ALIASES, key=len, reverse=True)
+)
+_AMOUNT = r"\d{1,3}(?:[.,]\d{3})+(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?"
+
+PRICE_RE = re.compile(
+    rf"(?<![A-Za-z])(?P<cur>{_CURRENCY})\s?(?P<amt>{_AMOUNT})(?!\d)"
+    rf"|(?<![\d.,])(?P<amt2>{_AMOUNT})\s?(?P<cur2>{_CURRENCY})(?![A-Za-z])",
+    re.IGNORECASE,
+)
+IATA_RE = re.compile(r"\b[A-Z]{3}\b")
+ISO_DATE_RE = re.compile(r"\b(20\d{2})-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])\b")
+DATE_RE = re.compile(
+    r"\b\d{1,2}/\d{1,2}(?:/\d{2,4})?\b"
+    r"|\b\d{1,2} de (?:enero|febrero|marzo|abril|mayo|junio|julio|agosto"
+    r"|septiembre|octubre|noviembre|diciembre)\b"
+    r"|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]* \d{1,2}\b",
+    re.IGNORECASE,
+)
+
+KNOWN_AIRLINES = [
+    "Qatar Airways",
+    "Singapore Airlines",
+    "Emirates",
+    "Japan Airlines",
+    "Turkish Airlines",
+    "Air France",
+    "Lufthansa",
+    "KLM",
+    "Iberia",
+    "LATAM",
+    "American Airlines",
+    "Delta",
+    "United",
+    "British Airways",
+    "Copa Airlines",
+    "Avianca",
+    "GOL",
+    "Aerolíneas Argentinas",
+    "JetSMART",
+    "Flybondi",
+]
+_AIRLINE_RES = [
+    (name, re.compile(rf"\b{re.escape(name)}\b", re.IGNORECASE)) for name in KNOWN_AIRLINES
+]
+
+
+def parse_amount(raw: str) -> Optional[float]:
+    """Convierte '250.000', '1,234.56' o '350,50' en float"""
+    raw = raw.strip()
+    if "." in raw and "," in raw:
+        # El último separador es el decimal
+        decimal = "." if raw.rfind(".") > raw.rfind(",") else ","
+        thousands = "," if decimal == "." else "."
+        raw = raw.replace(thousands, "").replace(decimal, ".")
+    elif "." in raw or "," in raw:
+        sep = "." if "." in raw else ","
+        parts = raw.split(sep)
+        if all(len(p) == 3 for p in parts[1:]):
+            raw = raw.replace(sep, "")  # Separador de miles
+        else:
+            raw = raw.replace(sep, ".")
+    try:
+        return float(raw)
+    except ValueError:
+        return None
+
+
+def find_prices(text: str) -> List[Tuple[str, float, str]]:
+    """Devuelve (moneda, monto, texto original) de cada precio encontrado"""
+    prices = []
+    for match in PRICE_RE.finditer(text or ""):
+        cur = match.group("cur") or match.group("cur2")
+        amt = match.group("amt") or match.group("amt2")
+        amount = parse_amount(amt)
+        if amount is None or amount <= 0:
+            continue
+        prices.append((CURRENCY_ALIASES[cur.upper()], amount, match.group(0)))
+    return prices
+
+
+def result_text(result: Dict) -> str:
+    """Título y descripción de un resultado de Brave en un solo texto"""
+    return f"{result.get('title', '') or ''}\n{result.get('description', '') or ''}"
+
+
+def has_price(result: Dict) -> bool:
+    """Indica si el título o la descripción mencionan un precio"""
+    return bool(find_prices(result_text(result)))
+
+
+def filter_priced_results(results: List[Dict]) -> List[Dict]:
+    """Conserva solo los resultados que mencionan algún precio"""
+    return [r for r in results if has_price(r)]
+
+
+def find_iata_codes(text: str) -> List[str]:
+    """Códigos de tres letras en mayúsculas (candidatos a IATA)"""
+    return [code for code in IATA_RE.findall(text or "") if code not in CURRENCY_ALIASES]
+
+
+def find_dates(text: str) -> List[str]:
+    """Fechas mencionadas; las ISO se devuelven normalizadas primero"""
+    iso = ["-".join(m) for m in ISO_DATE_RE.findall(text or "")]
+    return iso + DATE_RE.findall(text or "")
+
+
+def detect_airline(text: str) -> Optional[str]:
+    """Primera aerolínea conocida mencionada en el texto"""
+    for name, pattern in _AIRLINE_RES:
+        if pattern.search(text or ""):
+            return name
+    return None
+
+
+def extract_direct_deal(
+    result: Dict, origin: str, destination: str, min_usd_price: float = 200
+) -> Optional[Dict]:
+    """Genera una oferta sin LLM cuando el resultado es inequívoco
+
+    Exige: un único precio con moneda explícita, ambos códigos IATA de la ruta
+    en el texto y URL real. Devuelve los campos de FlightDeal o None.
+    """
+    text = result_text(result)
+    url = result.get("url", "") or ""
+    if not url.startswith("http"):
+        return None
+
+    codes = set(find_iata_codes(text))
+    if origin.upper() not in codes or destination.upper() not in codes:
+        return None
+
+    # Un solo monto en todo el texto y al menos una moneda explícita
+    prices = find_prices(text)
+    explicit = [price for price in prices if price[0] != "$"]
+    if not explicit or len({amount for _, amount, _ in prices}) != 1:
+        return None
+    currency, amount, raw_price = explicit[0]
+    if currency in ("USD", "EUR") and amount < min_usd_price:
+        return None
+
+    iso_dates = [d for d in find_dates(text) if ISO_DATE_RE.fullmatch(d)]
+    domain = urlparse(url).netloc.lower()
+    if domain.startswith("www."):
+        domain = domain[4:]
+
+    return {
+        "airline": detect_airline(text) or "Desconocida",
+        "origin": origin.upper(),
+        "destination": destination.upper(),
+        "price": amount,
+        "currency": currency,
+        "departure_date": iso_dates[0] if iso_dates else "",
+        "return_date": iso_dates[1] if len(iso_dates) > 1 else None,
+        "connections": 0,
+        "booking_url": url,
+        "source": domain,
+        "reputation_score": 70.0,
+        "deal_score": 50.0,
+        "notes": f"Precio detectado sin LLM: {raw_price.strip()}",
+    }
+
+
+def split_direct_deals(
+    results: List[Dict], origin: str, destination: str
+) -> Tuple[List[Dict], List[Dict]]:
+    """Separa los resultados resolubles sin LLM del resto
+
+    Retorna (ofertas directas, resultados que todavía requieren el modelo).
+    """
+    direct, remaining = [], []
+    for result in results:
+        deal = extract_direct_deal(result, origin, destination)
+        if deal:
+            direct.append(deal)
+        else:
+            remaining.append(result)
+    return direct, remaining
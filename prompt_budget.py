@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Prompt Budget - Serialización compacta de resultados y presupuesto de tokens
+Limpia los snippets de Brave (entidades HTML, etiquetas, espacios), conserva
+solo las oraciones con precios, códigos IATA o fechas y reparte los resultados
+en prompts que entren en el presupuesto de tokens configurado
+"""
+
+import os
+import re
+import html
+import math
+from typing import Dict, Iterator, List, Tuple
+
+from price_extractor import PRICE_RE, find_dates, find_iata_codes
+
+# Tokens máximos por prompt de extracción (instrucciones + contexto + resultados)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+# Tokens máximos de la descripción de cada resultado
+PROMPT_DESCRIPTION_TOKENS = int(os.getenv("PROMPT_DESCRIPTION_TOKENS", "120"))
+
+# Estimación sin tokenizer: ~3.5 caracteres por token en texto español/inglés
+CHARS_PER_TOKEN = 3.5
+
+TAG_RE = re.compile(r"<[^>]+>")
+SPACE_RE = re.compile(r"\s+")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\s+[·|•]\s+|\s+-\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cantidad aproximada de tokens de un texto"""
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def clean_text(text: str) -> str:
+    """Quita etiquetas y entidades HTML y colapsa los espacios"""
+    text = html.unescape(TAG_RE.sub("", text or ""))
+    return SPACE_RE.sub(" ", text).strip()
+
+
+def is_relevant(sentence: str) -> bool:
+    """La oración menciona un precio, un código IATA o una fecha"""
+    return bool(
+        PRICE_RE.search(sentence) or find_iata_codes(sentence) or find_dates(sentence)
+    )
+
+
+def relevant_sentences(text: str) -> str:
+    """Oraciones con precio/IATA/fecha; si no hay ninguna, la primera"""
+    sentences = [s for s in SENTENCE_RE.split(clean_text(text)) if s]
+    if not sentences:
+        return ""
+    kept = [s for s in sentences if is_relevant(s)]
+    return " ".join(kept or sentences[:1])
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Recorta el texto al presupuesto, sin cortar palabras"""
+    max_chars = int(max_tokens * CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + "…"
+
+
+def compact_result(result: Dict, description_tokens: int = PROMPT_DESCRIPTION_TOKENS) -> str:
+    """Bloque de texto de un resultado para el prompt de extracción"""
+    title = clean_text(result.get("title", "") or "")
+    url = (result.get("url", "") or "").strip()
+    description = truncate_tokens(
+        relevant_sentences(result.get("description", "") or ""), description_tokens
+    )
+    return f"Título: {title}\nURL: {url}\nDescripción: {description}"
+
+
+def pack_results(
+    results: List[Dict],
+    budget: int,
+    max_results: int,
+    description_tokens: int = PROMPT_DESCRIPTION_TOKENS,
+) -> Tuple[List[str], int]:
+    """Bloques de los primeros resultados que entran en `budget` tokens
+
+    Devuelve los bloques y cuántos resultados se consumieron. El primero se
+    incluye siempre (recortado si hace falta) para no generar prompts vacíos.
+    """
+    blocks: List[str] = []
+    used = 0
+    for result in results[:max_results]:
+        block = compact_result(result, description_tokens)
+        tokens = estimate_tokens(block) + 1  # Separador entre bloques
+        if used + tokens > budget:
+            if blocks:
+                break
+            block = truncate_tokens(block, max(budget, 1))
+            tokens = estimate_tokens(block)
+        blocks.append(block)
+        used += tokens
+    return blocks, len(blocks)
+
+
+def chunk_by_budget(
+    results: List[Dict],
+    budget: int,
+    max_results: int,
+    description_tokens: int = PROMPT_DESCRIPTION_TOKENS,
+) -> Iterator[List[Dict]]:
+    """Reparte todos los resultados en grupos que entran en un prompt cada uno"""
+    start = 0
+    while start < len(results):
+        _, taken = pack_results(results[start:], budget, max_results, description_tokens)
+        yield results[start:start + taken]
+        start += taken
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Query Planner - Conjunto único de consultas para los modos de búsqueda
+Combina las plantillas de errores de precio, conexiones y tarifas baratas en
+un solo plan por ruta, sin consultas repetidas y con un tope configurable;
+con estadísticas de rendimiento prioriza las plantillas productivas y omite
+las que nunca dieron ofertas para ese tipo de ruta
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from response_cache import normalize_query
+from template_stats import TemplateStats, route_type
+
+# Tope de consultas cuando se planifican varios modos a la vez
+PLANNER_MAX_QUERIES = int(os.getenv("PLANNER_MAX_QUERIES", "8"))
+
+ERROR_MODE = "error"
+CONNECTIONS_MODE = "connections"
+CHEAP_MODE = "cheap"
+ALL_MODES = (ERROR_MODE, CONNECTIONS_MODE, CHEAP_MODE)
+
+
+@dataclass(frozen=True)
+class QueryTemplate:
+    """Plantilla de consulta Brave asociada a un modo de búsqueda"""
+
+    mode: str
+    template: str  # Con marcadores {origin}, {destination} y {date}
+    count: int = 10
+
+    def render(self, origin: str, destination: str, date: str) -> str:
+        return self.template.format(origin=origin, destination=destination, date=date)
+
+
+TEMPLATES_BY_MODE: Dict[str, List[QueryTemplate]] = {
+    ERROR_MODE: [
+        QueryTemplate(ERROR_MODE, "error fare {origin} {destination} {date}", 15),
+        QueryTemplate(ERROR_MODE, "banda negativa vuelo {origin} {destination}", 15),
+        QueryTemplate(ERROR_MODE, "mistake fare flight {origin} to {destination}", 15),
+        QueryTemplate(ERROR_MODE, "vuelo barato error precio {origin} {destination}", 15),
+        QueryTemplate(
+            ERROR_MODE,
+            "oferta vuelo error {origin} {destination} site:secretflying.com",
+            15,
+        ),
+        QueryTemplate(ERROR_MODE, "vuelo {origin} {destination} {date} site:fly4free.com", 15),
+    ],
+    CONNECTIONS_MODE: [
+        QueryTemplate(CONNECTIONS_MODE, "vuelo {origin} {destination} {date} con escala"),
+        QueryTemplate(CONNECTIONS_MODE, "vuelo {origin} {destination} {date} conexión"),
+        QueryTemplate(
+            CONNECTIONS_MODE, "flight {origin} to {destination} {date} with connection"
+        ),
+        QueryTemplate(CONNECTIONS_MODE, "vuelo barato {origin} {destination} varias escalas"),
+        QueryTemplate(CONNECTIONS_MODE, "multicity {origin} {destination} {date}"),
+        QueryTemplate(CONNECTIONS_MODE, "vuelo indirecto {origin} {destination} oferta"),
+    ],
+    CHEAP_MODE: [
+        QueryTemplate(CHEAP_MODE, "vuelo barato {origin} {destination} {date}"),
+        QueryTemplate(CHEAP_MODE, "vuelo más económico {origin} {destination}"),
+        QueryTemplate(CHEAP_MODE, "cheap flight {origin} to {destination} {date}"),
+        QueryTemplate(CHEAP_MODE, "lowest price flight {origin} {destination}"),
+        QueryTemplate(CHEAP_MODE, "vuelo {origin} {destination} site:skyscanner.net"),
+        QueryTemplate(
+            CHEAP_MODE, "vuelo {origin} {destination} site:google.com/travel/flights"
+        ),
+    ],
+}
+
+
+@dataclass
+class PlannedQuery:
+    """Consulta concreta del plan y las plantillas/modos que la originan"""
+
+    query: str
+    count: int
+    templates: List[QueryTemplate] = field(default_factory=list)
+
+    @property
+    def modes(self) -> List[str]:
+        return sorted({template.mode for template in self.templates})
+
+
+class QueryPlanner:
+    """Arma el plan de consultas de una ruta para uno o varios modos"""
+
+    def __init__(
+        self, max_queries: Optional[int] = None, stats: Optional[TemplateStats] = None
+    ):
+        self.max_queries = PLANNER_MAX_QUERIES if max_queries is None else max_queries
+        self.stats = stats
+        self.pruned: List[QueryTemplate] = []  # Omitidas en el último plan
+
+    def _rank(self, templates: List[QueryTemplate], route: str) -> List[QueryTemplate]:
+        """Ordena por rendimiento histórico y quita las improductivas
+
+        Siempre queda al menos una plantilla por modo.
+        """
+        if self.stats is None:
+            return list(templates)
+        ranked = sorted(templates, key=lambda t: self.stats.score(route, t), reverse=True)
+        kept = [t for t in ranked if not self.stats.should_skip(route, t)]
+        if not kept:
+            kept = ranked[:1]
+        self.pruned.extend(t for t in ranked if t not in kept)
+        return kept
+
+    def plan(
+        self,
+        origin: str,
+        destination: str,
+        date: str,
+        modes: Sequence[str] = ALL_MODES,
+    ) -> List[PlannedQuery]:
+        """Genera las consultas intercalando modos y fusionando repetidas
+
+        Con un solo modo se devuelven todas sus plantillas; con varios se aplica
+        `max_queries` repartiendo el cupo por turnos entre los modos. Con
+        estadísticas, cada modo empieza por sus plantillas más productivas.
+        """
+        route = route_type(origin, destination)
+        self.pruned = []
+        by_mode = [self._rank(TEMPLATES_BY_MODE[mode], route) for mode in modes]
+        limit = self.max_queries if len(modes) > 1 and self.max_queries > 0 else None
+
+        planned: Dict[str, PlannedQuery] = {}
+        depth = max((len(templates) for templates in by_mode), default=0)
+        for i in range(depth):
+            for templates in by_mode:
+                if i >= len(templates):
+                    continue
+                template = templates[i]
+                query = template.render(origin, destination, date)
+                key = normalize_query(query)
+                if key in planned:
+                    planned[key].templates.append(template)
+                    planned[key].count = max(planned[key].count, template.count)
+                    continue
+                if limit is not None and len(planned) >= limit:
+                    continue
+                planned[key] = PlannedQuery(query, template.count, [template])
+
+        return list(planned.values())
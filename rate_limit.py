@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Rate Limit - Token bucket y registro persistente de cuota para Brave Search
+El registro cuenta las llamadas por día y mes en disco, compartido entre el
+daemon y los dashboards, y guarda los bloqueos indicados por Retry-After; el
+bucket limita las peticiones por segundo y, con un registro, guarda sus tokens
+en el mismo archivo bloqueado para que todos los procesos compartan la tasa
+"""
+
+import os
+import json
+import time
+import fcntl
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Mapping, Optional
+
+QUOTA_FILE = Path.home() / ".config" / "flight-monitor" / "brave_quota.json"
+
+
+class TokenBucket:
+    """Token bucket con tasa y ráfaga configurables (rate <= 0 = sin límite)
+
+    Con `ledger` los tokens viven en el registro de cuota (ver
+    QuotaLedger.reserve_token) y la tasa es común a todos los procesos.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, ledger: Optional["QuotaLedger"] = None):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.ledger = ledger
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Reserva un token y devuelve los segundos a esperar para usarlo"""
+        if self.ledger is not None and self.rate > 0:
+            shared = self.ledger.reserve_token(self.rate, self.burst)
+            with self._lock:
+                return max(shared, self.paused_until - time.monotonic())
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+            if self.rate <= 0:
+                return wait
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens / self.rate)
+            return wait
+
+    async def acquire(self):
+        """Espera hasta disponer de un token
+
+        Con `ledger` la reserva lee y reescribe el archivo bloqueado, así que
+        corre en un hilo para no frenar el event loop.
+        """
+        if self.ledger is not None and self.rate > 0:
+            wait = await asyncio.to_thread(self._reserve)
+        else:
+            wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Bloquea el bucket (p. ej. tras un 429 con Retry-After)"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def shared_bucket(
+    name: str, rate: float, burst: int = 1, ledger: Optional["QuotaLedger"] = None
+) -> TokenBucket:
+    """Bucket compartido por los clientes del proceso con el mismo nombre
+
+    Con `ledger` también lo comparten los demás procesos que usan ese registro.
+    """
+    with _buckets_lock:
+        if name not in _buckets:
+            _buckets[name] = TokenBucket(rate, burst, ledger)
+        return _buckets[name]
+
+
+def _parse_header_list(value: Optional[str]) -> list:
+    """Brave envía listas por ventana: 'X-RateLimit-Remaining: 0, 14990'"""
+    if not value:
+        return []
+    items = []
+    for part in value.split(","):
+        try:
+            items.append(float(part.strip()))
+        except ValueError:
+            pass
+    return items
+
+
+class QuotaLedger:
+    """Registro en disco de llamadas por día/mes y del estado de rate limit"""
+
+    def __init__(
+        self,
+        path: Path = QUOTA_FILE,
+        daily_limit: int = 0,
+        monthly_limit: int = 0,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.daily_limit = daily_limit
+        self.monthly_limit = monthly_limit
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def _locked(self) -> Iterator[Dict]:
+        """Lee, bloquea y reescribe el registro (seguro entre procesos)"""
+        with open(self.path.with_suffix(".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            data = self._read()
+            yield data
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self.path)
+
+    def _read(self) -> Dict:
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    return json.load(f)
+            except Exception as e:
+                self.logger.error(f"Error cargando registro de cuota: {e}")
+        return {"days": {}, "months": {}, "blocked_until": 0, "remote": {}}
+
+    def record_call(self):
+        """Suma una llamada real (no cacheada) al día y mes actuales"""
+        with self._locked() as data:
+            self._count_call(data)
+
+    @staticmethod
+    def _count_call(data: Dict):
+        now = datetime.now()
+        day, month = now.strftime("%Y-%m-%d"), now.strftime("%Y-%m")
+        days = data.setdefault("days", {})
+        months = data.setdefault("months", {})
+        days[day] = days.get(day, 0) + 1
+        months[month] = months.get(month, 0) + 1
+        # Conservar solo el mes en curso para los contadores diarios
+        for key in [d for d in days if not d.startswith(month)]:
+            del days[key]
+
+    def reserve_token(self, rate: float, burst: int = 1) -> float:
+        """Reserva un token del bucket guardado en el registro; devuelve la espera
+
+        El estado (tokens y última actualización en epoch) se lee y reescribe
+        bajo el mismo lock que los contadores, así el daemon y los dashboards
+        no superan juntos la tasa de Brave.
+        """
+        now = time.time()
+        with self._locked() as data:
+            bucket = data.get("bucket") or {"tokens": float(burst), "updated": now}
+            elapsed = max(0.0, now - bucket["updated"])
+            tokens = min(float(burst), bucket["tokens"] + elapsed * rate) - 1
+            data["bucket"] = {"tokens": tokens, "updated": now}
+        return max(0.0, -tokens / rate)
+
+    def update_from_headers(self, headers: Mapping[str, str], status: int = 200):
+        """Guarda los límites informados por Brave y los bloqueos por 429"""
+        limits = self._parse_limits(headers)
+        if limits is None:
+            return
+        with self._locked() as data:
+            self._apply_limits(data, limits, status)
+
+    def record_response(self, headers: Mapping[str, str], status: int = 200):
+        """record_call y update_from_headers en una sola escritura del registro"""
+        limits = self._parse_limits(headers)
+        with self._locked() as data:
+            self._count_call(data)
+            if limits is not None:
+                self._apply_limits(data, limits, status)
+
+    @staticmethod
+    def _parse_limits(headers: Mapping[str, str]) -> Optional[Dict[str, list]]:
+        """Cabeceras de rate limit de Brave, o None si no vino ninguna"""
+        limits = {
+            "limit": _parse_header_list(headers.get("X-RateLimit-Limit")),
+            "remaining": _parse_header_list(headers.get("X-RateLimit-Remaining")),
+            "reset": _parse_header_list(headers.get("X-RateLimit-Reset")),
+            "retry_after": _parse_header_list(headers.get("Retry-After")),
+        }
+        return limits if any(limits.values()) else None
+
+    @staticmethod
+    def _apply_limits(data: Dict, limits: Dict[str, list], status: int):
+        limit, remaining, reset = limits["limit"], limits["remaining"], limits["reset"]
+        if limit or remaining:
+            data["remote"] = {
+                "limit": limit,
+                "remaining": remaining,
+                "reset": reset,
+                "updated": time.time(),
+            }
+        if status == 429:
+            retry_after = limits["retry_after"]
+            wait = retry_after[0] if retry_after else (reset[0] if reset else 1.0)
+            data["blocked_until"] = max(data.get("blocked_until", 0), time.time() + wait)
+
+    def blocked_for(self) -> float:
+        """Segundos que faltan para que Brave vuelva a aceptar peticiones"""
+        return max(0.0, self._read().get("blocked_until", 0) - time.time())
+
+    def remaining(self) -> Dict:
+        """Presupuesto restante: límites locales y los últimos informados por Brave"""
+        data = self._read()
+        now = datetime.now()
+        used_day = data.get("days", {}).get(now.strftime("%Y-%m-%d"), 0)
+        used_month = data.get("months", {}).get(now.strftime("%Y-%m"), 0)
+        remote = data.get("remote", {})
+        remote_remaining = remote.get("remaining") or []
+        remote_reset = remote.get("reset") or []
+        if remote_reset and time.time() > remote.get("updated", 0) + remote_reset[-1]:
+            remote_remaining = []  # La ventana informada ya se reinició
+        return {
+            "used_today": used_day,
+            "used_month": used_month,
+            "daily_remaining": (
+                max(0, self.daily_limit - used_day) if self.daily_limit else None
+            ),
+            "monthly_remaining": (
+                max(0, self.monthly_limit - used_month) if self.monthly_limit else None
+            ),
+            # Brave informa [por segundo, por mes]; el último valor es el mensual
+            "remote_remaining": (
+                remote_remaining[-1] if len(remote_remaining) > 1 else None
+            ),
+            "blocked_for": max(0.0, data.get("blocked_until", 0) - time.time()),
+        }
+
+    def exhausted(self) -> bool:
+        """Indica si se agotó la cuota local o la informada por Brave"""
+        budget = self.remaining()
+        return any(
+            value is not None and value <= 0
+            for value in (
+                budget["daily_remaining"],
+                budget["monthly_remaining"],
+                budget["remote_remaining"],
+            )
+        )
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Relevance - Pre-ranking barato de resultados de Brave antes del prompt
+Puntúa cada resultado con señales locales (códigos IATA y ciudades de la ruta,
+precio con moneda, dominios de blogs de ofertas, fechas y antigüedad) y deja
+solo los k mejores, para que cada generación reciba los resultados con más
+probabilidad de contener ofertas
+"""
+
+import os
+import re
+import unicodedata
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from price_extractor import find_dates, find_prices, result_text
+
+# Ordenar los resultados por relevancia antes de armar los prompts
+RELEVANCE_RANKING = os.getenv("RELEVANCE_RANKING", "1") == "1"
+# Resultados analizados por tanda de cada ruta (0 = todos, solo ordenados)
+RELEVANCE_TOP_K = int(os.getenv("RELEVANCE_TOP_K", "30"))
+# k por ruta: "EZE-MAD:40,MDZ-SLA:10"
+RELEVANCE_TOP_K_ROUTES = os.getenv("RELEVANCE_TOP_K_ROUTES", "")
+
+# Peso de cada señal en el puntaje
+WEIGHTS = {
+    "origin_code": 2.0,
+    "destination_code": 2.0,
+    "origin_city": 1.5,
+    "destination_city": 1.5,
+    "price": 2.0,
+    "deal_domain": 1.5,
+    "date": 0.5,
+    "recent": 1.0,  # Publicado en los últimos RECENT_DAYS días
+    "this_week": 0.5,  # Publicado en la última semana
+}
+RECENT_DAYS = 3
+
+# Blogs y agregadores que publican errores de precio
+DEAL_DOMAINS = {
+    "secretflying.com",
+    "fly4free.com",
+    "theflightdeal.com",
+    "holidaypirates.com",
+    "piratesdesvacances.com",
+    "viajerospiratas.es",
+    "scottscheapflights.com",
+    "going.com",
+    "airfarewatchdog.com",
+    "thepointsguy.com",
+    "promociones-aereas.com.ar",
+    "cuponstar.com",
+}
+
+# Nombres de ciudad por aeropuerto, sin tildes y en minúsculas
+AIRPORT_CITIES = {
+    "EZE": ("buenos aires",),
+    "AEP": ("buenos aires", "aeroparque"),
+    "COR": ("cordoba",),
+    "MDZ": ("mendoza",),
+    "SLA": ("salta",),
+    "BRC": ("bariloche",),
+    "IGR": ("iguazu",),
+    "USH": ("ushuaia",),
+    "TUC": ("tucuman",),
+    "NQN": ("neuquen",),
+    "ROS": ("rosario",),
+    "MDQ": ("mar del plata",),
+    "FTE": ("calafate",),
+    "JUJ": ("jujuy",),
+    "CRD": ("comodoro rivadavia",),
+    "REL": ("trelew",),
+    "BHI": ("bahia blanca",),
+    "MAD": ("madrid",),
+    "BCN": ("barcelona",),
+    "MIA": ("miami",),
+    "JFK": ("nueva york", "new york"),
+    "GRU": ("sao paulo",),
+    "GIG": ("rio de janeiro",),
+    "SCL": ("santiago de chile", "santiago"),
+    "LIM": ("lima",),
+    "BOG": ("bogota",),
+    "MEX": ("ciudad de mexico", "mexico city"),
+    "CUN": ("cancun",),
+    "PUJ": ("punta cana",),
+    "FCO": ("roma", "rome"),
+    "CDG": ("paris",),
+    "LHR": ("londres", "london"),
+    "LIS": ("lisboa", "lisbon"),
+    "MVD": ("montevideo",),
+    "ASU": ("asuncion",),
+    "PTY": ("panama",),
+    "ORD": ("chicago",),
+    "MCO": ("orlando",),
+    "LAX": ("los angeles",),
+    "FLN": ("florianopolis",),
+    "PUQ": ("punta arenas",),
+}
+
+AGE_RE = re.compile(
+    r"(\d+)\s*(minute|hour|day|week|month|year|minuto|hora|d[ií]a|semana|mes|año)",
+    re.IGNORECASE,
+)
+AGE_DAYS = {
+    "minute": 0, "minuto": 0, "hour": 0, "hora": 0, "day": 1, "dia": 1, "día": 1,
+    "week": 7, "semana": 7, "month": 30, "mes": 30, "year": 365, "año": 365,
+}
+
+
+def strip_accents(text: str) -> str:
+    """Minúsculas sin tildes, para comparar nombres de ciudad"""
+    normalized = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in normalized if not unicodedata.combining(c)).lower()
+
+
+def result_age_days(result: Dict, now: Optional[datetime] = None) -> Optional[float]:
+    """Antigüedad en días según page_age (ISO) o age ("2 days ago", "hace 3 días")"""
+    now = now or datetime.now(timezone.utc)
+    page_age = result.get("page_age")
+    if page_age:
+        try:
+            published = datetime.fromisoformat(str(page_age).replace("Z", "+00:00"))
+            if published.tzinfo is None:
+                published = published.replace(tzinfo=timezone.utc)
+            return max(0.0, (now - published).total_seconds() / 86400)
+        except ValueError:
+            pass
+    match = AGE_RE.search(str(result.get("age") or ""))
+    if match:
+        unit = match.group(2).lower()
+        return int(match.group(1)) * AGE_DAYS.get(unit, 1)
+    return None
+
+
+def _domain(url: str) -> str:
+    host = urlparse(url or "").netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def score_result(
+    result: Dict, origin: str, destination: str, now: Optional[datetime] = None
+) -> float:
+    """Puntaje de relevancia de un resultado para la ruta (más alto = mejor)"""
+    text = result_text(result)
+    plain = strip_accents(text)
+    origin, destination = origin.upper(), destination.upper()
+    score = 0.0
+
+    for side, code in (("origin", origin), ("destination", destination)):
+        if re.search(rf"\b{code}\b", text):
+            score += WEIGHTS[f"{side}_code"]
+        if any(city in plain for city in AIRPORT_CITIES.get(code, ())):
+            score += WEIGHTS[f"{side}_city"]
+
+    if find_prices(text):
+        score += WEIGHTS["price"]
+    domain = _domain(result.get("url", ""))
+    if any(domain == d or domain.endswith("." + d) for d in DEAL_DOMAINS):
+        score += WEIGHTS["deal_domain"]
+    if find_dates(text):
+        score += WEIGHTS["date"]
+
+    age = result_age_days(result, now)
+    if age is not None:
+        if age <= RECENT_DAYS:
+            score += WEIGHTS["recent"]
+        elif age <= 7:
+            score += WEIGHTS["this_week"]
+    return score
+
+
+def rank_results(
+    results: List[Dict],
+    origin: str,
+    destination: str,
+    top_k: int = 0,
+    now: Optional[datetime] = None,
+) -> List[Dict]:
+    """Resultados de más a menos relevantes (estable), recortados a top_k si > 0"""
+    now = now or datetime.now(timezone.utc)
+    scored = [(score_result(r, origin, destination, now), i) for i, r in enumerate(results)]
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    ranked = [results[i] for _, i in scored]
+    return ranked[:top_k] if top_k > 0 else ranked
+
+
+def parse_route_top_k(spec: str = RELEVANCE_TOP_K_ROUTES) -> Dict[str, int]:
+    """'EZE-MAD:40,MDZ-SLA:10' -> {'EZE-MAD': 40, 'MDZ-SLA': 10}"""
+    routes = {}
+    for item in spec.split(","):
+        route, _, k = item.strip().partition(":")
+        if route and k.strip().isdigit():
+            routes[route.strip().upper()] = int(k)
+    return routes
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Resilience - Reintentos con backoff exponencial y circuit breaker por backend
+Los fallos transitorios (conexión, 5xx) se reintentan con jitter; si un backend
+acumula fallos se abre su circuito y las llamadas fallan al instante hasta que
+una petición de prueba (half-open) confirma que volvió
+"""
+
+import os
+import time
+import random
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import aiohttp
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """El backend está marcado como caído; la llamada no se realizó"""
+
+
+@dataclass
+class RetryPolicy:
+    """Política de reintentos con backoff exponencial y jitter"""
+
+    attempts: int = 3  # Intentos totales (1 = sin reintentos)
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    jitter: float = 0.5  # Fracción aleatoria sumada a cada espera
+    retry_on_timeout: bool = False  # Reintentar timeouts (costoso con LLMs)
+
+    @classmethod
+    def from_env(cls, **overrides) -> "RetryPolicy":
+        """Lee la política desde variables de entorno"""
+        policy = cls(
+            attempts=int(os.getenv("RETRY_ATTEMPTS", cls.attempts)),
+            base_delay=float(os.getenv("RETRY_BASE_DELAY", cls.base_delay)),
+            max_delay=float(os.getenv("RETRY_MAX_DELAY", cls.max_delay)),
+        )
+        for key, value in overrides.items():
+            setattr(policy, key, value)
+        return policy
+
+    def delay(self, attempt: int) -> float:
+        """Espera antes del reintento número `attempt` (desde 1)"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay * (1 + random.uniform(0, self.jitter))
+
+    def is_transient(self, error: BaseException) -> bool:
+        """Errores que vale la pena reintentar"""
+        if isinstance(error, aiohttp.ClientResponseError):
+            if error.status == 429:
+                return False  # Lo reintenta el cliente según su Retry-After
+            return error.status >= 500
+        if isinstance(error, asyncio.TimeoutError):
+            return self.retry_on_timeout
+        return isinstance(error, (aiohttp.ClientConnectionError, ConnectionError))
+
+
+class CircuitBreaker:
+    """Circuit breaker de un backend (closed → open → half_open → closed)"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.clock = clock
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.total_failures = 0
+        self.total_rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Indica si se puede llamar al backend ahora"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                # Una sola petición de prueba mientras está medio abierto
+                self.probe_in_flight = True
+                return True
+            self.total_rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.total_failures += 1
+            self.probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+    def snapshot(self) -> Dict:
+        """Estado actual para monitoreo"""
+        with self._lock:
+            retry_in = 0.0
+            if self.state == OPEN:
+                retry_in = max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "total_failures": self.total_failures,
+                "rejected": self.total_rejected,
+                "retry_in": retry_in,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Breaker compartido por nombre de backend dentro del proceso"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv("BREAKER_FAILURES", "3")),
+                reset_timeout=float(os.getenv("BREAKER_RESET", "30")),
+            )
+        return _breakers[name]
+
+
+def breaker_states() -> Dict[str, Dict]:
+    """Estado de todos los breakers del proceso"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+async def call_with_retry(
+    operation: Callable[[], Awaitable[T]],
+    breaker: Optional[CircuitBreaker] = None,
+    policy: Optional[RetryPolicy] = None,
+) -> T:
+    """Ejecuta `operation` con reintentos y registrando el resultado en el breaker
+
+    Lanza CircuitOpenError sin llamar si el circuito está abierto, o la última
+    excepción cuando se agotan los intentos o el error no es transitorio.
+    """
+    policy = policy or RetryPolicy()
+    for attempt in range(1, max(1, policy.attempts) + 1):
+        if breaker and not breaker.allow():
+            raise CircuitOpenError(f"{breaker.name} no disponible (circuito abierto)")
+        try:
+            result = await operation()
+        except Exception as e:
+            # Los 4xx son errores del pedido, no del backend
+            backend_failure = not (
+                isinstance(e, aiohttp.ClientResponseError) and e.status < 500
+            )
+            if breaker:
+                if backend_failure:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            if attempt >= policy.attempts or not policy.is_transient(e):
+                raise
+            await asyncio.sleep(policy.delay(attempt))
+            continue
+        if breaker:
+            breaker.record_success()
+        return result
+    raise RuntimeError("call_with_retry sin intentos")  # pragma: no cover
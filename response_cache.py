@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Response Cache - Caché persistente con TTL y desalojo LRU
+Guarda respuestas en SQLite para compartirlas entre ciclos del daemon,
+el CLI y los dashboards sin volver a consultar la red
+"""
+
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+CACHE_DIR = Path.home() / ".config" / "flight-monitor"
+
+
+def normalize_query(query: str) -> str:
+    """Normaliza una consulta: minúsculas y espacios colapsados"""
+    return " ".join(query.lower().split())
+
+
+def make_key(*parts: Any) -> str:
+    """Genera una clave estable (sha256) a partir de datos serializables"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Caché clave/valor en disco con TTL por entrada y tamaño acotado"""
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: float = 3600,
+        max_entries: int = 2000,
+        clock: Optional[Callable[[], float]] = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.clock = clock or time.time
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Una conexión por operación: seguro entre hilos y procesos
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Devuelve el valor cacheado o None si no existe o expiró"""
+        now = self.clock()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or row[1] < now:
+                    if row is not None:
+                        conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self.misses += 1
+                    return None
+                conn.execute(
+                    "UPDATE cache SET last_access = ? WHERE key = ?", (now, key)
+                )
+            self.hits += 1
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            self.logger.error(f"Error leyendo caché {self.path.name}: {e}")
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Guarda un valor con TTL propio (o el TTL por defecto)"""
+        now = self.clock()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at, last_access)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), expires_at, now),
+                )
+                self._evict(conn, now)
+        except (sqlite3.Error, TypeError) as e:
+            self.logger.error(f"Error guardando caché {self.path.name}: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Elimina entradas expiradas y, si sobra, las menos usadas (LRU)"""
+        conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            " SELECT key FROM cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def delete(self, key: str):
+        """Invalida una entrada concreta"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        """Vacía la caché completa"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache")
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def stats(self) -> Dict:
+        """Contadores de aciertos/fallos de este proceso"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Result Pool - Deduplicación de resultados Brave entre consultas
+Canonicaliza URLs y reúne los resultados de todas las consultas de una
+búsqueda para que el LLM vea cada página una sola vez
+"""
+
+from typing import Dict, List
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Parámetros de tracking que no cambian el contenido de la página
+TRACKING_PARAMS = {
+    "gclid",
+    "fbclid",
+    "msclkid",
+    "yclid",
+    "dclid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+    "ref",
+    "ref_src",
+    "igshid",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+
+def canonicalize_url(url: str) -> str:
+    """Forma canónica de una URL para comparar resultados
+
+    Quita fragmento, parámetros de tracking, el prefijo www. y la barra final;
+    ordena el resto de parámetros y pasa esquema/host a minúsculas.
+    """
+    try:
+        parts = urlsplit((url or "").strip())
+    except ValueError:
+        return (url or "").strip()
+    if not parts.netloc:
+        return (url or "").strip()
+
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    path = parts.path.rstrip("/") or "/"
+    scheme = parts.scheme.lower()
+    if scheme == "http":
+        scheme = "https"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class ResultPool:
+    """Resultados únicos de una búsqueda, combinando todas sus consultas"""
+
+    def __init__(self):
+        self._results: Dict[str, Dict] = {}
+        self.queries_by_url: Dict[str, List[str]] = {}
+        self.total_seen = 0
+
+    def add(self, results: List[Dict], query: str = ""):
+        """Incorpora los resultados de una consulta; conserva la primera copia"""
+        for result in results:
+            self.total_seen += 1
+            key = canonicalize_url(result.get("url", ""))
+            if not key:
+                continue
+            if key not in self._results:
+                self._results[key] = result
+                self.queries_by_url[key] = []
+            if query and query not in self.queries_by_url[key]:
+                self.queries_by_url[key].append(query)
+
+    def results(self) -> List[Dict]:
+        """Resultados únicos en orden de aparición"""
+        return list(self._results.values())
+
+    @property
+    def duplicates(self) -> int:
+        """Cantidad de resultados descartados por repetidos"""
+        return self.total_seen - len(self._results)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Stopping - Política de corte anticipado de la búsqueda de una ruta
+Las consultas se ejecutan por tandas; entre tandas la política decide si ya
+hay suficientes ofertas buenas, si las consultas dejaron de rendir o si se
+agotó el tiempo de la ruta, y el informe deja constancia del trabajo omitido
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from query_planner import PlannedQuery
+
+STOP_ENOUGH_DEALS = "enough_deals"
+STOP_NO_YIELD = "no_yield"
+STOP_TIME_BUDGET = "time_budget"
+
+
+@dataclass
+class StopPolicy:
+    """Criterios de corte; todos desactivados (0) por defecto"""
+
+    max_deals: int = 0  # Cortar con K ofertas con puntaje >= min_score
+    min_score: float = 90.0
+    idle_waves: int = 0  # Cortar tras N tandas seguidas sin ofertas nuevas
+    time_budget: float = 0.0  # Segundos por ruta
+    # Ofertas que no cuentan para max_deals (p. ej. ya notificadas)
+    ignore: Optional[Callable] = field(default=None, repr=False)
+
+    @classmethod
+    def from_env(cls) -> "StopPolicy":
+        """Lee la política desde variables de entorno"""
+        return cls(
+            max_deals=int(os.getenv("STOP_AFTER_DEALS", "0")),
+            min_score=float(os.getenv("STOP_MIN_SCORE", "90")),
+            idle_waves=int(os.getenv("STOP_IDLE_WAVES", "0")),
+            time_budget=float(os.getenv("ROUTE_TIME_BUDGET", "0")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_deals or self.idle_waves or self.time_budget)
+
+    def hits(self, deals: List) -> int:
+        """Ofertas que cuentan para max_deals"""
+        return sum(
+            1
+            for deal in deals
+            if deal.deal_score >= self.min_score
+            and not (self.ignore and self.ignore(deal))
+        )
+
+
+@dataclass
+class SearchReport:
+    """Trabajo realizado y omitido en la búsqueda de una ruta"""
+
+    route: str
+    queries_planned: int = 0
+    pages_run: int = 0
+    pages_failed: int = 0  # Sin respuesta de Brave (error, circuito o cuota)
+    waves: int = 0
+    deals: int = 0
+    stopped_reason: Optional[str] = None
+    # Páginas sin ejecutar ("consulta" o "consulta (página n)") y sus consultas
+    skipped_pages: List[str] = field(default_factory=list)
+    skipped_queries: List[str] = field(default_factory=list)
+    started: float = field(default_factory=time.monotonic, repr=False)
+    elapsed: float = 0.0
+
+    @property
+    def pages_skipped(self) -> int:
+        return len(self.skipped_pages)
+
+    @property
+    def queries_skipped(self) -> int:
+        return len(self.skipped_queries)
+
+    def skip(self, reason: str, pending: List[Tuple[PlannedQuery, int]]):
+        """Registra el corte y las páginas (consulta, offset) sin ejecutar"""
+        self.stopped_reason = reason
+        for planned, offset in pending:
+            self.skipped_pages.append(
+                planned.query if not offset else f"{planned.query} (página {offset + 1})"
+            )
+            if planned.query not in self.skipped_queries:
+                self.skipped_queries.append(planned.query)
+
+    def finish(self) -> "SearchReport":
+        self.elapsed = time.monotonic() - self.started
+        return self
+
+    def summary(self) -> str:
+        text = (
+            f"{self.route}: {self.pages_run} páginas en {self.waves} tandas, "
+            f"{self.deals} ofertas, {self.elapsed:.1f}s"
+        )
+        if self.pages_failed:
+            text += f", {self.pages_failed} páginas fallidas"
+        if self.stopped_reason:
+            text += (
+                f" — corte por {self.stopped_reason}, {self.pages_skipped} páginas "
+                f"de {self.queries_skipped} consultas omitidas"
+            )
+        return text
+
+
+class StopState:
+    """Evaluación de la política a lo largo de la búsqueda de una ruta"""
+
+    def __init__(
+        self, policy: Optional[StopPolicy], clock: Callable[[], float] = time.monotonic
+    ):
+        self.policy = policy
+        self.clock = clock
+        self.started = clock()
+        self.idle = 0
+        self.hits = 0
+
+    def out_of_time(self) -> bool:
+        return bool(
+            self.policy
+            and self.policy.time_budget
+            and self.clock() - self.started >= self.policy.time_budget
+        )
+
+    def after_wave(self, new_deals: List) -> Optional[str]:
+        """Motivo de corte tras una tanda, o None para continuar"""
+        if not self.policy:
+            return None
+        self.idle = 0 if new_deals else self.idle + 1
+        self.hits += self.policy.hits(new_deals)
+        if self.policy.max_deals and self.hits >= self.policy.max_deals:
+            return STOP_ENOUGH_DEALS
+        if self.policy.idle_waves and self.idle >= self.policy.idle_waves:
+            return STOP_NO_YIELD
+        if self.out_of_time():
+            return STOP_TIME_BUDGET
+        return None
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Template Stats - Rendimiento histórico de cada plantilla de consulta
+Guarda en disco, por tipo de ruta, cuántos resultados, ofertas y ofertas
+buenas produjo cada plantilla, con su latencia y cuota gastada; el planner
+usa esos datos para priorizar las productivas y omitir las que nunca rinden
+"""
+
+import os
+import json
+import fcntl
+import random
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+TEMPLATE_STATS_FILE = Path.home() / ".config" / "flight-monitor" / "template_stats.json"
+
+# Estadísticas y poda de plantillas (TEMPLATE_STATS=0 desactiva ambas)
+TEMPLATE_STATS = os.getenv("TEMPLATE_STATS", "1") == "1"
+# Ejecuciones mínimas antes de juzgar una plantilla
+TEMPLATE_MIN_RUNS = int(os.getenv("TEMPLATE_MIN_RUNS", "5"))
+# Probabilidad de ejecutar igual una plantilla podada (exploración)
+TEMPLATE_EXPLORE_RATE = float(os.getenv("TEMPLATE_EXPLORE_RATE", "0.1"))
+# Puntaje desde el que una oferta cuenta como "buena"
+TEMPLATE_HIT_SCORE = float(os.getenv("TEMPLATE_HIT_SCORE", "90"))
+
+DOMESTIC = "domestic"
+INTERNATIONAL = "international"
+
+# Aeropuertos argentinos: define si una ruta es doméstica
+ARGENTINE_AIRPORTS = {
+    "AEP", "EZE", "COR", "MDZ", "SLA", "BRC", "IGR", "USH", "TUC", "NQN",
+    "ROS", "MDQ", "FTE", "CRD", "REL", "JUJ", "RES", "PSS", "SDE", "CTC",
+    "LRJ", "UAQ", "SFN", "RGL", "RGA", "BHI", "VDM", "PMY", "CNQ", "FMA",
+    "RCU", "LUQ", "AFA", "EQS", "CPC", "VLG", "PRA", "SST", "GPO", "RCQ",
+}
+
+COUNTERS = ("runs", "productive", "pages", "results", "deals", "hits", "quota", "latency")
+
+
+def route_type(origin: str, destination: str) -> str:
+    """Tipo de ruta para agrupar estadísticas (doméstica o internacional)"""
+    if origin.upper() in ARGENTINE_AIRPORTS and destination.upper() in ARGENTINE_AIRPORTS:
+        return DOMESTIC
+    return INTERNATIONAL
+
+
+def template_key(route: str, template) -> str:
+    """Clave de una plantilla (QueryTemplate) dentro de un tipo de ruta"""
+    return f"{route}|{template.mode}|{template.template}"
+
+
+class TemplateStats:
+    """Registro en disco del rendimiento por plantilla y tipo de ruta"""
+
+    def __init__(
+        self,
+        path: Path = TEMPLATE_STATS_FILE,
+        min_runs: int = TEMPLATE_MIN_RUNS,
+        explore_rate: float = TEMPLATE_EXPLORE_RATE,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.min_runs = min_runs
+        self.explore_rate = explore_rate
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.data = self._read()
+
+    @contextmanager
+    def _locked(self) -> Iterator[Dict]:
+        """Lee, bloquea y reescribe el registro (seguro entre procesos)"""
+        with open(self.path.with_suffix(".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            data = self._read()
+            yield data
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self.path)
+
+    def _read(self) -> Dict:
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    return json.load(f)
+            except Exception as e:
+                self.logger.error(f"Error cargando estadísticas de plantillas: {e}")
+        return {"templates": {}}
+
+    def get(self, route: str, template) -> Dict:
+        """Contadores acumulados de una plantilla"""
+        return self.data.get("templates", {}).get(template_key(route, template), {})
+
+    def score(self, route: str, template) -> float:
+        """Tasa suavizada de ejecuciones con ofertas (0.5 sin datos)"""
+        stats = self.get(route, template)
+        return (stats.get("productive", 0) + 1) / (stats.get("runs", 0) + 2)
+
+    def is_low_yield(self, route: str, template) -> bool:
+        """Plantilla con suficientes ejecuciones y ninguna oferta"""
+        stats = self.get(route, template)
+        return stats.get("runs", 0) >= self.min_runs and stats.get("productive", 0) == 0
+
+    def should_skip(self, route: str, template) -> bool:
+        """Omitir una plantilla improductiva, salvo en las rondas de exploración"""
+        return self.is_low_yield(route, template) and random.random() >= self.explore_rate
+
+    def record(self, route: str, outcomes: List[Dict]):
+        """Suma una búsqueda de ruta: un dict por consulta ejecutada
+
+        Cada dict trae `templates` (las QueryTemplate de la consulta) y los
+        contadores pages, results, deals, hits, quota y latency.
+        """
+        if not outcomes:
+            return
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._locked() as data:
+            templates = data.setdefault("templates", {})
+            for outcome in outcomes:
+                for template in outcome["templates"]:
+                    stats = templates.setdefault(
+                        template_key(route, template), {name: 0 for name in COUNTERS}
+                    )
+                    stats["runs"] += 1
+                    stats["productive"] += 1 if outcome["deals"] else 0
+                    for name in ("pages", "results", "deals", "hits", "quota"):
+                        stats[name] += outcome[name]
+                    stats["latency"] = round(stats["latency"] + outcome["latency"], 3)
+                    stats["updated"] = now
+            self.data = data
+
+    def report(self, route: Optional[str] = None) -> List[Dict]:
+        """Filas por plantilla con promedios, de la más a la menos productiva"""
+        rows = []
+        for key, stats in self.data.get("templates", {}).items():
+            key_route, mode, template = key.split("|", 2)
+            if route and key_route != route:
+                continue
+            runs = stats.get("runs", 0) or 1
+            rows.append(
+                {
+                    "route_type": key_route,
+                    "mode": mode,
+                    "template": template,
+                    "runs": stats.get("runs", 0),
+                    "deal_rate": stats.get("productive", 0) / runs,
+                    "avg_results": stats.get("results", 0) / runs,
+                    "avg_deals": stats.get("deals", 0) / runs,
+                    "hits": stats.get("hits", 0),
+                    "quota": stats.get("quota", 0),
+                    "avg_latency": stats.get("latency", 0.0) / runs,
+                }
+            )
+        return sorted(rows, key=lambda row: row["deal_rate"], reverse=True)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Test de las piezas del benchmark offline"""
+
+import random
+import sys
+sys.path.insert(0, '.')
+
+from benchmark import (
+    LatencyDist,
+    compare,
+    make_routes,
+    percentile,
+    synth_brave_results,
+    synth_ollama_response,
+)
+from deal_schema import EXTRACTION_SCHEMA, validate_deal
+
+
+def test_latency_dist():
+    rng = random.Random(1)
+    assert LatencyDist.parse("fixed:0.05").sample(rng) == 0.05
+    uniform = LatencyDist.parse("uniform:0.01,0.1")
+    assert all(0.01 <= uniform.sample(rng) <= 0.1 for _ in range(100))
+
+
+def test_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.5
+    assert percentile(values, 99) > 99
+    assert percentile([], 95) == 0.0
+
+
+def test_rutas_distintas():
+    routes = make_routes(1000)
+    assert len({(r["origin"], r["destination"]) for r in routes}) == 1000
+
+
+def test_respuestas_sinteticas_validas():
+    brave = synth_brave_results("error fare EZE MAD 2026-03-15", 0, 10, 1.0)
+    urls = [r["url"] for r in brave["web"]["results"]]
+    prompt = "CONTEXTO: de EZE a MAD\nRESULTADOS DE BÚSQUEDA:\n" + "\n".join(urls)
+    data = synth_ollama_response({"prompt": prompt, "format": EXTRACTION_SCHEMA}, 2)
+    assert [validate_deal(d).booking_url for d in data["deals"]] == urls[:2]
+
+
+def test_compare_detecta_regresion():
+    base = {"results": {"engine/10": {"throughput": 2.0, "p95": 1.0, "peak_rss_mb": 50}}}
+    result = {"scenario": "engine", "routes": 10, "throughput": 1.0, "p95": 1.0, "peak_rss_mb": 50}
+    assert len(compare([result], base)) == 1
+    assert compare([dict(result, throughput=1.9)], base) == []
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Test de grabación y reproducción del tráfico con Ollama"""
+
+import gzip
+import sys
+sys.path.insert(0, '.')
+
+from benchmark import FakeServers, synth_brave_results
+from cassette import RECORD, REPLAY, Cassette
+from flight_search import OllamaAnalyzer
+from response_cache import ResponseCache
+
+CONTEXT = "Buscar errores de precio de EZE a MAD para fecha 2026-03-15"
+
+
+def _analyzer(url, cassette, tmp_path):
+    analyzer = OllamaAnalyzer(url, cache=ResponseCache(tmp_path / "cache.sqlite"))
+    analyzer.cache = None
+    analyzer.http.cassette = cassette
+    return analyzer
+
+
+def test_replay_reproduce_la_extraccion_sin_red(tmp_path):
+    results = synth_brave_results("error fare EZE MAD", 0, 10, 1.0)["web"]["results"]
+    path = tmp_path / "ollama.jsonl.gz"
+
+    servers = FakeServers().start()
+    try:
+        recording = Cassette(path, RECORD)
+        analyzer = _analyzer(servers.url, recording, tmp_path)
+        recorded = analyzer.analyze_flight_data(results, CONTEXT)
+        analyzer.close()
+        recording.close()
+    finally:
+        servers.stop()
+
+    replay = Cassette(path, REPLAY)
+    assert len(replay) == recording.stats["recorded"] > 0
+    # Otro host: la clave ignora el host y no hay servidor escuchando
+    analyzer = _analyzer("http://127.0.0.1:9", replay, tmp_path)
+    replayed = analyzer.analyze_flight_data(results, CONTEXT)
+    analyzer.close()
+
+    assert recorded
+    assert [d.to_dict() for d in replayed] == [d.to_dict() for d in recorded]
+    assert replay.stats["misses"] == 0
+
+
+def test_replay_conserva_el_instante_de_grabacion(tmp_path):
+    path = tmp_path / "ollama.jsonl.gz"
+    servers = FakeServers().start()
+    try:
+        recording = Cassette(path, RECORD)
+        analyzer = _analyzer(servers.url, recording, tmp_path)
+        analyzer.analyze_flight_data(
+            synth_brave_results("error fare EZE MAD", 0, 3, 1.0)["web"]["results"], CONTEXT
+        )
+        analyzer.close()
+        recording.close()
+    finally:
+        servers.stop()
+
+    replay = Cassette(path, REPLAY)
+    assert replay.recorded_at == recording.recorded_at
+
+
+def test_estado_grabado_se_reproduce_en_copia_temporal(tmp_path):
+    cache = ResponseCache(tmp_path / "brave_cache.sqlite", ttl=60, clock=lambda: 1000.0)
+    cache.set("k", ["grabado"])
+    stats = tmp_path / "template_stats.json"
+    stats.write_text('{"templates": {}}')
+
+    recording = Cassette(tmp_path / "c.jsonl.gz", RECORD)
+    recording.save_state({"brave_cache": cache.path, "template_stats": stats, "ollama_cache": None})
+    recording.close()
+    gzip.open(tmp_path / "c.jsonl.gz", "wt").close()  # Ciclo sin pedidos
+    cache.set("k", ["después de grabar"])  # No llega a la cassette
+
+    replay = Cassette(tmp_path / "c.jsonl.gz", REPLAY)
+    state = replay.restore_state()
+    assert state["ollama_cache"] is None
+    assert state["template_stats"].read_text() == stats.read_text()
+    # Con el reloj de la grabación la entrada sigue vigente
+    restored = ResponseCache(state["brave_cache"], ttl=60, clock=lambda: 1030.0)
+    assert restored.get("k") == ["grabado"]
+    restored.set("k", ["replay"])
+    quota = replay.scratch_path("brave_quota.json")
+    quota.write_text("{}")
+    replay.close()
+
+    # El replay no toca el estado grabado ni deja archivos
+    again = Cassette(tmp_path / "c.jsonl.gz", REPLAY)
+    assert ResponseCache(again.restore_state()["brave_cache"], clock=lambda: 1030.0).get("k") == ["grabado"]
+    again.close()
+    assert not quota.exists() and not state["brave_cache"].exists()
+    assert not list(tmp_path.glob("*.quota.json"))
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Test de la identidad normalizada y el merge de ofertas duplicadas"""
+
+import asyncio
+import sys
+sys.path.insert(0, '.')
+
+from deal_identity import airline_code, deal_identity, find_duplicate, iso_date, price_bucket
+from flight_search import FlightDeal, FlightSearchEngine
+from query_planner import ERROR_MODE, QueryPlanner
+
+
+def make_deal(**overrides) -> FlightDeal:
+    data = dict(
+        airline="LATAM",
+        origin="EZE",
+        destination="MAD",
+        price=522,
+        currency="USD",
+        departure_date="2026-03-15",
+        return_date=None,
+        connections=1,
+        booking_url="https://www.secretflying.com/posts/eze-mad-522",
+        source="Secret Flying",
+        reputation_score=80,
+        deal_score=85,
+        notes="Error de precio",
+    )
+    data.update(overrides)
+    return FlightDeal(**data)
+
+
+def test_normalization():
+    assert airline_code("LATAM") == airline_code("Latam Airlines") == airline_code("LA") == "LA"
+    assert airline_code("Aerolíneas Argentinas") == "AR"
+    assert airline_code("Iberia Express") == "IB"
+    assert airline_code("Norse Atlantic") == "norse atlantic"
+    assert price_bucket(522.0, "USD") == price_bucket(522, "usd") != price_bucket(540, "USD")
+    assert price_bucket(450000, "ARS") == price_bucket(451200, "ARS")
+    assert iso_date("15/03/2026") == iso_date("15 de marzo de 2026") == "2026-03-15"
+    assert iso_date("Marzo 2026") == iso_date("marzo de 2026") == "mar 2026"
+
+
+def test_identity_is_tolerant():
+    first = make_deal()
+    second = make_deal(airline="Latam Airlines", price=522.0, departure_date="15/03/2026", origin="eze")
+    assert deal_identity(first) == deal_identity(second)
+    assert hash(deal_identity(first)) == hash(deal_identity(second))
+    assert deal_identity(first) != deal_identity(make_deal(currency="EUR"))
+    assert deal_identity(first) != deal_identity(make_deal(departure_date="2026-03-16"))
+
+
+def test_deduplicate_merges_best_source():
+    engine = FlightSearchEngine.__new__(FlightSearchEngine)
+    weak = make_deal(booking_url="", source="Blog", notes="Sin link", deal_score=70)
+    strong = make_deal(airline="Latam Airlines", price=522.0, notes="Error de precio")
+    other = make_deal(destination="BCN")
+
+    unique = engine._deduplicate_deals([weak, strong, other])
+    assert len(unique) == 2
+    merged = unique[0]
+    assert merged.booking_url == strong.booking_url
+    assert merged.source == "Secret Flying"
+    assert merged.source_urls == [strong.booking_url]
+    assert merged.notes == "Error de precio | Sin link"
+    assert merged.deal_score == 85
+    # Las ofertas recibidas no se modifican
+    assert weak.booking_url == "" and weak.notes == "Sin link"
+
+    copy = make_deal(booking_url="https://www.fly4free.com/eze-mad", notes="Error de precio")
+    merged = engine._deduplicate_deals([strong, copy])[0]
+    assert merged.source_urls == [strong.booking_url, copy.booking_url]
+    assert merged.notes == "Error de precio"
+
+
+def test_price_bucket_edge():
+    # 522 y 523 quedan de lados distintos del borde 522.5
+    assert price_bucket(522, "USD") != price_bucket(523, "USD")
+    first = make_deal(price=522)
+    index = {deal_identity(first): first}
+    assert find_duplicate(index, deal_identity(make_deal(price=523)), make_deal(price=523)) is first
+    assert find_duplicate(index, deal_identity(make_deal(price=527)), make_deal(price=527)) is None
+    assert find_duplicate(index, deal_identity(make_deal(price=540)), make_deal(price=540)) is None
+
+    engine = FlightSearchEngine.__new__(FlightSearchEngine)
+    assert len(engine._deduplicate_deals([first, make_deal(price=523)])) == 1
+
+
+class PagedBrave:
+    """Brave falso: cada página llena trae un resultado por URL"""
+
+    MAX_OFFSET = 9
+
+    async def search_page_async(self, query, count=20, offset=0):
+        results = [
+            {"url": f"https://blog{offset}.example.com/post-{i}", "title": "", "description": ""}
+            for i in range(count)
+        ]
+        return results, True
+
+
+def test_duplicate_in_later_wave_keeps_evaluation():
+    engine = FlightSearchEngine.__new__(FlightSearchEngine)
+    engine.brave = PagedBrave()
+    engine.near_duplicates = None
+    engine.template_stats = None
+    engine.max_concurrency = 2
+    engine.cascade_stats = {"extraction_seconds": 0.0}
+
+    evaluated_url = "https://blog0.example.com/post-0"
+    copy_url = "https://blog1.example.com/post-0"
+    waves = iter([
+        [make_deal(booking_url=evaluated_url, source="Blog 0", deal_score=60, notes="Oferta")],
+        [make_deal(booking_url=copy_url, source="Blog 1", deal_score=95,
+                   reputation_score=70, notes="Copia", source_urls=[copy_url, "https://x.example.com"])],
+    ])
+
+    async def analyze(results, context, origin, destination, semaphore):
+        return next(waves, [])
+
+    async def evaluate(deals):
+        for deal in deals:
+            deal.deal_score = 40
+
+    engine._analyze_results_async = analyze
+    engine._evaluate_deals_async = evaluate
+
+    plan = QueryPlanner().plan("EZE", "MAD", "2026-03-15", [ERROR_MODE])[:1]
+    deals = asyncio.run(
+        engine._search_plan_async(
+            plan, "contexto", "EZE", "MAD", asyncio.Semaphore(2), evaluate=True
+        )
+    )
+    assert engine.last_report.pages_run == 2
+    assert len(deals) == 1
+    deal = deals[0]
+    assert deal.deal_score == 40
+    assert deal.reputation_score == 82
+    assert deal.booking_url == evaluated_url
+    assert deal.source == "Blog 0"
+    assert deal.source_urls[0] == evaluated_url and copy_url in deal.source_urls
+    assert deal.notes == "Oferta | Copia"
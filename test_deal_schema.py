@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Test de los esquemas de salida estructurada de Ollama"""
+
+import sys
+sys.path.insert(0, '.')
+
+import pytest
+from pydantic import ValidationError
+
+from deal_schema import (
+    EVALUATION_SCHEMA,
+    EXTRACTION_SCHEMA,
+    load_json_object,
+    validate_batch_items,
+    validate_deal,
+)
+
+
+def test_extraction_schema_sin_referencias():
+    items = EXTRACTION_SCHEMA["properties"]["deals"]["items"]
+    assert "$ref" not in str(EXTRACTION_SCHEMA)
+    assert "booking_url" in items["properties"]
+
+
+def test_load_json_object_texto_libre():
+    assert load_json_object('{"deals": []}') == {"deals": []}
+    assert load_json_object('Aquí va: {"deals": []} listo') == {"deals": []}
+    assert load_json_object("sin json") is None
+
+
+def test_extraction_schema_campos_obligatorios():
+    required = EXTRACTION_SCHEMA["properties"]["deals"]["items"]["required"]
+    assert {"price", "currency", "booking_url", "origin", "destination"} <= set(required)
+    assert {"is_error_fare", "confidence", "explanation"} <= set(EVALUATION_SCHEMA["required"])
+
+
+def test_validate_deal_defaults():
+    deal = validate_deal({
+        "airline": None,
+        "origin": "EZE",
+        "destination": "MAD",
+        "price": "522",
+        "currency": "USD",
+        "booking_url": "https://example.com",
+        "extra": 1,
+    })
+    assert deal.price == 522.0
+    assert deal.airline == "Desconocida"
+    assert deal.connections == 0
+
+
+def test_validate_deal_sin_precio():
+    with pytest.raises(ValidationError):
+        validate_deal({"airline": "Iberia", "origin": "EZE", "destination": "MAD",
+                       "currency": "USD", "booking_url": "https://example.com"})
+
+
+def test_batch_rechaza_items_individualmente():
+    valid, errors = validate_batch_items([
+        {"id": 1, "confidence": 90, "explanation": "ok"},
+        {"id": 2, "confidence": "alta"},
+        {"id": 3, "confidence": 150},
+    ])
+    assert [item.id for item in valid] == [1]
+    assert len(errors) == 2
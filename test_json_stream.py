@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Test del parser incremental de respuestas en streaming"""
+
+import json
+import sys
+sys.path.insert(0, '.')
+
+from json_stream import IncrementalJSONParser
+
+RESPONSE = (
+    '{"deals": ['
+    '{"airline": "Iberia", "price": 522.5, "notes": "precio \\"final\\" {no} [es json] \\\\"},'
+    '{"airline": "Aerol\\u00edneas", "price": 610, "tags": [[1, 2], [3]], "extra": {"a": [1]}}'
+    '], "other": [{"airline": "no es oferta"}], "total": 2}'
+)
+DEALS = json.loads(RESPONSE)["deals"]
+
+
+def _feed_all(parser, chunks):
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    return items
+
+
+def test_token_por_token():
+    parser = IncrementalJSONParser("deals")
+    assert _feed_all(parser, RESPONSE) == DEALS
+    assert parser.done
+    assert parser.result() == json.loads(RESPONSE)
+
+
+def test_cualquier_punto_de_corte():
+    # Corta en todas las posiciones: mitad de cadena, de escape, de \\u y de número
+    for cut in range(1, len(RESPONSE)):
+        parser = IncrementalJSONParser("deals")
+        assert _feed_all(parser, [RESPONSE[:cut], RESPONSE[cut:]]) == DEALS, cut
+        assert parser.result() == json.loads(RESPONSE)
+
+
+def test_cortes_dentro_de_escape_y_numero():
+    number = RESPONSE.index("522.5") + 2  # "52" | "2.5"
+    escape = RESPONSE.index('\\"final') + 1  # "\\" | "\""
+    unicode = RESPONSE.index("\\u00ed") + 3  # "\\u0" | "0ed"
+    chunks = [RESPONSE[:number], RESPONSE[number:escape],
+              RESPONSE[escape:unicode], RESPONSE[unicode:]]
+    parser = IncrementalJSONParser("deals")
+    # La primera oferta aún no se cerró
+    assert _feed_all(parser, chunks[:2]) == []
+    assert parser.feed(chunks[2]) == DEALS[:1]
+    assert parser.feed(chunks[3]) == DEALS[1:]
+
+
+def test_objeto_entre_texto_libre():
+    text = 'Claro [ver abajo]: aquí está la respuesta\n' + RESPONSE + '\nEspero que sirva {"x": 1}'
+    parser = IncrementalJSONParser("deals")
+    assert _feed_all(parser, [text[:30], text[30:]]) == DEALS
+    assert parser.done
+    # Lo posterior al cierre del objeto se ignora
+    assert parser.result() == json.loads(RESPONSE)
+
+
+def test_stream_truncado():
+    cut = RESPONSE.index('{"airline": "Aerol') + 20
+    parser = IncrementalJSONParser("deals")
+    assert _feed_all(parser, [RESPONSE[:cut]]) == DEALS[:1]
+    assert parser.started
+    assert not parser.done
+    assert parser.result() is None
+
+
+def test_sin_json_y_elementos_invalidos():
+    parser = IncrementalJSONParser("deals")
+    assert parser.feed("No encontré ofertas.") == []
+    assert not parser.started and parser.result() is None
+
+    parser = IncrementalJSONParser("deals")
+    items = parser.feed('{"deals": [{"price": 5.}, {"price": 7}, 3, "x"]}')
+    assert items == [{"price": 7}]
+    assert parser.done and parser.result() is None
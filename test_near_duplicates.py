@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Test del índice MinHash/LSH de resultados casi duplicados"""
+
+import asyncio
+import sys
+sys.path.insert(0, '.')
+
+from flight_search import FlightSearchEngine
+from near_duplicates import NearDuplicateIndex, minhash, search_key, similarity
+
+ORIGINAL = {
+    "title": "Error fare: Buenos Aires a Madrid por USD 522 ida y vuelta con Iberia",
+    "url": "https://www.secretflying.com/posts/buenos-aires-madrid-522",
+    "description": "Vuelos desde Buenos Aires (EZE) a Madrid (MAD) por solo USD 522 "
+                   "ida y vuelta con Iberia. Fechas de marzo a junio de 2026.",
+}
+COPY = {
+    "title": "Error fare: Buenos Aires a Madrid por USD 522 ida y vuelta con Iberia!",
+    "url": "https://www.fly4free.com/eze-mad-522",
+    "description": "Vuelos desde Buenos Aires (EZE) a Madrid (MAD) por solo USD 522 "
+                   "ida y vuelta con Iberia. Fechas de marzo a junio de 2026. Vía Secret Flying",
+}
+OTHER_PRICE = dict(COPY, url="https://www.fly4free.com/eze-mad-610",
+                   title=COPY["title"].replace("522", "610"),
+                   description=COPY["description"].replace("522", "610"))
+
+
+def test_minhash_similitud():
+    assert similarity(minhash(ORIGINAL["title"]), minhash(ORIGINAL["title"])) == 1.0
+    assert similarity(minhash(ORIGINAL["description"]), minhash(COPY["description"])) > 0.7
+    assert similarity(minhash(ORIGINAL["title"]), minhash("Hoteles baratos en Roma")) < 0.2
+
+
+def test_agrupa_copias_y_distingue_precios(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "nd.sqlite")
+    clusters = index.cluster([ORIGINAL, COPY, OTHER_PRICE], "EZE-MAD")
+    assert [c.representative for c in clusters] == [ORIGINAL, OTHER_PRICE]
+    assert clusters[0].urls == [ORIGINAL["url"], COPY["url"]]
+
+
+def test_reutiliza_ofertas_entre_ciclos(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "nd.sqlite")
+    [cluster] = index.cluster([ORIGINAL], "EZE-MAD")
+    index.record("EZE-MAD", [cluster], [[{"airline": "Iberia", "price": 522}]])
+
+    # Otro proceso, otro ciclo: la copia ya no necesita el LLM
+    index = NearDuplicateIndex(tmp_path / "nd.sqlite")
+    [cluster] = index.cluster([COPY], "EZE-MAD")
+    assert cluster.deals == [{"airline": "Iberia", "price": 522}]
+    assert cluster.urls == [COPY["url"], ORIGINAL["url"]]
+    # Las rutas no se mezclan
+    assert index.cluster([COPY], "EZE-BCN")[0].deals is None
+
+
+def test_tamano_acotado(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "nd.sqlite", max_entries=2)
+    results = [
+        {"title": f"Oferta {word} distinta", "url": f"https://a.com/{word}", "description": word}
+        for word in ("uno", "dos", "tres", "cuatro")
+    ]
+    clusters = index.cluster(results, "EZE-MAD")
+    index.record("EZE-MAD", clusters, [[] for _ in clusters])
+    assert len(index) == 2
+
+
+def test_clave_por_busqueda():
+    marzo = search_key("EZE-MAD", "Buscar vuelos de EZE a MAD para fecha 2026-03")
+    abril = search_key("EZE-MAD", "Buscar vuelos de EZE a MAD para fecha 2026-04")
+    assert marzo != abril
+    assert marzo == search_key("EZE-MAD", "buscar  vuelos de EZE a MAD para fecha 2026-03")
+
+
+class FailingAnalyzer:
+    """Analizador falso: el lote con la oferta de 610 falla en Ollama"""
+
+    price_prefilter = False
+
+    def select_results(self, results, origin, destination, top_k):
+        return results
+
+    def chunk_results(self, results, context):
+        return [[r] for r in results]
+
+    async def analyze_flight_data_async(self, chunk, context, *args, strict=False, **kwargs):
+        if "610" in chunk[0]["title"]:
+            raise RuntimeError("Ollama caído")
+        return []
+
+
+def test_no_recuerda_lotes_fallidos(tmp_path):
+    engine = FlightSearchEngine.__new__(FlightSearchEngine)
+    engine.ollama = FailingAnalyzer()
+    engine.near_duplicates = NearDuplicateIndex(tmp_path / "nd.sqlite")
+    engine.route_top_k = {}
+
+    async def run():
+        return await engine._analyze_results_async(
+            [ORIGINAL, OTHER_PRICE], "contexto", "EZE", "MAD", asyncio.Semaphore(2)
+        )
+
+    assert asyncio.run(run()) == []
+    key = search_key("EZE-MAD", "contexto")
+    [analyzed] = engine.near_duplicates.cluster([COPY], key)
+    assert analyzed.deals == []
+    [failed] = engine.near_duplicates.cluster([OTHER_PRICE], key)
+    assert failed.deals is None
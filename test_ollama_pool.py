@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Test del pool de nodos de Ollama y la elección de modelo por nodo"""
+
+import asyncio
+import sys
+sys.path.insert(0, '.')
+
+import aiohttp
+import pytest
+from yarl import URL
+
+from benchmark import FakeServers
+from flight_search import OllamaAnalyzer
+from http_pool import run_sync
+from ollama_pool import OllamaPool, model_installed, parse_endpoints
+from resilience import CircuitOpenError
+from response_cache import ResponseCache
+
+
+def _analyzer(tmp_path, fast_model=None):
+    return OllamaAnalyzer(
+        "http://a:11434|qwen2.5:7b, http://b:11434",
+        model="llama3.1:8b",
+        cache=ResponseCache(tmp_path / "cache.sqlite"),
+        fast_model=fast_model,
+    )
+
+
+def test_modelo_fijo_del_nodo(tmp_path):
+    analyzer = _analyzer(tmp_path)
+    pinned, default = analyzer.pool.nodes
+    model = analyzer.extraction_model
+    assert analyzer._payload("p", False, pinned, model=model)["model"] == "qwen2.5:7b"
+    assert analyzer._payload("p", False, default, model=model)["model"] == "llama3.1:8b"
+    assert analyzer.models() == ["llama3.1:8b", "qwen2.5:7b"]
+    analyzer.close()
+
+
+def test_cascada_usa_el_modelo_chico(tmp_path):
+    analyzer = _analyzer(tmp_path, fast_model="llama3.2:3b")
+    pinned, _ = analyzer.pool.nodes
+    model = analyzer.extraction_model
+    assert analyzer._payload("p", False, pinned, model=model)["model"] == "llama3.2:3b"
+    analyzer.close()
+
+
+def test_parse_endpoints():
+    nodes = parse_endpoints(" http://a:11434/|qwen2.5:7b , ,http://b:11434")
+    assert [(n.url, n.model) for n in nodes] == [
+        ("http://a:11434", "qwen2.5:7b"),
+        ("http://b:11434", None),
+    ]
+    assert [n.url for n in parse_endpoints(["http://c|m", "http://d"])] == ["http://c", "http://d"]
+    assert model_installed("llama3.1", {"llama3.1:latest"})
+    assert not model_installed("llama3.1:8b", {"llama3.1:latest"})
+
+
+REQUEST = aiohttp.RequestInfo(URL("http://mf-a/api/generate"), "POST", {}, URL("http://mf-a"))
+
+
+def _pool(*urls):
+    # URLs propias por test: los breakers son compartidos por nombre en el proceso
+    return OllamaPool(parse_endpoints(list(urls)), http=None, health_interval=3600)
+
+
+def test_elige_el_nodo_con_menos_peticiones():
+    pool = _pool("http://lo-a", "http://lo-b")
+    a, b = pool.nodes
+
+    async def run():
+        async with pool.lease() as first:
+            async with pool.lease() as second:
+                assert {first.url, second.url} == {a.url, b.url}
+                async with pool.lease() as third:
+                    # Empate en curso: desempata por atendidas
+                    assert third.outstanding == 2
+        assert a.outstanding == b.outstanding == 0
+        assert a.served + b.served == 3
+
+    asyncio.run(run())
+
+
+def test_fallo_del_backend_saca_al_nodo():
+    pool = _pool("http://mf-a", "http://mf-b")
+    a, b = pool.nodes
+
+    async def fail(status):
+        with pytest.raises(aiohttp.ClientResponseError):
+            async with pool.lease(a):
+                raise aiohttp.ClientResponseError(REQUEST, (), status=status)
+
+    # Un 4xx es del pedido: el nodo sigue sano
+    asyncio.run(fail(400))
+    assert a.healthy and a.failures == 0
+    asyncio.run(fail(500))
+    assert not a.healthy and a.failures == 1
+
+    async def acquire():
+        return await pool.acquire()
+
+    assert asyncio.run(acquire()) is b
+    b.healthy = False
+    pool.health_check = _no_health_check
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(acquire())
+
+
+async def _no_health_check():
+    pass
+
+
+def test_health_check_exige_los_modelos_del_nodo(tmp_path):
+    servers = FakeServers().start()  # /api/tags solo tiene llama3.1:8b
+    try:
+        analyzer = OllamaAnalyzer(
+            f"{servers.url}|qwen2.5:7b, {servers.url}/",
+            model="llama3.1:8b",
+            cache=ResponseCache(tmp_path / "cache.sqlite"),
+        )
+        pinned, default = analyzer.pool.nodes
+        run_sync(analyzer.pool.health_check())
+        assert not pinned.healthy and "qwen2.5:7b" in pinned.last_error
+        assert default.healthy
+
+        # Con cascada también se exige el modelo chico en todos los nodos
+        analyzer.pool.extra_models = ["llama3.2:3b"]
+        assert analyzer.pool.node_models(default) == ["llama3.1:8b", "llama3.2:3b"]
+        run_sync(analyzer.pool.health_check())
+        assert not default.healthy
+        analyzer.close()
+    finally:
+        servers.stop()
+
+
+def test_warm_up_carga_todos_los_modelos(tmp_path):
+    analyzer = _analyzer(tmp_path, fast_model="llama3.2:3b")
+    analyzer.pool.health_check = _no_health_check
+    loaded = []
+
+    async def generate(prompt, timeout, node=None, model=None, num_predict=None):
+        loaded.append((node.url, model))
+        return ""
+
+    analyzer._generate_async = generate
+    assert analyzer.warm_up()
+    assert sorted(loaded) == [
+        ("http://a:11434", "llama3.2:3b"),
+        ("http://a:11434", "qwen2.5:7b"),
+        ("http://b:11434", "llama3.1:8b"),
+        ("http://b:11434", "llama3.2:3b"),
+    ]
+    analyzer.close()
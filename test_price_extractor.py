@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Test del extractor de precios por regex (pre-etapa de Ollama)"""
+
+import sys
+sys.path.insert(0, '.')
+
+from price_extractor import (
+    extract_direct_deal,
+    filter_priced_results,
+    find_prices,
+    parse_amount,
+)
+
+
+def test_parse_amount_separadores():
+    assert parse_amount("250.000") == 250000
+    assert parse_amount("1,234.56") == 1234.56
+    assert parse_amount("1.234,56") == 1234.56
+    assert parse_amount("350,50") == 350.5
+
+
+def test_find_prices_formatos():
+    assert find_prices("Vuelo USD 400") == [("USD", 400.0, "USD 400")]
+    assert find_prices("desde $500")[0][:2] == ("$", 500.0)
+    assert find_prices("€350 a Roma")[0][:2] == ("EUR", 350.0)
+    assert find_prices("ARS 250.000 ida y vuelta")[0][:2] == ("ARS", 250000.0)
+    assert find_prices("2 escalas, 5 estrellas") == []
+
+
+def test_filter_priced_results():
+    results = [
+        {"title": "Banda negativa EZE MAD", "description": "Ver ofertas"},
+        {"title": "Iberia EZE MAD", "description": "Por USD 522 ida y vuelta"},
+    ]
+    assert filter_priced_results(results) == results[1:]
+
+
+def test_extract_direct_deal():
+    result = {
+        "title": "Iberia EZE - MAD por USD 522",
+        "description": "Salida 2026-03-15",
+        "url": "https://www.secretflying.com/posts/eze-mad",
+    }
+    deal = extract_direct_deal(result, "EZE", "MAD")
+    assert deal["airline"] == "Iberia"
+    assert (deal["currency"], deal["price"]) == ("USD", 522.0)
+    assert deal["departure_date"] == "2026-03-15"
+    assert deal["source"] == "secretflying.com"
+
+    # Precio ambiguo o ruta ausente: se deja para el LLM
+    assert extract_direct_deal(dict(result, title="Iberia EZE MAD $522 o USD 600"), "EZE", "MAD") is None
+    assert extract_direct_deal(result, "EZE", "BCN") is None
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Test del presupuesto de tokens y la serialización compacta de resultados"""
+
+import sys
+sys.path.insert(0, '.')
+
+from prompt_budget import (
+    chunk_by_budget,
+    clean_text,
+    compact_result,
+    estimate_tokens,
+    relevant_sentences,
+)
+
+
+def test_clean_text_html():
+    texto = "Vuelo <strong>EZE</strong> &amp; MAD&#x27;s   oferta\n\n  hoy"
+    assert clean_text(texto) == "Vuelo EZE & MAD's oferta hoy"
+
+
+def test_relevant_sentences_conserva_precios():
+    texto = (
+        "Bienvenidos a nuestro blog de viajes. "
+        "Vuelos de EZE a MAD por USD 522 ida y vuelta. "
+        "Suscribite al newsletter."
+    )
+    assert relevant_sentences(texto) == "Vuelos de EZE a MAD por USD 522 ida y vuelta."
+    # Sin menciones relevantes queda la primera oración
+    assert relevant_sentences("Hola mundo. Otra cosa.") == "Hola mundo."
+
+
+def test_compact_result_recorta_descripcion():
+    result = {
+        "title": "Oferta <b>Iberia</b>",
+        "url": "https://example.com/oferta",
+        "description": "USD 522 " + "palabra " * 200,
+    }
+    block = compact_result(result, description_tokens=20)
+    assert block.startswith("Título: Oferta Iberia\nURL: https://example.com/oferta\n")
+    assert estimate_tokens(block) < 60
+
+
+def test_chunk_by_budget_incluye_todos():
+    results = [
+        {"title": f"Oferta {i}", "url": f"https://example.com/{i}", "description": "USD 500 " * 30}
+        for i in range(25)
+    ]
+    chunks = list(chunk_by_budget(results, budget=300, max_results=10))
+    assert sum(len(chunk) for chunk in chunks) == 25
+    assert all(1 <= len(chunk) <= 10 for chunk in chunks)
+    assert len(chunks) > 3  # El presupuesto corta antes que el máximo de 10
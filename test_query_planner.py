@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Test del planner de consultas con estadísticas de plantillas"""
+
+import asyncio
+import sys
+sys.path.insert(0, '.')
+
+from flight_search import FlightSearchEngine
+from query_planner import ERROR_MODE, TEMPLATES_BY_MODE, QueryPlanner
+from template_stats import DOMESTIC, INTERNATIONAL, TemplateStats, route_type
+
+
+def _outcome(template, deals):
+    return {
+        "templates": [template],
+        "pages": 1,
+        "results": 10,
+        "deals": deals,
+        "hits": 0,
+        "quota": 1,
+        "latency": 0.2,
+    }
+
+
+def test_route_type():
+    assert route_type("EZE", "MDZ") == DOMESTIC
+    assert route_type("EZE", "MAD") == INTERNATIONAL
+
+
+def test_planner_poda_y_prioriza(tmp_path):
+    stats = TemplateStats(tmp_path / "stats.json", min_runs=3, explore_rate=0)
+    templates = TEMPLATES_BY_MODE[ERROR_MODE]
+    productive = templates[-1]
+    for _ in range(3):
+        stats.record(
+            DOMESTIC,
+            [_outcome(t, 2 if t is productive else 0) for t in templates],
+        )
+
+    plan = QueryPlanner(stats=stats).plan("EZE", "MDZ", "2026-03-15", [ERROR_MODE])
+    assert [p.templates[0] for p in plan] == [productive]
+
+    # Las estadísticas domésticas no afectan a las rutas internacionales
+    plan = QueryPlanner(stats=stats).plan("EZE", "MAD", "2026-03-15", [ERROR_MODE])
+    assert len(plan) == len(templates)
+
+
+def test_planner_conserva_una_plantilla(tmp_path):
+    stats = TemplateStats(tmp_path / "stats.json", min_runs=1, explore_rate=0)
+    templates = TEMPLATES_BY_MODE[ERROR_MODE]
+    stats.record(DOMESTIC, [_outcome(t, 0) for t in templates])
+
+    planner = QueryPlanner(stats=stats)
+    plan = planner.plan("EZE", "MDZ", "2026-03-15", [ERROR_MODE])
+    assert len(plan) == 1
+    assert len(planner.pruned) == len(templates) - 1
+
+
+class DownBrave:
+    """Brave falso sin respuesta: cada página falla"""
+
+    async def search_page_async(self, query, count=20, offset=0):
+        return None, False
+
+
+class IdleAnalyzer:
+    price_prefilter = False
+
+    def select_results(self, results, origin, destination, top_k):
+        return results
+
+    def chunk_results(self, results, context):
+        return []
+
+
+def test_paginas_fallidas_no_cuentan(tmp_path):
+    engine = FlightSearchEngine.__new__(FlightSearchEngine)
+    engine.brave = DownBrave()
+    engine.ollama = IdleAnalyzer()
+    engine.near_duplicates = None
+    engine.route_top_k = {}
+    engine.max_concurrency = 2
+    engine.cascade_stats = {"extraction_seconds": 0.0}
+    engine.template_stats = TemplateStats(tmp_path / "stats.json", min_runs=1, explore_rate=0)
+
+    plan = QueryPlanner().plan("EZE", "MDZ", "2026-03-15", [ERROR_MODE])
+    deals = asyncio.run(
+        engine._search_plan_async(plan, "contexto", "EZE", "MDZ", asyncio.Semaphore(2))
+    )
+    assert deals == []
+    assert engine.last_report.pages_failed == len(plan)
+    # Una caída de la red no poda plantillas
+    stats = TemplateStats(tmp_path / "stats.json", min_runs=1, explore_rate=0)
+    assert stats.data.get("templates", {}) == {}
+    assert len(QueryPlanner(stats=stats).plan("EZE", "MDZ", "2026-03-15", [ERROR_MODE])) == len(plan)
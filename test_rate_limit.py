@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Test del token bucket y el registro de cuota de Brave"""
+
+import json
+import sys
+sys.path.insert(0, '.')
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import rate_limit
+from flight_search import BraveSearchClient
+from rate_limit import QuotaLedger, TokenBucket
+
+
+class FakeTime:
+    """Reemplazo de time y datetime dentro de rate_limit"""
+
+    def __init__(self):
+        self.now = datetime(2026, 3, 31, 23, 59, 0)
+
+    def time(self) -> float:
+        return self.now.timestamp()
+
+    def monotonic(self) -> float:
+        return self.now.timestamp()
+
+    def advance(self, seconds: float):
+        self.now += timedelta(seconds=seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(rate_limit, "time", fake)
+
+    class FakeDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return fake.now
+
+    monkeypatch.setattr(rate_limit, "datetime", FakeDatetime)
+    return fake
+
+
+def test_bucket_tasa_rafaga_y_pausa(clock):
+    bucket = TokenBucket(2.0, burst=2)
+    assert [bucket._reserve() for _ in range(3)] == [0, 0, 0.5]
+    clock.advance(1.5)
+    assert bucket._reserve() == 0
+    bucket.pause(10)
+    assert bucket._reserve() == 10
+    assert TokenBucket(0)._reserve() == 0  # Sin límite
+
+
+def test_registro_diario_y_mensual(tmp_path, clock):
+    ledger = QuotaLedger(tmp_path / "quota.json", daily_limit=2, monthly_limit=3)
+    ledger.record_call()
+    ledger.record_call()
+    assert ledger.remaining()["daily_remaining"] == 0
+    assert ledger.exhausted()
+
+    # Cambio de día: el diario vuelve a cero, el mensual sigue
+    clock.advance(120)  # 2026-04-01 00:01
+    budget = ledger.remaining()
+    assert budget["used_today"] == 0 and budget["used_month"] == 0
+    ledger.record_call()
+    data = json.loads((tmp_path / "quota.json").read_text())
+    # Solo se conservan los días del mes en curso
+    assert data["days"] == {"2026-04-01": 1}
+    assert data["months"] == {"2026-03": 2, "2026-04": 1}
+    assert not ledger.exhausted()
+
+    clock.advance(86400)
+    ledger.record_call()
+    ledger.record_call()
+    assert ledger.remaining()["monthly_remaining"] == 0
+    assert ledger.exhausted()
+
+
+def test_bloqueo_por_429(tmp_path, clock):
+    ledger = QuotaLedger(tmp_path / "quota.json")
+    ledger.update_from_headers({"Retry-After": "30"}, status=200)
+    assert ledger.blocked_for() == 0  # Solo un 429 bloquea
+    ledger.update_from_headers({"Retry-After": "30"}, status=429)
+    assert ledger.blocked_for() == 30
+    # Otro proceso ve el mismo bloqueo; nunca se acorta
+    other = QuotaLedger(tmp_path / "quota.json")
+    other.update_from_headers({"X-RateLimit-Reset": "5"}, status=429)
+    assert other.blocked_for() == 30
+    clock.advance(31)
+    assert ledger.blocked_for() == 0
+
+
+def test_cuota_informada_por_brave(tmp_path, clock):
+    ledger = QuotaLedger(tmp_path / "quota.json")
+    ledger.update_from_headers({
+        "X-RateLimit-Limit": "1, 2000",
+        "X-RateLimit-Remaining": "0, 0",
+        "X-RateLimit-Reset": "1, 3600",
+    })
+    assert ledger.remaining()["remote_remaining"] == 0
+    assert ledger.exhausted()
+    # Pasada la ventana informada, el dato remoto ya no vale
+    clock.advance(3601)
+    assert ledger.remaining()["remote_remaining"] is None
+    assert not ledger.exhausted()
+
+
+def test_bucket_compartido_entre_procesos(tmp_path, clock):
+    # Dos procesos (daemon y dashboard) con su propio bucket sobre el mismo registro
+    daemon = TokenBucket(1.0, ledger=QuotaLedger(tmp_path / "quota.json"))
+    dashboard = TokenBucket(1.0, ledger=QuotaLedger(tmp_path / "quota.json"))
+    assert daemon._reserve() == 0
+    # El segundo pedido espera aunque venga de otro bucket
+    assert dashboard._reserve() == 1.0
+    assert daemon._reserve() == 2.0
+    clock.advance(3)
+    assert dashboard._reserve() == 0
+
+
+def test_respuesta_en_una_escritura(tmp_path, clock):
+    ledger = QuotaLedger(tmp_path / "quota.json")
+    ledger.record_response({"Retry-After": "20", "X-RateLimit-Remaining": "0, 10"}, status=429)
+    data = json.loads((tmp_path / "quota.json").read_text())
+    assert data["days"] == {"2026-03-31": 1}
+    assert data["remote"]["remaining"] == [0, 10]
+    assert ledger.blocked_for() == 20
+    ledger.record_response({})  # Sin cabeceras solo cuenta la llamada
+    assert ledger.remaining()["used_today"] == 2
+
+
+def test_search_distingue_fallo_de_vacio(tmp_path, clock):
+    client = BraveSearchClient.__new__(BraveSearchClient)
+    client.cache = None
+    client.cache_bypass = False
+    client.quota = QuotaLedger(tmp_path / "quota.json", daily_limit=1)
+    client.quota.record_call()
+    # Cuota agotada: None, no una lista vacía
+    assert client.search("EZE MAD") is None
+
+    client.cache = type("Cache", (), {"get": lambda self, key: []})()
+    assert client.search("EZE MAD") == []
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Test del pre-ranking de resultados"""
+
+import sys
+from datetime import datetime, timezone
+sys.path.insert(0, '.')
+
+from relevance import parse_route_top_k, rank_results, result_age_days, score_result
+
+NOW = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+DEAL = {
+    "title": "Error fare Buenos Aires a Madrid por USD 522",
+    "url": "https://www.secretflying.com/posts/eze-mad",
+    "description": "Vuelos EZE - MAD desde USD 522, salidas 2026-03-15",
+    "age": "2 days ago",
+}
+GUIDE = {
+    "title": "Qué ver en Madrid",
+    "url": "https://blog.example.com/madrid",
+    "description": "Guía de la ciudad",
+}
+OTHER_ROUTE = {
+    "title": "Error fare COR a MIA por USD 400",
+    "url": "https://www.fly4free.com/posts/cor-mia",
+    "description": "Vuelos COR - MIA",
+}
+
+
+def test_score_prefiere_la_ruta_con_precio():
+    assert score_result(DEAL, "EZE", "MAD", NOW) > score_result(OTHER_ROUTE, "EZE", "MAD", NOW)
+    assert score_result(OTHER_ROUTE, "EZE", "MAD", NOW) > score_result(GUIDE, "EZE", "MAD", NOW)
+
+
+def test_rank_top_k_estable():
+    results = [GUIDE, OTHER_ROUTE, DEAL]
+    assert rank_results(results, "EZE", "MAD", 2) == [DEAL, OTHER_ROUTE]
+    assert rank_results(results, "EZE", "MAD") == [DEAL, OTHER_ROUTE, GUIDE]
+    # Empates: se conserva el orden de Brave
+    assert rank_results([GUIDE, dict(GUIDE)], "EZE", "MAD") == [GUIDE, GUIDE]
+
+
+def test_antiguedad():
+    assert result_age_days({"age": "hace 3 días"}, NOW) == 3
+    assert result_age_days({"page_age": "2026-02-26T00:00:00"}, NOW) == 3
+    assert result_age_days({"age": "August 1, 2025"}, NOW) is None
+
+
+def test_parse_route_top_k():
+    assert parse_route_top_k("eze-mad:40, MDZ-SLA:10,mal") == {"EZE-MAD": 40, "MDZ-SLA": 10}
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Test de reintentos y circuit breaker con reloj falso"""
+
+import asyncio
+import sys
+sys.path.insert(0, '.')
+
+import aiohttp
+import pytest
+
+from resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    call_with_retry,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _http_error(status: int) -> aiohttp.ClientResponseError:
+    return aiohttp.ClientResponseError(None, (), status=status)
+
+
+def _operation(*outcomes):
+    """Operación que lanza o devuelve cada resultado en orden y cuenta las llamadas"""
+    calls = []
+
+    async def operation():
+        outcome = outcomes[len(calls)]
+        calls.append(outcome)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    return operation, calls
+
+
+FAST = RetryPolicy(attempts=3, base_delay=0, jitter=0)
+
+
+def test_clasificacion_de_errores():
+    policy = RetryPolicy()
+    assert policy.is_transient(_http_error(503))
+    assert not policy.is_transient(_http_error(404))
+    assert policy.is_transient(aiohttp.ClientConnectionError())
+    assert not policy.is_transient(asyncio.TimeoutError())
+    assert RetryPolicy(retry_on_timeout=True).is_transient(asyncio.TimeoutError())
+    assert not policy.is_transient(ValueError())
+
+
+def test_backoff_exponencial_acotado():
+    policy = RetryPolicy(base_delay=0.5, max_delay=3, jitter=0)
+    assert [policy.delay(n) for n in (1, 2, 3, 4)] == [0.5, 1.0, 2.0, 3]
+    assert 0.5 <= RetryPolicy(base_delay=0.5, jitter=0.5).delay(1) <= 0.75
+
+
+def test_reintenta_5xx_hasta_exito(clock):
+    breaker = CircuitBreaker("t", failure_threshold=5, clock=clock)
+    operation, calls = _operation(_http_error(502), aiohttp.ClientConnectionError(), "ok")
+    assert asyncio.run(call_with_retry(operation, breaker, FAST)) == "ok"
+    assert len(calls) == 3
+    assert breaker.state == CLOSED and breaker.failures == 0
+    assert breaker.total_failures == 2
+
+
+def test_4xx_no_se_reintenta_ni_abre_el_circuito(clock):
+    breaker = CircuitBreaker("t", failure_threshold=1, clock=clock)
+    operation, calls = _operation(_http_error(400), "no llega")
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(call_with_retry(operation, breaker, FAST))
+    assert len(calls) == 1
+    assert breaker.state == CLOSED and breaker.total_failures == 0
+
+
+def test_429_no_se_reintenta_dos_veces(clock):
+    # El cliente ya reintentó según el Retry-After: call_with_retry no insiste
+    assert not RetryPolicy().is_transient(_http_error(429))
+    operation, calls = _operation(_http_error(429), "no llega")
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(call_with_retry(operation, None, FAST))
+    assert len(calls) == 1
+
+
+def test_timeout_sin_reintento_por_defecto():
+    operation, calls = _operation(asyncio.TimeoutError(), "ok")
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(call_with_retry(operation, None, FAST))
+    assert len(calls) == 1
+
+
+def test_agota_los_intentos():
+    operation, calls = _operation(*[_http_error(500)] * 3)
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(call_with_retry(operation, None, FAST))
+    assert len(calls) == 3
+
+
+def test_transiciones_del_breaker(clock):
+    breaker = CircuitBreaker("t", failure_threshold=2, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.snapshot()["retry_in"] == 30
+
+    # Pasado el reset_timeout: una sola petición de prueba
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    assert breaker.total_rejected == 2
+
+    # La prueba falla: vuelve a abrirse al instante, sin esperar al umbral
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+    assert breaker.allow()
+
+
+def test_circuito_abierto_no_llama(clock):
+    breaker = CircuitBreaker("t", failure_threshold=1, clock=clock)
+    breaker.record_failure()
+    operation, calls = _operation("ok")
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call_with_retry(operation, breaker, FAST))
+    assert calls == []
+
+
+def test_el_breaker_corta_los_reintentos(clock):
+    breaker = CircuitBreaker("t", failure_threshold=2, clock=clock)
+    operation, calls = _operation(_http_error(500), _http_error(500), "ok")
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call_with_retry(operation, breaker, FAST))
+    assert len(calls) == 2
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Test de la caché persistente con TTL y desalojo LRU"""
+
+import sys
+sys.path.insert(0, '.')
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, make_key, normalize_query
+
+
+class FakeTime:
+    """Reemplazo del módulo time dentro de response_cache"""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(response_cache, "time", fake)
+    return fake
+
+
+def test_normalize_query_y_make_key():
+    assert normalize_query("  Error FARE\tEZE   MAD ") == "error fare eze mad"
+    assert make_key("brave", {"count": 20, "q": "x"}) == make_key("brave", {"q": "x", "count": 20})
+    assert make_key("brave", "a") != make_key("brave", "b")
+    assert len(make_key("x")) == 64
+
+
+def test_ttl(tmp_path, clock):
+    cache = ResponseCache(tmp_path / "c.sqlite", ttl=60)
+    cache.set("a", {"deals": [1]})
+    cache.set("b", [1], ttl=600)
+    clock.now += 59
+    assert cache.get("a") == {"deals": [1]}
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.get("b") == [1]
+    assert len(cache) == 1  # La expirada se borró al leerla
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_desalojo_lru(tmp_path, clock):
+    cache = ResponseCache(tmp_path / "c.sqlite", ttl=3600, max_entries=2)
+    cache.set("a", 1)
+    clock.now += 1
+    cache.set("b", 2)
+    clock.now += 1
+    assert cache.get("a") == 1  # "a" pasa a ser la más reciente
+    clock.now += 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_expiradas_se_desalojan_al_guardar(tmp_path, clock):
+    cache = ResponseCache(tmp_path / "c.sqlite", ttl=10)
+    cache.set("a", 1)
+    clock.now += 11
+    cache.set("b", 2)
+    assert len(cache) == 1
+    cache.delete("b")
+    assert len(cache) == 0
+
+
+def test_compartida_entre_instancias(tmp_path, clock):
+    ResponseCache(tmp_path / "c.sqlite").set("k", {"v": "ñ"})
+    assert ResponseCache(tmp_path / "c.sqlite").get("k") == {"v": "ñ"}
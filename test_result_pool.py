@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Test de la canonicalización de URLs y el pool de resultados"""
+
+import sys
+sys.path.insert(0, '.')
+
+from result_pool import ResultPool, canonicalize_url
+
+
+def test_canonicalize_url():
+    canonical = "https://secretflying.com/posts/eze-mad?a=1&b=2"
+    assert canonicalize_url("http://WWW.SecretFlying.com/posts/eze-mad/?b=2&a=1") == canonical
+    assert canonicalize_url(
+        "https://secretflying.com/posts/eze-mad?utm_source=x&b=2&gclid=1&a=1#comentarios"
+    ) == canonical
+    # Los parámetros que cambian el contenido se conservan
+    assert canonicalize_url("https://a.com/?page=2") != canonicalize_url("https://a.com/?page=3")
+    assert canonicalize_url("https://a.com") == "https://a.com/"
+    assert canonicalize_url("  sin-host  ") == "sin-host"
+    assert canonicalize_url("") == ""
+
+
+def test_pool_conserva_la_primera_copia_y_sus_consultas():
+    pool = ResultPool()
+    first = {"url": "https://www.a.com/oferta?utm_medium=x", "title": "primera"}
+    pool.add([first, {"url": "https://b.com/1"}], "error fare EZE MAD")
+    pool.add([{"url": "http://a.com/oferta/", "title": "copia"}, {"url": ""}], "EZE MAD barato")
+    pool.add([{"url": "https://a.com/oferta"}], "error fare EZE MAD")
+
+    assert pool.results() == [first, {"url": "https://b.com/1"}]
+    assert len(pool) == 2
+    assert pool.total_seen == 5
+    assert pool.duplicates == 3
+    assert pool.queries_by_url[canonicalize_url(first["url"])] == [
+        "error fare EZE MAD",
+        "EZE MAD barato",
+    ]
+    assert pool.queries_by_url["https://b.com/1"] == ["error fare EZE MAD"]
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Test de la política de corte anticipado por ruta"""
+
+import sys
+sys.path.insert(0, '.')
+
+from types import SimpleNamespace
+
+from query_planner import PlannedQuery
+from stopping import (
+    STOP_ENOUGH_DEALS,
+    STOP_NO_YIELD,
+    STOP_TIME_BUDGET,
+    SearchReport,
+    StopPolicy,
+    StopState,
+)
+
+
+def _deal(score, url="https://a.com"):
+    return SimpleNamespace(deal_score=score, booking_url=url)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_politica_desactivada_por_defecto():
+    policy = StopPolicy()
+    assert not policy.enabled
+    assert StopState(None).after_wave([]) is None
+
+
+def test_corta_con_suficientes_ofertas_buenas():
+    policy = StopPolicy(max_deals=2, min_score=90, ignore=lambda d: d.booking_url == "vista")
+    state = StopState(policy)
+    assert policy.hits([_deal(95), _deal(80), _deal(99, "vista")]) == 1
+    assert state.after_wave([_deal(95), _deal(80)]) is None
+    assert state.after_wave([_deal(91)]) == STOP_ENOUGH_DEALS
+
+
+def test_corta_tras_tandas_sin_ofertas():
+    state = StopState(StopPolicy(idle_waves=2))
+    assert state.after_wave([]) is None
+    assert state.after_wave([_deal(50)]) is None  # Una oferta reinicia la cuenta
+    assert state.after_wave([]) is None
+    assert state.after_wave([]) == STOP_NO_YIELD
+
+
+def test_presupuesto_de_tiempo():
+    clock = FakeClock()
+    state = StopState(StopPolicy(time_budget=10), clock=clock)
+    clock.now = 9.9
+    assert not state.out_of_time()
+    assert state.after_wave([_deal(50)]) is None
+    clock.now = 10
+    assert state.out_of_time()
+    assert state.after_wave([_deal(50)]) == STOP_TIME_BUDGET
+
+
+def test_informe_cuenta_paginas_y_consultas():
+    first, second = PlannedQuery("error fare EZE MAD", 20), PlannedQuery("EZE MAD barato", 20)
+    report = SearchReport("EZE-MAD", queries_planned=2)
+    report.skip(STOP_NO_YIELD, [(first, 1), (first, 2), (second, 0)])
+    assert report.skipped_pages == [
+        "error fare EZE MAD (página 2)",
+        "error fare EZE MAD (página 3)",
+        "EZE MAD barato",
+    ]
+    assert report.pages_skipped == 3
+    assert report.queries_skipped == 2
+    assert "3 páginas de 2 consultas omitidas" in report.finish().summary()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Test de los spans por etapa"""
+
+import json
+import sys
+sys.path.insert(0, '.')
+
+from tracing import BRAVE, OLLAMA_GENERATE, Tracer
+
+
+def test_agrega_por_ruta_y_ciclo(tmp_path):
+    tracer = Tracer(enabled=True, path=tmp_path / "traces.jsonl")
+    cycle = tracer.start_cycle()
+    tracer.set_route("EZE-MAD")
+    with tracer.span(BRAVE, query="q") as attrs:
+        attrs["results"] = 10
+    tracer.record(OLLAMA_GENERATE, 0.5, prompt_eval_count=800, eval_count=100)
+
+    stages = tracer.by_route(cycle)["EZE-MAD"]
+    assert stages[BRAVE]["count"] == 1
+    assert stages[OLLAMA_GENERATE]["seconds"] == 0.5
+    assert str(cycle) in tracer.by_cycle()
+
+    text = tracer.prometheus_text()
+    assert 'flight_search_ollama_tokens_total{kind="prompt_eval_count",route="EZE-MAD"} 800' in text
+
+    assert tracer.flush() == 2
+    lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+    assert json.loads(lines[0])["attrs"] == {"query": "q", "results": 10}
+    assert tracer.flush() == 0
+
+
+def test_desactivado_no_registra(tmp_path):
+    tracer = Tracer(enabled=False, path=tmp_path / "traces.jsonl")
+    with tracer.span(BRAVE):
+        pass
+    assert tracer.by_route() == {}
+
+
+def test_pendientes_acotados_y_agregados_por_ciclo(tmp_path):
+    tracer = Tracer(enabled=True, path=tmp_path / "traces.jsonl", flush_spans=100)
+    cycle = tracer.start_cycle()
+    tracer.set_route("EZE-MAD")
+    for _ in range(6000):
+        tracer.record(BRAVE, 0.01)
+
+    # Se exporta solo: en memoria nunca quedan más de flush_spans pendientes
+    assert len(tracer._pending) < 100
+    assert len((tmp_path / "traces.jsonl").read_text().splitlines()) == 6000
+    # Los agregados del ciclo no pierden spans viejos
+    assert tracer.by_route(cycle)["EZE-MAD"][BRAVE]["count"] == 6000
+    assert tracer.by_cycle()[str(cycle)][BRAVE]["count"] == 6000
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Tracing - Spans livianos por etapa del pipeline de búsqueda
+Mide Brave, armado de prompts, generación de Ollama, parseo, validación,
+evaluación, deduplicación y guardado; agrega por ruta y por ciclo, exporta a
+JSONL y opcionalmente expone los totales en formato de texto de Prometheus
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+TRACE_FILE = Path.home() / ".config" / "flight-monitor" / "traces.jsonl"
+
+# Medición de etapas (en memoria) y exportación a JSONL
+TRACING = os.getenv("TRACING", "1") == "1"
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "1") == "1"
+# Tamaño máximo del JSONL antes de rotarlo a .1
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+# Spans pendientes o segundos desde la última exportación que disparan un flush
+TRACE_FLUSH_SPANS = int(os.getenv("TRACE_FLUSH_SPANS", "1000"))
+TRACE_FLUSH_SECONDS = float(os.getenv("TRACE_FLUSH_SECONDS", "60"))
+# Puerto del endpoint /metrics de Prometheus (0 = desactivado)
+TRACE_PROMETHEUS_PORT = int(os.getenv("TRACE_PROMETHEUS_PORT", "0"))
+
+# Etapas instrumentadas
+BRAVE = "brave"
+PROMPT_BUILD = "prompt_build"
+OLLAMA_GENERATE = "ollama_generate"
+JSON_PARSE = "json_parse"
+VALIDATION = "validation"
+EVALUATION = "evaluation"
+DEDUP = "dedup"
+SAVE = "save"
+
+# Atributos numéricos de Ollama que se suman en los agregados
+TOKEN_ATTRS = ("prompt_eval_count", "eval_count")
+# Ciclos con agregados por ruta en memoria
+MAX_CYCLES = 100
+
+_route: ContextVar[str] = ContextVar("trace_route", default="-")
+
+
+@dataclass
+class Span:
+    """Una medición de una etapa"""
+
+    stage: str
+    route: str
+    cycle: int
+    start: float  # Epoch en segundos
+    duration: float
+    attrs: Dict = field(default_factory=dict)
+
+
+class Tracer:
+    """Registro de spans con agregados por ruta y por ciclo"""
+
+    def __init__(
+        self,
+        enabled: bool = TRACING,
+        path: Path = TRACE_FILE,
+        flush_spans: int = TRACE_FLUSH_SPANS,
+        flush_seconds: float = TRACE_FLUSH_SECONDS,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = enabled
+        self.path = Path(path)
+        self.cycle = 0
+        # Los pendientes se exportan solos al pasar alguno de los dos límites
+        self.flush_spans = flush_spans
+        self.flush_seconds = flush_seconds
+        self._pending: List[Span] = []
+        self._last_flush = time.monotonic()
+        # ciclo -> ruta -> etapa -> {count, seconds, max}, agregado al registrar
+        self._cycles: "OrderedDict[int, Dict[str, Dict[str, Dict]]]" = OrderedDict()
+        # (stage, route) -> {count, seconds, max, tokens...}, acumulado del proceso
+        self._totals: Dict[tuple, Dict] = {}
+        self._lock = threading.Lock()
+
+    def set_route(self, route: str):
+        """Ruta de los spans siguientes en esta tarea (y sus subtareas)"""
+        _route.set(route)
+
+    def start_cycle(self) -> int:
+        """Inicia un ciclo del daemon; los spans siguientes se agrupan en él"""
+        with self._lock:
+            self.cycle += 1
+            return self.cycle
+
+    @contextmanager
+    def span(self, stage: str, **attrs) -> Iterator[Dict]:
+        """Mide el bloque; el dict devuelto admite atributos extra"""
+        if not self.enabled:
+            yield attrs
+            return
+        start = time.time()
+        started = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.record(stage, time.perf_counter() - started, start=start, **attrs)
+
+    def record(self, stage: str, duration: float, start: Optional[float] = None, **attrs):
+        """Registra un span ya medido"""
+        if not self.enabled:
+            return
+        span = Span(
+            stage,
+            _route.get(),
+            self.cycle,
+            start if start is not None else time.time() - duration,
+            duration,
+            attrs,
+        )
+        with self._lock:
+            self._pending.append(span)
+            routes = self._cycles.setdefault(span.cycle, {})
+            if len(self._cycles) > MAX_CYCLES:
+                self._cycles.popitem(last=False)
+            _add(
+                routes.setdefault(span.route, {}),
+                stage,
+                {"count": 1, "seconds": duration, "max": duration},
+            )
+            totals = self._totals.setdefault(
+                (stage, span.route),
+                {"count": 0, "seconds": 0.0, "max": 0.0, **{a: 0 for a in TOKEN_ATTRS}},
+            )
+            totals["count"] += 1
+            totals["seconds"] += duration
+            totals["max"] = max(totals["max"], duration)
+            for name in TOKEN_ATTRS:
+                value = attrs.get(name)
+                if isinstance(value, (int, float)):
+                    totals[name] += value
+            due = (
+                len(self._pending) >= self.flush_spans
+                or time.monotonic() - self._last_flush >= self.flush_seconds
+            )
+        if due:
+            self.flush()
+
+    def by_route(self, cycle: Optional[int] = None) -> Dict[str, Dict[str, Dict]]:
+        """Tiempo por etapa de cada ruta (de un ciclo o de los ciclos recientes)"""
+        with self._lock:
+            if cycle is not None:
+                cycles = [self._cycles.get(cycle, {})]
+            else:
+                cycles = list(self._cycles.values())
+            result: Dict[str, Dict[str, Dict]] = {}
+            for routes in cycles:
+                for route, stages in routes.items():
+                    for stage, stats in stages.items():
+                        _add(result.setdefault(route, {}), stage, stats)
+        return result
+
+    def by_cycle(self) -> Dict[str, Dict[str, Dict]]:
+        """Tiempo por etapa de cada ciclo reciente"""
+        with self._lock:
+            result: Dict[str, Dict[str, Dict]] = {}
+            for cycle, routes in self._cycles.items():
+                stages = result.setdefault(str(cycle), {})
+                for route_stages in routes.values():
+                    for stage, stats in route_stages.items():
+                        _add(stages, stage, stats)
+        return result
+
+    def flush(self) -> int:
+        """Agrega al JSONL los spans pendientes; devuelve cuántos se escribieron"""
+        with self._lock:
+            spans, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not spans or not TRACE_EXPORT:
+            return 0
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.exists() and self.path.stat().st_size > TRACE_MAX_BYTES:
+                os.replace(self.path, self.path.with_suffix(".jsonl.1"))
+            with open(self.path, "a") as f:
+                for span in spans:
+                    f.write(json.dumps(asdict(span), ensure_ascii=False) + "\n")
+        except OSError as e:
+            self.logger.error(f"Error exportando trazas: {e}")
+            return 0
+        return len(spans)
+
+    def prometheus_text(self) -> str:
+        """Totales del proceso en formato de texto de Prometheus"""
+        with self._lock:
+            totals = {key: dict(value) for key, value in self._totals.items()}
+
+        lines = [
+            "# HELP flight_search_stage_seconds_total Tiempo acumulado por etapa",
+            "# TYPE flight_search_stage_seconds_total counter",
+        ]
+        for (stage, route), stats in sorted(totals.items()):
+            lines.append(
+                f'flight_search_stage_seconds_total{{stage="{stage}",route="{route}"}} '
+                f"{stats['seconds']:.6f}"
+            )
+        lines += [
+            "# HELP flight_search_stage_calls_total Spans por etapa",
+            "# TYPE flight_search_stage_calls_total counter",
+        ]
+        for (stage, route), stats in sorted(totals.items()):
+            lines.append(
+                f'flight_search_stage_calls_total{{stage="{stage}",route="{route}"}} '
+                f"{stats['count']}"
+            )
+        lines += [
+            "# HELP flight_search_stage_seconds_max Span más lento por etapa",
+            "# TYPE flight_search_stage_seconds_max gauge",
+        ]
+        for (stage, route), stats in sorted(totals.items()):
+            lines.append(
+                f'flight_search_stage_seconds_max{{stage="{stage}",route="{route}"}} '
+                f"{stats['max']:.6f}"
+            )
+        lines += [
+            "# HELP flight_search_ollama_tokens_total Tokens evaluados por Ollama",
+            "# TYPE flight_search_ollama_tokens_total counter",
+        ]
+        for (stage, route), stats in sorted(totals.items()):
+            if stage != OLLAMA_GENERATE:
+                continue
+            for name in TOKEN_ATTRS:
+                lines.append(
+                    f'flight_search_ollama_tokens_total{{kind="{name}",route="{route}"}} '
+                    f"{stats[name]}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _add(stages: Dict[str, Dict], stage: str, stats: Dict):
+    """Suma `stats` (count, seconds, max) a la etapa"""
+    total = stages.setdefault(stage, {"count": 0, "seconds": 0.0, "max": 0.0})
+    total["count"] += stats["count"]
+    total["seconds"] += stats["seconds"]
+    total["max"] = max(total["max"], stats["max"])
+
+
+tracer = Tracer()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = tracer.prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Sin ruido en el log del daemon
+
+
+def start_metrics_server(port: int = TRACE_PROMETHEUS_PORT) -> Optional[ThreadingHTTPServer]:
+    """Sirve /metrics en un hilo aparte (port 0 = no se inicia)"""
+    if not port:
+        return None
+    server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server